@@ -1,13 +1,14 @@
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, render_template, request, jsonify, send_from_directory, Response, stream_with_context, make_response
 from flask_cors import CORS
+from werkzeug.security import safe_join
 import os
+import sys
 from datetime import datetime, timedelta
-import json
-from werkzeug.utils import secure_filename
-import uuid
-import webview
 import threading
-from collections import defaultdict
+import time
+import tempfile
+import click
+import urllib.request
 
 app = Flask(__name__)
 CORS(app)
@@ -15,7 +16,8 @@ CORS(app)
 # --- Configuration for Portability ---
 # Use the instance folder for all user-generated data (database, uploads).
 # This is the standard Flask way and makes the app portable.
-instance_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance')
+# TRADING_JOURNAL_INSTANCE points the app at another data folder (benchmarks, tests).
+instance_path = os.environ.get('TRADING_JOURNAL_INSTANCE') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance')
 os.makedirs(instance_path, exist_ok=True)
 
 app.config['INSTANCE_PATH'] = instance_path
@@ -25,9 +27,46 @@ app.config['UPLOAD_FOLDER'] = os.path.join(instance_path, 'uploads')
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 
+# --- SQLite performance profile ---
+# 'performance' (default) enables WAL and the connection pragmas in utils/sqlite.py,
+# 'default' keeps SQLite's stock rollback journal settings.
+from utils.sqlite import PERFORMANCE_PRAGMAS, configure_sqlite
+
+app.config['SERVER_HOST'] = '127.0.0.1'
+app.config['SERVER_PORT'] = int(os.environ.get('TRADING_JOURNAL_PORT', 5000))
+app.config['SERVER_THREADS'] = int(os.environ.get('TRADING_JOURNAL_THREADS', 8))
+app.config['SQLITE_PROFILE'] = os.environ.get('TRADING_JOURNAL_SQLITE_PROFILE', 'performance')
+app.config['SQLITE_PRAGMAS'] = PERFORMANCE_PRAGMAS if app.config['SQLITE_PROFILE'] == 'performance' else {}
+# One pooled connection per waitress worker thread, plus headroom for bursts
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'pool_size': app.config['SERVER_THREADS'],
+    'max_overflow': app.config['SERVER_THREADS'],
+    'pool_timeout': 30
+}
+
 # Ensure upload directory exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+# Computed analytics / weekly responses are cached in-process until the next write
+app.config['RESULT_CACHE_SIZE'] = 128
+app.config['RESULT_CACHE_TTL'] = 300  # seconds, bounds staleness after out-of-process writes
+
+# Thumbnail / medium derivatives of uploads are resized on a small background pool
+app.config['IMAGE_WORKERS'] = 2
+app.config['IMAGE_QUEUE_SIZE'] = 64
+
+# Resumable uploads (/api/uploads) are sent in chunks of at most MAX_CONTENT_LENGTH
+app.config['UPLOAD_SESSION_MAX_SIZE'] = 64 * 1024 * 1024
+app.config['UPLOAD_SESSION_TTL'] = 24 * 3600  # seconds an unfinished upload is kept
+
+# Encoded JSON of up to this many trades is kept for the full trade list
+app.config['TRADE_JSON_CACHE_SIZE'] = 50000
+
+# Opt-in request metrics on /api/_metrics; requests sent with an X-Profile
+# header are then also profiled into PROFILE_FOLDER
+app.config['METRICS_ENABLED'] = os.environ.get('TRADING_JOURNAL_METRICS', '').lower() in ('1', 'true', 'yes')
+app.config['PROFILE_FOLDER'] = os.path.join(instance_path, 'profiles')
+
 # Initialize database
 from models import db
 
@@ -36,85 +75,546 @@ db.init_app(app)
 # Import models
 from models.trade import Trade
 from models.trade_image import TradeImage
+from models.trade_aggregate import TradeAggregate
+from models.image_blob import ImageBlob
+from models.journal_version import JournalVersion
+from models.trade_tag import TradeTag
+from models.trade_rollup import TradeRollup
+from utils.pagination import encode_cursor, parse_fields, keyset_query, serialize_row, iter_batches
+from utils.statistics import (
+    AGGREGATES_REVISION, R_BIN_LABELS, R_BIN_COLUMNS, trade_contribution, record_trade_change,
+    rebuild_aggregates, aggregates_in_sync, journal_totals, trade_totals
+)
+from utils.rollups import (
+    ROLLUP_PERIODS, ROLLUP_FIELDS, ALL_INSTRUMENTS, refresh_trade_rollups, rollup_key, rebuild_rollups, rollups_in_sync, period_rollups,
+    monthly_net_profit
+)
+from utils.instruments import INSTRUMENT_SPECS
+from utils.derived_values import (
+    derived_value_changes, recompute_journal, derived_values_outdated, mark_derived_values_current
+)
+from utils.tag_index import (
+    TAG_MATCH_MODES, parse_names, tag_search_conditions, sync_trade_tags, remove_trade_tags, rebuild_tag_index,
+    tag_index_missing
+)
+from utils.full_text import SEARCH_ORDERS, full_text_available, search_notes
+from utils.analysis_query import (
+    GROUP_BY_DIMENSIONS, filter_conditions, filtered_totals, grouped_totals, filtered_monthly,
+    summary_metrics
+)
+from utils.migrations import upgrade_schema, checked_journal_version, mark_journal_checked
+from utils.query_plans import check_query_plans
+from utils.trade_import import missing_fields, trade_values, detect_format, import_trades
+from utils.http_cache import IMMUTABLE_MAX_AGE, journal_etag, journal_version, content_hash_of
+from utils.result_cache import ResultCache, cached_result
+from utils.metrics import RequestMetrics
+from utils.serializer import TradeSerializer, dumps, json_response, trade_rows, image_dicts
+from utils.thumbnails import DERIVATIVE_SIZES, DerivativeWorker
+from utils.upload_sessions import UploadSessions, UploadOffsetMismatch
+from utils.image_store import (
+    UnlinkQueue, stage_stream, discard_staged, place_staged, add_reference, release_reference, unlink_after_commit,
+    unlink_released, register_unlink_hooks
+)
+from utils.trade_batch import select_batch, batch_values, batch_update, batch_delete
+from utils.trade_export import (
+    EXPORT_FORMATS, EXPORT_MIMETYPES, parse_date_filter, export_query, iter_csv, iter_ndjson, write_parquet
+)
+
+# Keyset pagination limits for GET /api/trades
+TRADE_PAGE_DEFAULT_LIMIT = 100
+TRADE_PAGE_MAX_LIMIT = 500
+TRADE_STREAM_BATCH_SIZE = 500
+
+# Update-form fields that keep the stored value when submitted empty
+FORM_KEEP_WHEN_EMPTY = (
+    'entry_datetime', 'exit_datetime', 'initial_stop_loss', 'initial_take_profit', 'position_size', 'net_profit', 'r_value'
+)
 
-# Create database tables
+def repair_materialized_tables():
+    """
+    Trades written outside the app (e.g. generate_fake_data.py) leave the
+    materialized statistics stale, they are repaired before serving requests.
+    The full-table checks only run when the journal changed since they last
+    passed; both compare against the same scan of the trades table. A new
+    AGGREGATES_REVISION rebuilds the aggregates once, whatever the checks say.
+    Returns whether the checks ran.
+    """
+    stamp = f'{AGGREGATES_REVISION}:{journal_version()}'
+    checked = checked_journal_version() or ''
+    if stamp == checked:
+        return False
+    totals = trade_totals()
+    if not checked.startswith(f'{AGGREGATES_REVISION}:') or not aggregates_in_sync(totals):
+        rebuild_aggregates()
+    if not rollups_in_sync(totals):
+        rebuild_rollups()
+    # Databases created before the tag index existed are backfilled once
+    if tag_index_missing():
+        rebuild_tag_index()
+    mark_journal_checked(stamp)
+    return True
+
+# Create database tables and apply pending index migrations
 with app.app_context():
-    db.create_all()
+    configure_sqlite(db.engine, app.config['SQLITE_PRAGMAS'])
+    upgrade_schema()
+    # Journals written before the P&L engine (or with older formulas) hold
+    # client-computed profit / R values. They are never rewritten implicitly.
+    if derived_values_outdated():
+        if db.session.execute(db.select(Trade.id).limit(1)).first() is None:
+            mark_derived_values_current()  # a new journal has nothing to recompute
+        else:
+            app.logger.warning("Trade P&L predates the current instrument specs; review it with `flask recompute-trades`.")
+    repair_materialized_tables()
+
+@app.cli.command('rebuild-statistics')
+def rebuild_statistics_command():
+    """Recomputes the materialized trade statistics, period rollups and the tag index from scratch."""
+    rows = rebuild_aggregates()
+    print(f"Rebuilt {rows} statistics rows.")
+    rebuild_rollups()
+    print("Rebuilt the day / week / month rollups.")
+    indexed = rebuild_tag_index()
+    print(f"Indexed tags and emotions of {indexed} trades.")
+
+@app.cli.command('recompute-trades')
+@click.option('--yes', is_flag=True, help='Write the changes without asking.')
+@click.option('--show', default=20, show_default=True, help='Number of changed trades to list.')
+def recompute_trades_command(yes, show):
+    """
+    Lists the trades whose net profit or R-value differ from the instrument
+    specs, then (after confirmation) rewrites them and the statistics.
+    Trades in unlisted instruments are left as entered.
+    """
+    changed, profit_delta = 0, 0.0
+    for ids, instruments, old_profit, net_profit, old_r, r_value in derived_value_changes():
+        for row in list(zip(ids, instruments, old_profit, net_profit, old_r, r_value))[:max(show - changed, 0)]:
+            print("#{} {}: net profit {:.2f} -> {:.2f}, R {:.2f} -> {:.2f}".format(*row))
+        changed += len(ids)
+        profit_delta += float((net_profit - old_profit).sum())
+    db.session.rollback()
+    if not changed:
+        mark_derived_values_current()
+        print("All trades match the instrument specs.")
+        return
+    print(f"{changed} trades would change, total net profit {profit_delta:+.2f}.")
+    if not yes and not click.confirm('Write these changes?'):
+        print("Nothing written.")
+        return
+    changed = recompute_journal()
+    print(f"Recomputed derived values, {changed} trades changed.")
+
+@app.cli.command('import-trades')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'ndjson', 'json']), help='Defaults to the file extension.')
+def import_trades_command(path, file_format):
+    """Bulk imports trades from a CSV, NDJSON or JSON file."""
+    start = time.perf_counter()
+    with open(path, 'rb') as stream:
+        report = import_trades(stream, file_format or detect_format(path))
+    db.session.commit()
+    elapsed = time.perf_counter() - start
+    print(f"Imported {report['imported']} trades in {elapsed:.2f}s, rejected {report['rejected']}.")
+    for error in report['errors']:
+        print(f"  row {error['row']}: {error['error']}")
+
+@app.cli.command('export-trades')
+@click.argument('path', type=click.Path(dir_okay=False, writable=True))
+@click.option('--format', 'file_format', type=click.Choice(EXPORT_FORMATS), default='csv')
+@click.option('--start', help='Earliest entry date (YYYY-MM-DD or ISO datetime).')
+@click.option('--end', help='Latest entry date (YYYY-MM-DD or ISO datetime).')
+@click.option('--instrument', help='Only export this instrument.')
+def export_trades_command(path, file_format, start, end, instrument):
+    """Streams the journal to a CSV, NDJSON or Parquet file."""
+    query = export_query(parse_date_filter(start), parse_date_filter(end, end_of_day=True), instrument)
+    if file_format == 'parquet':
+        write_parquet(query, path)
+    else:
+        chunks = iter_csv(query) if file_format == 'csv' else iter_ndjson(query)
+        with open(path, 'w', newline='', encoding='utf-8') as output:
+            for chunk in chunks:
+                output.write(chunk)
+    print(f"Exported trades to {path}.")
+
+@app.cli.command('check-query-plans')
+def check_query_plans_command():
+    """Fails when a hot query no longer uses an index (EXPLAIN QUERY PLAN)."""
+    failed = False
+    for name, (plan, problems) in check_query_plans().items():
+        status = 'FAIL' if problems else 'ok'
+        print(f"[{status}] {name}: {' | '.join(plan)}")
+        failed = failed or bool(problems)
+    if failed:
+        raise SystemExit(1)
+
+result_cache = ResultCache(max_entries=app.config['RESULT_CACHE_SIZE'], ttl=app.config['RESULT_CACHE_TTL'])
+
+upload_sessions = UploadSessions(
+    app.config['UPLOAD_FOLDER'],
+    max_size=app.config['UPLOAD_SESSION_MAX_SIZE'],
+    ttl=app.config['UPLOAD_SESSION_TTL']
+)
+
+trade_serializer = TradeSerializer(max_entries=app.config['TRADE_JSON_CACHE_SIZE'])
+
+request_metrics = RequestMetrics(profile_folder=app.config['PROFILE_FOLDER'])
+if app.config['METRICS_ENABLED']:
+    with app.app_context():
+        request_metrics.install(app, db.engine)
+
+derivative_worker = DerivativeWorker(
+    app.config['UPLOAD_FOLDER'],
+    max_workers=app.config['IMAGE_WORKERS'],
+    max_pending=app.config['IMAGE_QUEUE_SIZE'],
+    logger=app.logger
+)
+
+def apply_trade_values(trade, data):
+    """
+    Validates a complete raw row like create_trade (raises ValueError) and
+    writes it to an edited trade. net_profit and r_value are recomputed by
+    the P&L engine; unlisted instruments keep the values given in `data`.
+    """
+    for name, value in trade_values(data).items():
+        setattr(trade, name, value)
+    trade.updated_at = datetime.utcnow()
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def delete_image_file(image_path):
+    """Removes an uploaded image and its derivatives, logging instead of raising."""
+    try:
+        full_path = os.path.join(app.config['UPLOAD_FOLDER'], image_path)
+        if os.path.exists(full_path):
+            os.remove(full_path)
+        derivative_worker.remove(image_path)
+    except Exception as e:
+        app.logger.error(f"Error deleting image file {image_path}: {e}")
+
+def blob_in_use(image_path):
+    with app.app_context():
+        return ImageBlob.query.filter_by(image_path=image_path).first() is not None
+
+def delete_released_file(image_path):
+    """Unlinks a released blob unless an upload of the same content uses or is placing it meanwhile."""
+    unlink_released(image_path, blob_in_use, delete_image_file)
+
+# Blob files whose last reference was removed are unlinked only after the commit
+# succeeds, by a background queue so the request does not wait for the filesystem.
+# New blob files get their derivatives once committed, and are removed on rollback.
+unlink_queue = UnlinkQueue(delete_released_file, logger=app.logger)
+register_unlink_hooks(unlink_queue.put, placed=derivative_worker.enqueue)
+
+def stage_image(file):
+    """
+    Phase 1 of storing an upload: copies and hashes it into a temp file. Runs
+    before the request writes anything, so the SQLite write lock is never held
+    while a file streams to disk. Returns None for a missing or invalid file.
+    """
+    if not (file and file.filename and allowed_file(file.filename)):
+        return None
+    extension = file.filename.rsplit('.', 1)[1].lower()
+    with request_metrics.image_io('store'):
+        return stage_stream(app.config['UPLOAD_FOLDER'], file.stream, extension)
+
+def stage_trade_images():
+    """Stages the entry_image / exit_image files of a trade form, keyed by image type."""
+    staged_images = {}
+    try:
+        for image_type, field in (('ENTRY', 'entry_image'), ('EXIT', 'exit_image')):
+            staged = stage_image(request.files.get(field))
+            if staged is not None:
+                staged_images[image_type] = staged
+    except BaseException:
+        for staged in staged_images.values():
+            discard_staged(staged)
+        raise
+    return staged_images
+
+def store_image(staged, trade_id, image_type, description):
+    """Phase 2: moves a staged upload into the content-addressed store and attaches it to a trade."""
+    relative_path = place_staged(app.config['UPLOAD_FOLDER'], staged)
+    blob, _ = add_reference(staged.sha256, relative_path, staged.size)
+    image = TradeImage(
+        trade_id=trade_id,
+        image_path=blob.image_path,
+        content_hash=staged.sha256,
+        image_type=image_type,
+        description=description
+    )
+    db.session.add(image)
+    return image
+
+def remove_image(image):
+    """Deletes an image record; its file goes once no other trade references it."""
+    relative_path = release_reference(image)
+    if relative_path:
+        unlink_after_commit(relative_path)
+    db.session.delete(image)
+
 @app.route('/')
 def index():
     return render_template('index.html')
 
 @app.route('/api/trades', methods=['GET'])
+@journal_etag
 def get_trades():
-    trades = Trade.query.order_by(Trade.entry_datetime.desc()).all()
-    results = []
-    for trade in trades:
-        try:
-            results.append(trade.to_dict())
-        except Exception as e:
-            app.logger.error(f"Error serializing trade {trade.id}: {e}")
-            # Skip trades that cause errors, possibly due to old data
-            continue
-    return jsonify(results)
+    # Any paging argument switches to the keyset-paginated / streaming mode.
+    # Without them the full list is returned, as the dashboard expects.
+    if any(arg in request.args for arg in ('limit', 'cursor', 'fields', 'format')):
+        return get_trades_page()
+
+    # Core rows + per-trade encoded JSON cache instead of ORM objects and to_dict()
+    rows = trade_rows(Trade.entry_datetime.desc())
+    return Response(trade_serializer.encode_trades(rows, image_dicts()), mimetype='application/json')
+
+def get_trades_page():
+    """
+    Keyset-paginated trade listing, newest first.
+    Query args: limit, cursor (from `next_cursor`), fields (comma separated),
+    format=page (default) | ndjson | stream (chunked JSON array).
+    """
+    output_format = request.args.get('format', 'page')
+    if output_format not in ('page', 'ndjson', 'stream'):
+        return jsonify({'error': f'Unknown format: {output_format}'}), 400
+    try:
+        fields = parse_fields(request.args.get('fields'))
+        query = keyset_query(fields, request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    limit = request.args.get('limit', type=int)
+    if limit is not None and limit <= 0:
+        return jsonify({'error': 'limit must be a positive integer'}), 400
+    with_images = 'images' in fields
+
+    if output_format == 'page':
+        limit = min(limit or TRADE_PAGE_DEFAULT_LIMIT, TRADE_PAGE_MAX_LIMIT)
+        # Fetch one extra row to know whether another page exists
+        rows = query.limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        images_by_trade = image_dicts([row.id for row in rows]) if with_images else None
+        next_cursor = encode_cursor(rows[-1].entry_datetime, rows[-1].id) if has_more else None
+        return json_response({
+            'trades': [serialize_row(row, fields, images_by_trade) for row in rows],
+            'next_cursor': next_cursor
+        })
+
+    # Streaming formats: an explicit limit caps the stream, otherwise everything after the cursor
+    if limit is not None:
+        query = query.limit(limit)
+
+    def generate():
+        first = True
+        if output_format == 'stream':
+            yield b'['
+        for batch in iter_batches(query, TRADE_STREAM_BATCH_SIZE):
+            images_by_trade = image_dicts([row.id for row in batch]) if with_images else None
+            chunk = [dumps(serialize_row(row, fields, images_by_trade)) for row in batch]
+            if output_format == 'ndjson':
+                yield b'\n'.join(chunk) + b'\n'
+            else:
+                yield (b'' if first else b',') + b','.join(chunk)
+                first = False
+        if output_format == 'stream':
+            yield b']'
+
+    mimetype = 'application/x-ndjson' if output_format == 'ndjson' else 'application/json'
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
+@app.route('/api/trades/search', methods=['GET'])
+@journal_etag
+def search_trades():
+    """
+    Trades matching tags / emotions (comma separated), answered from the tag index.
+    match=all (default) requires every listed name, match=any at least one of them;
+    tags and emotions are always combined with AND. Paged like GET /api/trades:
+    limit, cursor (from `next_cursor`) and fields.
+    """
+    tags, emotions = parse_names(request.args.get('tags')), parse_names(request.args.get('emotions'))
+    if not tags and not emotions:
+        return jsonify({'error': 'Provide tags and/or emotions to search for'}), 400
+    match = request.args.get('match', 'all')
+    if match not in TAG_MATCH_MODES:
+        return jsonify({'error': f'match must be one of: {", ".join(TAG_MATCH_MODES)}'}), 400
+    limit = request.args.get('limit', type=int)
+    if limit is not None and limit <= 0:
+        return jsonify({'error': 'limit must be a positive integer'}), 400
+    limit = min(limit or TRADE_PAGE_DEFAULT_LIMIT, TRADE_PAGE_MAX_LIMIT)
+    try:
+        fields = parse_fields(request.args.get('fields'))
+        query = keyset_query(fields, request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    query = query.filter(
+        *tag_search_conditions('tag', tags, match), *tag_search_conditions('emotion', emotions, match)
+    )
+    # Fetch one extra row to know whether another page exists
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    images_by_trade = image_dicts([row.id for row in rows]) if 'images' in fields else None
+    next_cursor = encode_cursor(rows[-1].entry_datetime, rows[-1].id) if has_more else None
+    return json_response({
+        'trades': [serialize_row(row, fields, images_by_trade) for row in rows],
+        'next_cursor': next_cursor
+    })
+
+@app.route('/api/trades/search/notes', methods=['GET'])
+@journal_etag
+def search_trade_notes():
+    """
+    Full-text search over rationale and review (`q`), with HTML-escaped snippets
+    whose matches are wrapped in <mark>.
+    order=rank (default, best match first) | date (newest first); paged with
+    limit / offset. Accepts the /api/advanced-analysis filters (instrument,
+    order_type, tags, emotions, start, end).
+    """
+    text = request.args.get('q', '').strip()
+    if not text:
+        return jsonify({'error': 'Provide a search query (q)'}), 400
+    order = request.args.get('order', 'rank')
+    if order not in SEARCH_ORDERS:
+        return jsonify({'error': f'order must be one of: {", ".join(SEARCH_ORDERS)}'}), 400
+    limit = request.args.get('limit', TRADE_PAGE_DEFAULT_LIMIT, type=int)
+    offset = request.args.get('offset', 0, type=int)
+    if limit <= 0 or offset < 0:
+        return jsonify({'error': 'limit must be positive and offset not negative'}), 400
+    limit = min(limit, TRADE_PAGE_MAX_LIMIT)
+    try:
+        conditions = filter_conditions(request.args)
+    except ValueError:
+        return jsonify({'error': 'Invalid date filter. Please use YYYY-MM-DD or YYYY-MM-DDTHH:MM.'}), 400
+    if not full_text_available():
+        return jsonify({'error': 'Full-text search needs SQLite with FTS5'}), 501
+
+    try:
+        # Fetch one extra row to know whether another page exists
+        rows = search_notes(text, conditions, order, limit + 1, offset)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"Error searching trade notes: {e}")
+        return jsonify({'error': 'Failed to search trade notes'}), 500
+    has_more = len(rows) > limit
+    results = [
+        {'trade': trade.to_dict(), 'rank': round(rank, 4) if rank is not None else None, 'snippet': snippet}
+        for trade, rank, snippet in rows[:limit]
+    ]
+    return jsonify({'results': results, 'next_offset': offset + limit if has_more else None})
 
 @app.route('/api/trades', methods=['POST'])
 def create_trade():
+    staged_images = {}
     try:
         data = request.form.to_dict()
         
-        # Enforce required fields based on user specification
-        required_fields = [
-            'entry_datetime', 'exit_datetime', 'instrument', 'order_type', 
-            'entry_price', 'exit_price', 'initial_stop_loss', 
-            'initial_take_profit', 'position_size', 'status'
-        ]
-        
-        missing_or_empty_fields = [field for field in required_fields if not data.get(field)]
+        # Enforce required fields based on user specification (REQUIRED_FIELDS)
+        missing_or_empty_fields = missing_fields(data)
         if missing_or_empty_fields:
             error_message = f'Missing or empty required fields: {", ".join(missing_or_empty_fields)}'
             return jsonify({'error': error_message}), 400
 
-        trade = Trade(
-            entry_datetime=datetime.fromisoformat(data['entry_datetime']),
-            exit_datetime=datetime.fromisoformat(data['exit_datetime']),
-            instrument=data['instrument'],
-            order_type=data['order_type'],
-            entry_price=float(data['entry_price']),
-            exit_price=float(data['exit_price']),
-            initial_stop_loss=float(data['initial_stop_loss']),
-            initial_take_profit=float(data['initial_take_profit']),
-            position_size=float(data['position_size']),
-            status=data['status'],
-            net_profit=float(data.get('net_profit') or 0),
-            r_value=float(data.get('r_value') or 0),
-            rationale=data.get('rationale', ''),
-            review=data.get('review', ''),
-            emotions=data.get('emotions', ''),
-            tags=data.get('tags', '')
-        )
+        staged_images = stage_trade_images()
+        trade = Trade(**trade_values(data))
         db.session.add(trade)
         db.session.flush()  # Flush to get the trade.id for image association
+        record_trade_change(new=trade_contribution(trade))
+        refresh_trade_rollups(rollup_key(trade))
+        sync_trade_tags(trade)
 
-        # Handle image uploads
-        if 'entry_image' in request.files:
-            upload_image_for_trade(request.files['entry_image'], trade.id, 'ENTRY', data.get('entry_image_description'))
-        
-        if 'exit_image' in request.files:
-            upload_image_for_trade(request.files['exit_image'], trade.id, 'EXIT', data.get('exit_image_description'))
+        # Handle image uploads (already staged to temp files)
+        for image_type, staged in staged_images.items():
+            upload_image_for_trade(staged, trade.id, image_type, data.get(f'{image_type.lower()}_image_description'))
 
         db.session.commit()
+        result_cache.invalidate()
         return jsonify(trade.to_dict()), 201
+    except ValueError as e:
+        db.session.rollback()
+        if 'invalid isoformat' in str(e).lower():
+            return jsonify({'error': 'Invalid date format. Please use YYYY-MM-DDTHH:MM.'}), 400
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         app.logger.error(f"Error creating trade: {e}")
-        # Provide a more specific error message if possible
-        if 'invalid isoformat' in str(e):
-            return jsonify({'error': 'Invalid date format. Please use YYYY-MM-DDTHH:MM.'}), 400
         return jsonify({'error': f'An unexpected error occurred: {e}'}), 500
+    finally:
+        for staged in staged_images.values():
+            discard_staged(staged)
+
+@app.route('/api/trades/import', methods=['POST'])
+def import_trades_file():
+    """
+    Bulk imports trades from an uploaded CSV, NDJSON or JSON file (`file` field).
+    The format comes from the `format` field or the file extension. Valid rows
+    are committed together; rejected rows are reported back.
+    """
+    if 'file' not in request.files or request.files['file'].filename == '':
+        return jsonify({'error': 'No import file provided'}), 400
+    file = request.files['file']
+    try:
+        file_format = request.form.get('format') or detect_format(file.filename)
+        if file_format not in ('csv', 'ndjson', 'json'):
+            raise ValueError(f'Unknown import format: {file_format}')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        report = import_trades(file.stream, file_format)
+        db.session.commit()
+        result_cache.invalidate()
+        return jsonify(report), 201 if report['imported'] else 200
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error importing trades: {e}")
+        return jsonify({'error': f'Import failed, no trades were saved: {e}'}), 500
+
+@app.route('/api/trades/export', methods=['GET'])
+def export_trades():
+    """
+    Streams the journal as a download.
+    Query args: format=csv (default) | ndjson | parquet, start, end, instrument.
+    """
+    file_format = request.args.get('format', 'csv')
+    if file_format not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unknown export format: {file_format}'}), 400
+    try:
+        query = export_query(
+            parse_date_filter(request.args.get('start')),
+            parse_date_filter(request.args.get('end'), end_of_day=True),
+            request.args.get('instrument')
+        )
+    except ValueError:
+        return jsonify({'error': 'Invalid date format. Please use YYYY-MM-DD or YYYY-MM-DDTHH:MM.'}), 400
+
+    headers = {'Content-Disposition': f'attachment; filename=trades.{file_format}'}
+    if file_format == 'csv':
+        return Response(stream_with_context(iter_csv(query)), mimetype=EXPORT_MIMETYPES['csv'], headers=headers)
+    if file_format == 'ndjson':
+        return Response(stream_with_context(iter_ndjson(query)), mimetype=EXPORT_MIMETYPES['ndjson'], headers=headers)
+
+    # Parquet needs a seekable sink: write row groups to a temp file, then stream it
+    temp_file = tempfile.NamedTemporaryFile(suffix='.parquet', delete=False)
+    try:
+        with temp_file:
+            write_parquet(query, temp_file)
+    except RuntimeError as e:
+        os.remove(temp_file.name)
+        return jsonify({'error': str(e)}), 501
+
+    def stream_file():
+        try:
+            with open(temp_file.name, 'rb') as exported:
+                while chunk := exported.read(64 * 1024):
+                    yield chunk
+        finally:
+            os.remove(temp_file.name)
+
+    return Response(stream_file(), mimetype=EXPORT_MIMETYPES['parquet'], headers=headers)
 
 @app.route('/api/trades/<int:trade_id>', methods=['GET'])
 def get_trade(trade_id):
@@ -123,74 +623,71 @@ def get_trade(trade_id):
 
 @app.route('/api/trades/update/<int:trade_id>', methods=['POST'])
 def update_trade_form(trade_id):
+    staged_images = {}
     try:
         trade = Trade.query.get_or_404(trade_id)
+        old_contribution, old_rollup_key = trade_contribution(trade), rollup_key(trade)
         data = request.form.to_dict()
+        staged_images = stage_trade_images()
         
-        # Update trade fields from form data
-        trade.entry_datetime = datetime.fromisoformat(data.get('entry_datetime')) if data.get('entry_datetime') else trade.entry_datetime
-        trade.exit_datetime = datetime.fromisoformat(data.get('exit_datetime')) if data.get('exit_datetime') else trade.exit_datetime
-        trade.instrument = data.get('instrument', trade.instrument)
-        trade.order_type = data.get('order_type', trade.order_type)
-        trade.entry_price = float(data.get('entry_price', trade.entry_price))
-        trade.exit_price = float(data.get('exit_price', trade.exit_price))
-        trade.initial_stop_loss = float(data.get('initial_stop_loss') or trade.initial_stop_loss)
-        trade.initial_take_profit = float(data.get('initial_take_profit') or trade.initial_take_profit)
-        trade.position_size = float(data.get('position_size') or trade.position_size)
-        trade.status = data.get('status', trade.status)
-        trade.net_profit = float(data.get('net_profit') or trade.net_profit)
-        trade.r_value = float(data.get('r_value') or trade.r_value)
-        trade.rationale = data.get('rationale', trade.rationale)
-        trade.review = data.get('review', trade.review)
-        trade.emotions = data.get('emotions', trade.emotions)
-        trade.tags = data.get('tags', trade.tags)
-        trade.updated_at = datetime.utcnow()
+        # Update trade fields from form data; fields not sent keep their value
+        edited = {
+            name: value for name, value in data.items() if value != '' or name not in FORM_KEEP_WHEN_EMPTY
+        }
+        apply_trade_values(trade, {**trade.to_dict(), **edited})
+        record_trade_change(old_contribution, trade_contribution(trade))
+        refresh_trade_rollups(old_rollup_key, rollup_key(trade))
+        sync_trade_tags(trade)
         
         # Handle image uploads - re-upload replaces old ones
-        if 'entry_image' in request.files and request.files['entry_image'].filename != '':
-             upload_image_for_trade(request.files['entry_image'], trade.id, 'ENTRY', data.get('entry_image_description'), overwrite=True)
-        if 'exit_image' in request.files and request.files['exit_image'].filename != '':
-             upload_image_for_trade(request.files['exit_image'], trade.id, 'EXIT', data.get('exit_image_description'), overwrite=True)
+        for image_type, staged in staged_images.items():
+            upload_image_for_trade(
+                staged, trade.id, image_type, data.get(f'{image_type.lower()}_image_description'), overwrite=True
+            )
 
         db.session.commit()
+        result_cache.invalidate()
         return jsonify(trade.to_dict())
+    except ValueError as e:
+        db.session.rollback()
+        if 'invalid isoformat' in str(e).lower():
+            return jsonify({'error': 'Invalid date format for update. Please use YYYY-MM-DDTHH:MM.'}), 400
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         app.logger.error(f"Error updating trade {trade_id}: {e}")
-        if 'invalid isoformat' in str(e):
-            return jsonify({'error': 'Invalid date format for update. Please use YYYY-MM-DDTHH:MM.'}), 400
         return jsonify({'error': f'An unexpected error occurred during update: {e}'}), 500
+    finally:
+        for staged in staged_images.values():
+            discard_staged(staged)
 
 @app.route('/api/trades/<int:trade_id>', methods=['PUT'])
 def update_trade(trade_id):
     try:
         trade = Trade.query.get_or_404(trade_id)
+        old_contribution, old_rollup_key = trade_contribution(trade), rollup_key(trade)
         data = request.get_json()
-        
-        # Update trade fields from JSON data
-        trade.entry_datetime = datetime.fromisoformat(data['entry_datetime'])
-        trade.exit_datetime = datetime.fromisoformat(data['exit_datetime'])
-        trade.instrument = data['instrument']
-        trade.order_type = data['order_type']
-        trade.entry_price = float(data['entry_price'])
-        trade.exit_price = float(data['exit_price'])
-        trade.initial_stop_loss = float(data['initial_stop_loss'])
-        trade.initial_take_profit = float(data['initial_take_profit'])
-        trade.position_size = float(data['position_size'])
-        trade.status = data['status']
-        trade.net_profit = float(data['net_profit'])
-        trade.r_value = float(data['r_value'])
-        trade.rationale = data['rationale']
-        trade.review = data['review']
-        trade.emotions = data['emotions']
-        trade.tags = data['tags']
-        trade.updated_at = datetime.utcnow()
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Expected a JSON object'}), 400
+        missing_or_empty_fields = missing_fields(data)
+        if missing_or_empty_fields:
+            return jsonify({'error': f'Missing or empty required fields: {", ".join(missing_or_empty_fields)}'}), 400
+
+        # Update trade fields from JSON data; net_profit / r_value default to the stored ones
+        apply_trade_values(trade, {'net_profit': trade.net_profit, 'r_value': trade.r_value, **data})
+        record_trade_change(old_contribution, trade_contribution(trade))
+        refresh_trade_rollups(old_rollup_key, rollup_key(trade))
+        sync_trade_tags(trade)
         
         # Note: Image uploads are handled separately via POST to /api/trades/<id>/images
         # This keeps the PUT request clean for JSON data.
 
         db.session.commit()
+        result_cache.invalidate()
         return jsonify(trade.to_dict())
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         app.logger.error(f"Error updating trade {trade_id}: {e}")
@@ -202,47 +699,88 @@ def delete_trade(trade_id):
     
     # Delete associated image files and records
     for image in trade.images:
-        try:
-            image_path = os.path.join(app.config['UPLOAD_FOLDER'], image.image_path)
-            if os.path.exists(image_path):
-                os.remove(image_path)
-        except Exception as e:
-            app.logger.error(f"Error deleting image file {image.image_path}: {e}")
-        db.session.delete(image)
+        remove_image(image)
 
+    record_trade_change(old=trade_contribution(trade))
+    remove_trade_tags(trade.id)
     db.session.delete(trade)
+    refresh_trade_rollups(rollup_key(trade))
     db.session.commit()
+    result_cache.invalidate()
+    trade_serializer.forget([trade_id])
     return '', 204
 
-def upload_image_for_trade(file, trade_id, image_type, description, overwrite=False):
-    if file and allowed_file(file.filename):
+@app.route('/api/trades/batch', methods=['PATCH'])
+def batch_update_trades():
+    """
+    Sets the same fields on many trades in one transaction.
+    Body: {"ids": [...]} or {"filter": {instrument, order_type, tags, emotions, start, end}},
+    plus "set": {field: value}.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        values = batch_values(data.get('set'))
+        trade_ids = select_batch(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        updated = batch_update(trade_ids, values)
+        db.session.commit()
+        result_cache.invalidate()
+        return jsonify({'updated': updated, 'ids': trade_ids})
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error batch updating trades: {e}")
+        return jsonify({'error': f'Batch update failed, no trades were changed: {e}'}), 500
+
+@app.route('/api/trades/batch', methods=['DELETE'])
+def batch_delete_trades():
+    """
+    Deletes many trades, with their images, in one transaction.
+    Body: {"ids": [...]} or {"filter": {...}} as for the batch update.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        trade_ids = select_batch(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        deleted, released_files = batch_delete(trade_ids)
+        for relative_path in released_files:
+            unlink_after_commit(relative_path)
+        db.session.commit()
+        result_cache.invalidate()
+        trade_serializer.forget(trade_ids)
+        return jsonify({'deleted': deleted, 'ids': trade_ids})
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error batch deleting trades: {e}")
+        return jsonify({'error': f'Batch delete failed, no trades were deleted: {e}'}), 500
+
+def upload_image_for_trade(staged, trade_id, image_type, description, overwrite=False):
+    if staged is not None:
         # If overwriting, delete the old image of the same type
         if overwrite:
             old_image = TradeImage.query.filter_by(trade_id=trade_id, image_type=image_type).first()
+            if old_image and old_image.content_hash == staged.sha256:
+                # Same bytes: keep the stored image and its blob reference
+                old_image.description = description
+                return old_image
             if old_image:
-                try:
-                    old_image_path = os.path.join(app.config['UPLOAD_FOLDER'], old_image.image_path)
-                    if os.path.exists(old_image_path):
-                        os.remove(old_image_path)
-                except Exception as e:
-                    app.logger.error(f"Error deleting old image file {old_image.image_path}: {e}")
-                db.session.delete(old_image)
-
-        filename = secure_filename(file.filename)
-        unique_filename = f"{uuid.uuid4()}_{filename}"
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-        file.save(file_path)
-        
-        image = TradeImage(
-            trade_id=trade_id,
-            image_path=unique_filename,
-            image_type=image_type,
-            description=description
-        )
-        db.session.add(image)
+                remove_image(old_image)
+
+        return store_image(staged, trade_id, image_type, description)
 
 @app.route('/api/trades/<int:trade_id>/images', methods=['POST'])
 def upload_trade_image(trade_id):
+    """
+    Attaches an image to a trade, replacing the one of the same type. Takes a
+    multipart `image` file, or JSON {"upload_id", "image_type", "description"}
+    for a finished resumable upload (/api/uploads).
+    """
+    if request.is_json:
+        return attach_uploaded_image(trade_id)
+
     if 'image' not in request.files:
         return jsonify({'error': 'No image file provided'}), 400
     
@@ -250,60 +788,181 @@ def upload_trade_image(trade_id):
     if file.filename == '':
         return jsonify({'error': 'No selected file'}), 400
     
-    if file and allowed_file(file.filename):
+    staged = stage_image(file)
+    if staged is None:
+        return jsonify({'error': 'Invalid file type'}), 400
+    try:
         image_type = request.form.get('image_type', 'ENTRY')
         description = request.form.get('description', '')
 
-        # Find and delete the old image of the same type, if it exists
-        old_image = TradeImage.query.filter_by(trade_id=trade_id, image_type=image_type).first()
-        if old_image:
-            try:
-                old_image_path = os.path.join(app.config['UPLOAD_FOLDER'], old_image.image_path)
-                if os.path.exists(old_image_path):
-                    os.remove(old_image_path)
-            except Exception as e:
-                app.logger.error(f"Error deleting old image file {old_image.image_path}: {e}")
-            db.session.delete(old_image)
-
-        # Save the new image
-        filename = secure_filename(file.filename)
-        unique_filename = f"{uuid.uuid4()}_{filename}"
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-        file.save(file_path)
+        # Find and delete the old image of the same type, then save the new
+        # image (deduplicated) and its database record
+        new_image = upload_image_for_trade(staged, trade_id, image_type, description, overwrite=True)
+        db.session.commit()
+        result_cache.invalidate()
         
-        # Create a new database record for the new image
-        new_image = TradeImage(
-            trade_id=trade_id,
-            image_path=unique_filename,
-            image_type=image_type,
-            description=description
+        return jsonify(new_image.to_dict()), 201
+    finally:
+        discard_staged(staged)
+
+def attach_uploaded_image(trade_id):
+    data = request.get_json(silent=True) or {}
+    upload_id = str(data.get('upload_id') or '')
+    try:
+        upload = upload_sessions.status(upload_id)
+    except KeyError:
+        return jsonify({'error': f'Unknown upload: {upload_id}'}), 404
+    if db.session.get(Trade, trade_id) is None:
+        return jsonify({'error': f'Trade {trade_id} not found'}), 404
+    try:
+        with request_metrics.image_io('store'):
+            staged = upload_sessions.stage(upload_id, upload['filename'].rsplit('.', 1)[1].lower())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        new_image = upload_image_for_trade(
+            staged, trade_id, data.get('image_type', 'ENTRY'), data.get('description', ''), overwrite=True
         )
-        db.session.add(new_image)
         db.session.commit()
-        
+        result_cache.invalidate()
         return jsonify(new_image.to_dict()), 201
-    
-    return jsonify({'error': 'Invalid file type'}), 400
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error attaching upload {upload_id} to trade {trade_id}: {e}")
+        return jsonify({'error': f'Failed to attach the upload: {e}'}), 500
+    finally:
+        # The file was moved into the store (or rolled back); the session is done either way
+        upload_sessions.discard(upload_id)
+
+@app.route('/api/uploads', methods=['POST'])
+def create_upload():
+    """
+    Opens a resumable image upload. Body: {"filename": "chart.png", "size": bytes}
+    (size optional). Send the file with PATCH /api/uploads/<upload_id>.
+    """
+    data = request.get_json(silent=True) or {}
+    filename = str(data.get('filename') or '')
+    if not allowed_file(filename):
+        return jsonify({'error': 'Invalid file type'}), 400
+    size = data.get('size')
+    if size is not None and (not isinstance(size, int) or isinstance(size, bool)):
+        return jsonify({'error': 'size must be an integer number of bytes'}), 400
+    try:
+        upload = upload_sessions.create(filename, size)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(upload), 201
+
+@app.route('/api/uploads/<upload_id>', methods=['GET'])
+def get_upload(upload_id):
+    """Upload progress; `offset` is where to resume after an interrupted chunk."""
+    try:
+        upload = upload_sessions.status(upload_id)
+    except KeyError:
+        return jsonify({'error': f'Unknown upload: {upload_id}'}), 404
+    response = jsonify(upload)
+    response.headers['Upload-Offset'] = str(upload['offset'])
+    return response
+
+@app.route('/api/uploads/<upload_id>', methods=['PATCH'])
+def append_upload(upload_id):
+    """
+    Appends the raw request body (application/octet-stream) to an upload. The
+    Upload-Offset header must equal the bytes received so far.
+    """
+    offset = request.headers.get('Upload-Offset', type=int)
+    if offset is None:
+        return jsonify({'error': 'Upload-Offset header is required'}), 400
+    try:
+        upload = upload_sessions.append(upload_id, offset, request.stream)
+    except KeyError:
+        return jsonify({'error': f'Unknown upload: {upload_id}'}), 404
+    except UploadOffsetMismatch as e:
+        return jsonify({'error': str(e), 'offset': e.offset}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 413
+    response = jsonify(upload)
+    response.headers['Upload-Offset'] = str(upload['offset'])
+    return response
+
+@app.route('/api/uploads/<upload_id>', methods=['DELETE'])
+def delete_upload(upload_id):
+    try:
+        upload_sessions.status(upload_id)
+    except KeyError:
+        return jsonify({'error': f'Unknown upload: {upload_id}'}), 404
+    upload_sessions.discard(upload_id)
+    return '', 204
 
 @app.route('/api/trades/<int:trade_id>/images', methods=['GET'])
 def get_trade_images(trade_id):
     images = TradeImage.query.filter_by(trade_id=trade_id).all()
     return jsonify([image.to_dict() for image in images])
 
-@app.route('/images/<filename>')
+def send_upload(filename):
+    """Serves an upload, or its resized derivative when `size=thumb|medium` is given."""
+    size = request.args.get('size')
+    if size and size not in DERIVATIVE_SIZES:
+        return jsonify({'error': f'Unknown size: {size}'}), 400
+    # Paths escaping the upload folder are refused before anything touches the disk
+    if safe_join(app.config['UPLOAD_FOLDER'], filename) is None:
+        return jsonify({'error': f'Unknown file: {filename}'}), 404
+
+    # Content-addressed files never change, so their hash is a strong ETag and
+    # revalidations are answered without touching the disk.
+    content_hash = content_hash_of(filename)
+    etag = f"{content_hash}-{size or 'original'}" if content_hash else None
+    if etag and etag in request.if_none_match:
+        response = make_response('', 304)
+    else:
+        response = None
+        if size:
+            derivative = derivative_worker.existing_derivative(filename, size)
+            if derivative:
+                with request_metrics.image_io('send'):
+                    response = send_from_directory(os.path.dirname(derivative), os.path.basename(derivative))
+            else:
+                # Not generated yet (queue was full, or the upload predates derivatives):
+                # serve the original this time and build the derivative in the background.
+                # The original must not be cached under the derivative URL.
+                if os.path.isfile(os.path.join(app.config['UPLOAD_FOLDER'], filename)):
+                    derivative_worker.enqueue(filename)
+                etag = None
+        if response is None:
+            with request_metrics.image_io('send'):
+                response = send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+
+    if etag:
+        response.set_etag(etag)
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    return response
+
+@app.route('/images/<path:filename>')
 def get_image(filename):
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    return send_upload(filename)
 
-@app.route('/uploads/<filename>')
+@app.route('/uploads/<path:filename>')
 def uploaded_file(filename):
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    return send_upload(filename)
+
+@app.route('/api/instruments')
+def get_instruments():
+    """Instrument specs of the P&L engine, for the trade form's net profit / R preview."""
+    return jsonify({'instruments': INSTRUMENT_SPECS})
 
 @app.route('/api/statistics', methods=['GET'])
+@cached_result(result_cache, 'statistics')
+@journal_etag
 def get_statistics():
-    trades = Trade.query.all()
-    total_trades = len(trades)
+    # Served from the materialized per-instrument/month totals, not the trades table
+    totals = journal_totals()
+    total_trades = totals['trade_count']
 
-    if not trades:
+    if not total_trades:
         return jsonify({
             'total_trades': 0,
             'win_rate': 0,
@@ -312,18 +971,15 @@ def get_statistics():
         })
 
     # Base calculations on objective net_profit, not user-selected status
-    winning_trades = [t for t in trades if t.net_profit > 0]
-    losing_trades = [t for t in trades if t.net_profit < 0]
-
-    win_count = len(winning_trades)
-    loss_count = len(losing_trades)
+    win_count = totals['win_count']
+    loss_count = totals['loss_count']
     
     # Win Rate is based on all trades taken
     win_rate = win_count / total_trades if total_trades > 0 else 0
     loss_rate = loss_count / total_trades if total_trades > 0 else 0
 
-    gross_profit = sum(t.net_profit for t in winning_trades)
-    gross_loss = abs(sum(t.net_profit for t in losing_trades))
+    gross_profit = totals['gross_profit']
+    gross_loss = abs(totals['gross_loss'])
     
     profit_factor = gross_profit / gross_loss if gross_loss > 0 else 0
 
@@ -340,6 +996,8 @@ def get_statistics():
     })
 
 @app.route('/api/trades/weekly', methods=['GET'])
+@cached_result(result_cache, 'weekly')
+@journal_etag
 def get_weekly_trades():
     week_offset = request.args.get('week_offset', default=0, type=int)
     
@@ -350,6 +1008,9 @@ def get_weekly_trades():
     # Calculate start and end of the target week
     start_of_week = start_of_current_week - timedelta(weeks=week_offset)
     end_of_week = start_of_week + timedelta(days=6)
+
+    if request.args.get('summary_only', '').lower() in ('1', 'true', 'yes'):
+        return jsonify(weekly_summary(start_of_week, end_of_week))
     
     # Get trades for the calculated week
     trades = Trade.query.filter(
@@ -378,18 +1039,97 @@ def get_weekly_trades():
         "days": list(trades_by_day.values())
     })
 
+def rollup_totals(rollup):
+    if rollup is None:
+        return dict.fromkeys(ROLLUP_FIELDS, 0)
+    return {field: getattr(rollup, field) for field in ROLLUP_FIELDS}
+
+def weekly_summary(start_of_week, end_of_week):
+    """Per-day and whole-week totals of a week, read from the rollups without touching trades."""
+    day_rollups = {rollup.period_start: rollup for rollup in period_rollups('day', start_of_week, end_of_week)}
+    week_rollups = period_rollups('week', start_of_week, start_of_week)
+    days = []
+    for i in range(7):
+        current_day = start_of_week + timedelta(days=i)
+        days.append(dict(date=current_day.isoformat(), **rollup_totals(day_rollups.get(current_day.strftime('%Y-%m-%d')))))
+    return {
+        "week_start": start_of_week.isoformat(),
+        "week_end": end_of_week.isoformat(),
+        "summary": rollup_totals(week_rollups[0] if week_rollups else None),
+        "days": days
+    }
+
+@app.route('/api/rollups', methods=['GET'])
+@cached_result(result_cache, 'rollups')
+@journal_etag
+def get_rollups():
+    """
+    Precomputed totals per period: period=day|week|month (default month),
+    optional start / end (YYYY-MM-DD, on the period start) and instrument
+    (default: all instruments together).
+    """
+    period = request.args.get('period', 'month')
+    if period not in ROLLUP_PERIODS:
+        return jsonify({'error': f'period must be one of: {", ".join(ROLLUP_PERIODS)}'}), 400
+    try:
+        start = parse_date_filter(request.args.get('start'))
+        end = parse_date_filter(request.args.get('end'))
+    except ValueError:
+        return jsonify({'error': 'Invalid date filter. Please use YYYY-MM-DD.'}), 400
+    rollups = period_rollups(period, start, end, request.args.get('instrument') or ALL_INSTRUMENTS)
+    return jsonify([rollup.to_dict() for rollup in rollups])
+
+@app.route('/api/_cache', methods=['GET'])
+def get_cache_stats():
+    """Hit / miss / eviction counters of the in-process result cache."""
+    return jsonify(result_cache.stats())
+
+@app.route('/api/_ready', methods=['GET'])
+def get_ready():
+    """Readiness probe: answers once the schema checks have run and the server accepts requests."""
+    return jsonify({'status': 'ready'})
+
+@app.route('/api/_metrics', methods=['GET'])
+def get_metrics():
+    """Request, SQL and image I/O metrics in Prometheus text format (TRADING_JOURNAL_METRICS=1)."""
+    if not request_metrics.installed:
+        return jsonify({'error': 'Metrics are disabled. Start the app with TRADING_JOURNAL_METRICS=1.'}), 404
+    stats = {'result_cache': result_cache.stats(), 'trade_json_cache': trade_serializer.stats()}
+    return Response(request_metrics.render(stats), mimetype='text/plain; version=0.0.4')
+
 @app.route('/advanced-analysis')
 def advanced_analysis_page():
     """Renders the advanced analysis page."""
     return render_template('advanced_analysis.html')
 
 @app.route('/api/advanced-analysis')
+@cached_result(result_cache, 'advanced-analysis')
+@journal_etag
 def get_advanced_analysis_data():
-    """Provides the data for the advanced analysis page."""
+    """
+    Provides the data for the advanced analysis page.
+    `max_points` downsamples the equity and drawdown series (LTTB) for charting.
+    Optional filters: instrument, order_type (comma separated, any of),
+    tags, emotions (comma separated, all of), start, end (entry date).
+    """
+    # NumPy-backed kernels are imported on first use to keep startup fast
+    from utils.analytics import load_columns, equity_series
+    from utils.downsample import downsample_series
+
+    max_points = request.args.get('max_points', type=int)
+    if max_points is not None and max_points < 3:
+        return jsonify({'error': 'max_points must be at least 3'}), 400
+    try:
+        conditions = filter_conditions(request.args)
+    except ValueError:
+        return jsonify({'error': 'Invalid date filter. Please use YYYY-MM-DD or YYYY-MM-DDTHH:MM.'}), 400
     try:
-        trades = Trade.query.order_by(Trade.entry_datetime.asc()).all()
+        # Order-independent metrics come from the materialized totals, or from
+        # a single aggregate query over the matching trades when filtered
+        totals = filtered_totals(conditions) if conditions else journal_totals()
+        total_trades = totals['trade_count']
 
-        if not trades:
+        if not total_trades:
             # Return a default empty structure if no trades exist
             return jsonify({
                 'metrics': {'winRate': 0, 'riskReward': 0, 'avgWinLoss': 0, 'profitFactor': 0, 'tradeCount': 0, 'avgDuration': 'N/A', 'maxWinStreak': 0, 'maxLossStreak': 0, 'kellyCriterion': 0, 'expectancy': 0},
@@ -397,18 +1137,14 @@ def get_advanced_analysis_data():
             })
 
         # --- METRICS CALCULATION ---
-        winning_trades = [t for t in trades if t.net_profit > 0]
-        losing_trades = [t for t in trades if t.net_profit < 0]
-
-        total_trades = len(trades)
-        win_count = len(winning_trades)
-        loss_count = len(losing_trades)
+        win_count = totals['win_count']
+        loss_count = totals['loss_count']
         
         win_rate = (win_count / total_trades * 100) if total_trades > 0 else 0
         loss_rate = 100 - win_rate
         
-        gross_profit = sum(t.net_profit for t in winning_trades)
-        gross_loss = abs(sum(t.net_profit for t in losing_trades))
+        gross_profit = totals['gross_profit']
+        gross_loss = abs(totals['gross_loss'])
         
         avg_win = gross_profit / win_count if win_count > 0 else 0
         avg_loss = gross_loss / loss_count if loss_count > 0 else 0
@@ -418,70 +1154,29 @@ def get_advanced_analysis_data():
         expectancy = (win_rate / 100 * avg_win) - (loss_rate / 100 * avg_loss)
 
         # --- NEW METRICS CALCULATION ---
-        total_duration_seconds = sum((t.exit_datetime - t.entry_datetime).total_seconds() for t in trades)
-        avg_duration_seconds = total_duration_seconds / total_trades if total_trades > 0 else 0
+        avg_duration_seconds = totals['duration_seconds'] / total_trades if total_trades > 0 else 0
         days, remainder = divmod(avg_duration_seconds, 86400)
         hours, remainder = divmod(remainder, 3600)
         minutes, _ = divmod(remainder, 60)
         avg_duration_str = f"{int(days)}d {int(hours)}h {int(minutes)}m"
 
-        max_win_streak, current_win_streak = 0, 0
-        max_loss_streak, current_loss_streak = 0, 0
-        for t in trades:
-            if t.net_profit > 0:
-                current_win_streak += 1
-                current_loss_streak = 0
-            elif t.net_profit < 0:
-                current_loss_streak += 1
-                current_win_streak = 0
-            else:
-                current_win_streak = 0
-                current_loss_streak = 0
-            max_win_streak = max(max_win_streak, current_win_streak)
-            max_loss_streak = max(max_loss_streak, current_loss_streak)
-
         kelly_criterion = (win_rate / 100) - ((loss_rate / 100) / risk_reward_ratio) if risk_reward_ratio > 0 else 0
-        
+
+        # --- ORDER-DEPENDENT SERIES ---
+        # Streaks, equity and drawdown depend on trade order, so they are computed
+        # by the vectorized kernel over just the two columns they need.
+        columns = load_columns(['dates', 'net_profit'], db.and_(*conditions) if conditions else None)
+        series = equity_series(columns)
+        max_win_streak, max_loss_streak = series['max_win_streak'], series['max_loss_streak']
+        dates, equity_curve, drawdown_data = series['dates'], series['equity_curve'], series['drawdown']
+        equity_labels, equity_curve = downsample_series(dates, equity_curve, max_points)
+        drawdown_labels, drawdown_data = downsample_series(dates, drawdown_data, max_points)
+
         # --- CHARTS DATA PREPARATION ---
-        dates, equity_curve, drawdown_data = [], [], []
-        current_equity, peak_equity = 0, 0
-        r_multiples = []
-        monthly_performance = defaultdict(float)
-
-        for trade in trades:
-            # Equity, Drawdown, Dates
-            current_equity += trade.net_profit
-            equity_curve.append(current_equity)
-            if current_equity > peak_equity:
-                peak_equity = current_equity
-            drawdown = ((peak_equity - current_equity) / peak_equity * 100) if peak_equity > 0 else 0
-            drawdown_data.append(drawdown)
-            dates.append(trade.entry_datetime.strftime('%Y-%m-%d'))
-            
-            # R-Multiple
-            initial_risk_money = abs(trade.entry_price - trade.initial_stop_loss) * trade.position_size * 100000 # Simplified
-            if initial_risk_money > 0:
-                r_multiples.append(trade.net_profit / initial_risk_money)
-
-            # Monthly Performance
-            month_key = trade.entry_datetime.strftime('%Y-%m')
-            monthly_performance[month_key] += trade.net_profit
-
-        # Bin R-multiples
-        r_bins = {"<-2R": 0, "-2R to -1R": 0, "-1R to 0R": 0, "0R to 1R": 0, "1R to 2R": 0, ">2R": 0}
-        for r in r_multiples:
-            if r <= -2: r_bins["<-2R"] += 1
-            elif -2 < r <= -1: r_bins["-2R to -1R"] += 1
-            elif -1 < r < 0: r_bins["-1R to 0R"] += 1
-            elif 0 <= r < 1: r_bins["0R to 1R"] += 1
-            elif 1 <= r < 2: r_bins["1R to 2R"] += 1
-            else: r_bins[">2R"] += 1
+        r_dist_labels, r_dist_data = list(R_BIN_LABELS), [totals[column] for column in R_BIN_COLUMNS]
         
-        r_dist_labels, r_dist_data = list(r_bins.keys()), list(r_bins.values())
-        
-        # Finalize Monthly Performance data
-        sorted_months = sorted(monthly_performance.keys())
-        monthly_labels, monthly_data = sorted_months, [monthly_performance[m] for m in sorted_months]
+        monthly = filtered_monthly(conditions) if conditions else monthly_net_profit()
+        monthly_labels, monthly_data = [month for month, _ in monthly], [profit for _, profit in monthly]
 
         return jsonify({
             'metrics': {
@@ -491,10 +1186,10 @@ def get_advanced_analysis_data():
                 'kellyCriterion': round(kelly_criterion * 100, 2), 'expectancy': round(expectancy, 2)
             },
             'charts': {
-                'equityCurve': {'labels': dates, 'data': equity_curve},
+                'equityCurve': {'labels': equity_labels, 'data': equity_curve},
                 'winLossDistribution': {'wins': win_count, 'losses': loss_count},
                 'monthlyPerformance': {'labels': monthly_labels, 'data': monthly_data},
-                'drawdownAnalysis': {'labels': dates, 'data': drawdown_data},
+                'drawdownAnalysis': {'labels': drawdown_labels, 'data': drawdown_data},
                 'rMultipleDistribution': {'labels': r_dist_labels, 'data': r_dist_data}
             }
         })
@@ -502,18 +1197,107 @@ def get_advanced_analysis_data():
         app.logger.error(f"Error in advanced analysis endpoint: {e}")
         return jsonify({'error': 'Failed to generate analysis data'}), 500
 
+@app.route('/api/advanced-analysis/groups')
+@cached_result(result_cache, 'advanced-analysis-groups')
+@journal_etag
+def get_advanced_analysis_groups():
+    """
+    Per-group metrics for `group_by` (instrument, order_type, tag, emotion or month),
+    computed in one GROUP BY query. Accepts the same filters as /api/advanced-analysis.
+    A trade with several tags or emotions counts towards each of its groups.
+    """
+    group_by = request.args.get('group_by', 'instrument')
+    if group_by not in GROUP_BY_DIMENSIONS:
+        return jsonify({'error': f'group_by must be one of: {", ".join(GROUP_BY_DIMENSIONS)}'}), 400
+    try:
+        conditions = filter_conditions(request.args)
+    except ValueError:
+        return jsonify({'error': 'Invalid date filter. Please use YYYY-MM-DD or YYYY-MM-DDTHH:MM.'}), 400
+    try:
+        groups = [
+            dict(group=group, **summary_metrics(totals))
+            for group, totals in grouped_totals(group_by, conditions)
+        ]
+        return jsonify({'groupBy': group_by, 'groups': groups})
+    except Exception as e:
+        app.logger.error(f"Error in advanced analysis groups endpoint: {e}")
+        return jsonify({'error': 'Failed to generate grouped analysis data'}), 500
+
+@app.route('/api/advanced-analysis/rolling')
+@cached_result(result_cache, 'advanced-analysis-rolling')
+@journal_etag
+def get_advanced_analysis_rolling():
+    """
+    Rolling win rate, expectancy and profit factor over the last `window`
+    trades, rolling Sharpe / Sortino of daily P&L over the last `window_days`
+    days, the underwater curve, max drawdown duration and time under water.
+    `step` / `day_step` sample every n-th window (default: about `max_points`
+    points per series). Accepts the same filters as /api/advanced-analysis.
+    """
+    from utils.rolling import load_trade_days, rolling_series
+
+    window = request.args.get('window', 50, type=int)
+    window_days = request.args.get('window_days', 30, type=int)
+    step = request.args.get('step', type=int)
+    day_step = request.args.get('day_step', type=int)
+    max_points = request.args.get('max_points', 1000, type=int)
+    if window < 1 or window_days < 2:
+        return jsonify({'error': 'window must be at least 1 and window_days at least 2'}), 400
+    if (step is not None and step < 1) or (day_step is not None and day_step < 1) or max_points < 3:
+        return jsonify({'error': 'step and day_step must be at least 1, max_points at least 3'}), 400
+    try:
+        conditions = filter_conditions(request.args)
+    except ValueError:
+        return jsonify({'error': 'Invalid date filter. Please use YYYY-MM-DD or YYYY-MM-DDTHH:MM.'}), 400
+    try:
+        days, net_profit = load_trade_days(db.and_(*conditions) if conditions else None)
+        return json_response(rolling_series(
+            days, net_profit, window, window_days,
+            step=step, day_step=day_step, max_points=max_points
+        ))
+    except Exception as e:
+        app.logger.error(f"Error in rolling analysis endpoint: {e}")
+        return jsonify({'error': 'Failed to generate rolling analysis data'}), 500
+
+def wait_for_server(base_url, timeout=30, interval=0.02):
+    """Blocks until GET /api/_ready answers 200; returns False after `timeout` seconds."""
+    # The local server is polled directly, never through an HTTP(S)_PROXY from the environment
+    opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with opener.open(f'{base_url}/api/_ready', timeout=1) as response:
+                if response.status == 200:
+                    return True
+        except OSError:
+            pass
+        time.sleep(interval)
+    return False
+
 if __name__ == '__main__':
+    host, port = app.config['SERVER_HOST'], app.config['SERVER_PORT']
+
     # The `run_app` function will be the target for our thread
     def run_app():
-        # Using waitress as a production-ready server
+        # Using waitress as a production-ready server, imported only when serving
         from waitress import serve
-        serve(app, host='127.0.0.1', port=5000)
+        serve(app, host=host, port=port, threads=app.config['SERVER_THREADS'])
+
+    # --server-only serves the API without a window (headless use, benchmarks/bench_startup.py)
+    if '--server-only' in sys.argv:
+        run_app()
+        raise SystemExit(0)
 
     # We start the Flask server in a separate thread, so it doesn't block the GUI
     server_thread = threading.Thread(target=run_app)
     server_thread.daemon = True
     server_thread.start()
 
-    # Create and start the pywebview window
-    webview.create_window('Trading Journal', 'http://127.0.0.1:5000', width=1280, height=800)
-    webview.start()
\ No newline at end of file
+    # pywebview pulls in the platform GUI toolkit; import it only for the desktop window,
+    # and open the window once the server reports ready instead of racing it
+    import webview
+    base_url = f'http://{host}:{port}'
+    if not wait_for_server(base_url):
+        app.logger.error(f"Server did not become ready at {base_url}")
+    webview.create_window('Trading Journal', base_url, width=1280, height=800)
+    webview.start()
@@ -0,0 +1,84 @@
+"""
+Benchmarks the vectorized analytics kernel (utils/analytics.py) against the
+original per-trade Python loops of get_advanced_analysis_data. Only the
+equity curve, drawdown and streaks are computed per request; the R-multiple
+distribution and monthly totals are read from the materialized aggregates.
+
+Usage: python benchmarks/bench_analytics.py [sizes...]   (default: 10000 100000 1000000)
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.analytics import equity_and_drawdown, max_streaks
+
+def make_columns(size, seed=42):
+    """Synthetic journal columns with a realistic mix of wins, losses and breakevens."""
+    rng = np.random.default_rng(seed)
+    net_profit = np.round(rng.normal(15, 250, size), 2)
+    net_profit[rng.random(size) < 0.05] = 0
+    day_offsets = np.sort(rng.integers(0, 3650, size))
+    dates = (np.datetime64('2015-01-01') + day_offsets).astype(str)
+    return {'dates': dates.tolist(), 'net_profit': net_profit}
+
+def reference(columns):
+    """The original pure-Python loops, over plain lists."""
+    net_profit = columns['net_profit'].tolist()
+
+    max_win_streak, current_win_streak = 0, 0
+    max_loss_streak, current_loss_streak = 0, 0
+    equity_curve, drawdown_data = [], []
+    current_equity, peak_equity = 0, 0
+    for profit in net_profit:
+        if profit > 0:
+            current_win_streak += 1
+            current_loss_streak = 0
+        elif profit < 0:
+            current_loss_streak += 1
+            current_win_streak = 0
+        else:
+            current_win_streak = 0
+            current_loss_streak = 0
+        max_win_streak = max(max_win_streak, current_win_streak)
+        max_loss_streak = max(max_loss_streak, current_loss_streak)
+
+        current_equity += profit
+        equity_curve.append(current_equity)
+        if current_equity > peak_equity:
+            peak_equity = current_equity
+        drawdown_data.append(((peak_equity - current_equity) / peak_equity * 100) if peak_equity > 0 else 0)
+    return equity_curve, drawdown_data, (max_win_streak, max_loss_streak)
+
+def vectorized(columns):
+    net_profit = columns['net_profit']
+    equity_curve, drawdown_data = equity_and_drawdown(net_profit)
+    return equity_curve, drawdown_data, max_streaks(net_profit)
+
+def check_same(expected, actual):
+    equity_a, drawdown_a, streaks_a = expected
+    equity_b, drawdown_b, streaks_b = actual
+    assert equity_a == equity_b, 'equity curve differs'
+    assert drawdown_a == drawdown_b, 'drawdown differs'
+    assert streaks_a == streaks_b, 'streaks differ'
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000]
+    print(f"{'trades':>10} {'python (s)':>12} {'numpy (s)':>12} {'speedup':>9}")
+    for size in sizes:
+        columns = make_columns(size)
+        expected, python_time = timed(reference, columns)
+        actual, numpy_time = timed(vectorized, columns)
+        check_same(expected, actual)
+        print(f"{size:>10} {python_time:>12.4f} {numpy_time:>12.4f} {python_time / numpy_time:>8.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Concurrent read/write load test against a real waitress server.
+
+Runs the same workload once per SQLite profile ('default' and 'performance'),
+each in a fresh temporary instance folder, and reports request throughput and
+'database is locked' failures.
+
+Usage: python benchmarks/bench_concurrency.py [--seconds 10] [--readers 6] [--writers 2] [--seed-trades 2000]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+READ_PATHS = ['/api/statistics', '/api/advanced-analysis?max_points=500', '/api/trades/weekly?week_offset=0', '/api/trades?limit=100']
+
+def trade_form(i):
+    entry = datetime.now() - timedelta(hours=i % 2000)
+    return urllib.parse.urlencode({
+        'entry_datetime': entry.isoformat(timespec='minutes'),
+        'exit_datetime': (entry + timedelta(minutes=30)).isoformat(timespec='minutes'),
+        'instrument': 'EUR/USD', 'order_type': 'BUY', 'entry_price': 1.1, 'exit_price': 1.102,
+        'initial_stop_loss': 1.098, 'initial_take_profit': 1.105, 'position_size': 0.1,
+        'status': 'WIN' if i % 3 else 'LOSS', 'net_profit': 20 if i % 3 else -20, 'r_value': 1
+    }).encode()
+
+def worker(base_url, deadline, is_writer, index, results):
+    counts = {'ok': 0, 'errors': 0, 'locked': 0}
+    i = index * 1000000
+    while time.perf_counter() < deadline:
+        i += 1
+        if is_writer:
+            request = urllib.request.Request(base_url + '/api/trades', data=trade_form(i), method='POST')
+        else:
+            request = urllib.request.Request(base_url + READ_PATHS[i % len(READ_PATHS)])
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                response.read()
+            counts['ok'] += 1
+        except urllib.error.HTTPError as e:
+            body = e.read().decode(errors='replace')
+            counts['locked' if 'database is locked' in body else 'errors'] += 1
+        except OSError:
+            counts['errors'] += 1
+    results.append((is_writer, counts))
+
+def run_profile(args):
+    """Runs inside the child process: starts waitress and drives the workload."""
+    sys.path.insert(0, ROOT)
+    from waitress.server import create_server
+    from app import app
+
+    seed_client = app.test_client()
+    for i in range(args.seed_trades):
+        seed_client.post('/api/trades', data=trade_form(i), content_type='application/x-www-form-urlencoded')
+
+    server = create_server(app, host='127.0.0.1', port=0, threads=app.config['SERVER_THREADS'])
+    threading.Thread(target=server.run, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.effective_port}"
+
+    results = []
+    deadline = time.perf_counter() + args.seconds
+    threads = [
+        threading.Thread(target=worker, args=(base_url, deadline, n < args.writers, n, results))
+        for n in range(args.readers + args.writers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    server.close()
+
+    report = {'profile': app.config['SQLITE_PROFILE'], 'reads': 0, 'writes': 0, 'errors': 0, 'locked': 0}
+    for is_writer, counts in results:
+        report['writes' if is_writer else 'reads'] += counts['ok']
+        report['errors'] += counts['errors']
+        report['locked'] += counts['locked']
+    report['reads_per_second'] = round(report['reads'] / args.seconds, 1)
+    report['writes_per_second'] = round(report['writes'] / args.seconds, 1)
+    print(json.dumps(report))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--readers', type=int, default=6)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seed-trades', type=int, default=2000)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_profile(args)
+        return
+
+    for profile in ('default', 'performance'):
+        with tempfile.TemporaryDirectory() as instance:
+            env = dict(os.environ, TRADING_JOURNAL_INSTANCE=instance, TRADING_JOURNAL_SQLITE_PROFILE=profile)
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--child'] + sys.argv[1:],
+                env=env, capture_output=True, text=True, check=True
+            ).stdout
+            print(output.strip().splitlines()[-1])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Times every journal API endpoint against generated journals of several sizes
+and writes a JSON report that can be compared between runs.
+
+Usage:
+    python benchmarks/bench_endpoints.py [--sizes 1000 100000 1000000] [--repeat 5]
+        [--output report.json] [--compare previous_report.json]
+
+Each size runs in its own process with a scratch instance folder
+(TRADING_JOURNAL_INSTANCE), filled by generate_fake_data.generate().
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENDPOINTS = [
+    '/api/trades',
+    '/api/trades?limit=100',
+    '/api/trades/weekly?week_offset=0',
+    '/api/trades/weekly?week_offset=4',
+    '/api/statistics',
+    '/api/advanced-analysis',
+    '/api/advanced-analysis?max_points=1000',
+    '/api/advanced-analysis/rolling?window=50&window_days=30',
+]
+
+def time_endpoints(size, repeat, images_per_trade):
+    """Runs inside the child process for one journal size."""
+    sys.path.insert(0, ROOT)
+    import generate_fake_data
+    from app import app, rebuild_aggregates, rebuild_rollups, rebuild_tag_index, result_cache
+
+    generate_seconds = generate_fake_data.generate(
+        db_file=os.path.join(os.environ['TRADING_JOURNAL_INSTANCE'], 'trading_journal.db'),
+        num_trades=size, days=max(180, size // 50), images_per_trade=images_per_trade, seed=42
+    )
+    # generate() writes the trades table only; build every derived table the endpoints read
+    with app.app_context():
+        rebuild_aggregates()
+        rebuild_rollups()
+        rebuild_tag_index()
+
+    client = app.test_client()
+    results = {}
+    for endpoint in ENDPOINTS:
+        # min / median / max time the uncached work (what --compare reports),
+        # cached_median_ms the repeats answered from the result cache
+        timings, cached_timings = [], []
+        for _ in range(repeat):
+            result_cache.invalidate()
+            start = time.perf_counter()
+            response = client.get(endpoint)
+            body = response.get_data()
+            timings.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            client.get(endpoint).get_data()
+            cached_timings.append(time.perf_counter() - start)
+        results[endpoint] = {
+            'status': response.status_code,
+            'bytes': len(body),
+            'min_ms': round(min(timings) * 1000, 2),
+            'median_ms': round(statistics.median(timings) * 1000, 2),
+            'max_ms': round(max(timings) * 1000, 2),
+            'cached_median_ms': round(statistics.median(cached_timings) * 1000, 2)
+        }
+    return {'generate_seconds': round(generate_seconds, 2), 'endpoints': results}
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(report, previous):
+    """Prints the median latency ratio of every endpoint against an older report."""
+    print(f"\n{'size':>9}  {'endpoint':<40} {'before':>10} {'after':>10} {'ratio':>7}")
+    for size, result in report['results'].items():
+        old = previous['results'].get(size)
+        if not old:
+            continue
+        for endpoint, timing in result['endpoints'].items():
+            before = old['endpoints'].get(endpoint)
+            if not before:
+                continue
+            ratio = timing['median_ms'] / before['median_ms'] if before['median_ms'] else float('inf')
+            print(f"{size:>9}  {endpoint:<40} {before['median_ms']:>10.2f} {timing['median_ms']:>10.2f} {ratio:>6.2f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the trading journal API endpoints.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--images-per-trade', type=int, default=1)
+    parser.add_argument('--output', default='bench_report.json')
+    parser.add_argument('--compare', help='Earlier report to compare median latencies against.')
+    parser.add_argument('--child-size', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child_size:
+        print(json.dumps(time_endpoints(args.child_size, args.repeat, args.images_per_trade)))
+        return
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'repeat': args.repeat
+        },
+        'results': {}
+    }
+    for size in args.sizes:
+        print(f"Benchmarking {size} trades...", flush=True)
+        with tempfile.TemporaryDirectory() as instance:
+            env = dict(os.environ, TRADING_JOURNAL_INSTANCE=instance)
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--child-size', str(size),
+                 '--repeat', str(args.repeat), '--images-per-trade', str(args.images_per_trade)],
+                env=env, capture_output=True, text=True, check=True
+            ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        report['results'][str(size)] = result
+        for endpoint, timing in result['endpoints'].items():
+            print(f"  {endpoint:<40} {timing['median_ms']:>10.2f} ms  {timing.get('cached_median_ms', 0):>8.2f} ms cached  "
+                  f"{timing['bytes']:>12} bytes")
+
+    with open(args.output, 'w') as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"Report written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as previous_file:
+            compare(report, json.load(previous_file))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmarks the full trade list encoding (GET /api/trades): ORM objects +
+Trade.to_dict() + jsonify against Core rows + utils/serializer.py, cold and
+with the per-trade cache warm, with orjson and with the stdlib fallback.
+
+Usage: python benchmarks/bench_serialization.py [sizes...]   (default: 10000 100000)
+
+Each size runs on a scratch journal filled by generate_fake_data.generate().
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPEAT = 3
+
+def best_of(function):
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        body = function()
+        timings.append(time.perf_counter() - start)
+    return min(timings), statistics.median(timings), len(body)
+
+def run(size):
+    """Runs inside the child process for one journal size."""
+    sys.path.insert(0, ROOT)
+    import generate_fake_data
+    from flask import jsonify
+    from app import app, db
+    from models.trade import Trade
+    from utils import serializer
+    from utils.serializer import TradeSerializer, trade_rows, image_dicts
+
+    generate_fake_data.generate(
+        db_file=os.path.join(os.environ['TRADING_JOURNAL_INSTANCE'], 'trading_journal.db'),
+        num_trades=size, days=max(180, size // 50), images_per_trade=1, seed=42
+    )
+
+    def orm_to_dict():
+        with app.test_request_context():
+            trades = Trade.query.order_by(Trade.entry_datetime.desc()).all()
+            body = jsonify([trade.to_dict() for trade in trades]).get_data()
+            db.session.remove()
+            return body
+
+    def core_rows(cache):
+        def encode():
+            with app.app_context():
+                return cache.encode_trades(trade_rows(Trade.entry_datetime.desc()), image_dicts())
+        return encode
+
+    expected = json.loads(orm_to_dict())
+    results = {'orm_to_dict': best_of(orm_to_dict)}
+    backend = serializer.orjson
+    for name, module in (('orjson', backend), ('stdlib', None)):
+        if name == 'orjson' and backend is None:
+            continue
+        serializer.orjson = module
+        # The fast path must produce the same document
+        assert json.loads(core_rows(TradeSerializer(max_entries=size))()) == expected
+        results[f'core_{name}_cold'] = best_of(lambda: core_rows(TradeSerializer(max_entries=size))())
+        warm = TradeSerializer(max_entries=size)
+        core_rows(warm)()
+        results[f'core_{name}_warm'] = best_of(core_rows(warm))
+    serializer.orjson = backend
+
+    baseline = results['orm_to_dict'][0]
+    print(f'\n{size} trades')
+    for name, (best, median, length) in results.items():
+        print(f'  {name:<20} best {best * 1000:9.1f} ms  median {median * 1000:9.1f} ms  '
+              f'{length / 1e6:6.1f} MB  {baseline / best:5.1f}x')
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == '--child-size':
+        run(int(sys.argv[2]))
+        return
+    sizes = [int(size) for size in sys.argv[1:]] or [10000, 100000]
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as instance:
+            env = dict(os.environ, TRADING_JOURNAL_INSTANCE=instance)
+            subprocess.run([sys.executable, os.path.abspath(__file__), '--child-size', str(size)], env=env, check=True)
+
+if __name__ == '__main__':
+    main()
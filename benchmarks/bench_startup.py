@@ -0,0 +1,100 @@
+"""
+Measures cold start of the journal: how long importing app.py takes (split
+into the framework imports and the app's own import + startup checks), and
+how long a launched server takes to accept connections and to serve the
+first page, which is what the desktop window waits for before painting.
+
+Usage:
+    python benchmarks/bench_startup.py [--repeat 5] [--instance DIR]
+        [--command "dist/TradingJournal/TradingJournal --server-only"]
+
+Without --instance an empty scratch instance folder is used; a first untimed
+start creates its schema, so the runs measure an existing journal.
+--command times a built executable instead of `python app.py --server-only`.
+"""
+import argparse
+import json
+import os
+import shlex
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FRAMEWORKS = ('flask', 'flask_cors', 'flask_sqlalchemy', 'sqlalchemy')
+IMPORT_PROBE = f"""
+import json, time
+start = time.perf_counter()
+for name in {FRAMEWORKS!r}:
+    __import__(name)
+frameworks = time.perf_counter()
+import app
+done = time.perf_counter()
+print(json.dumps({{'frameworks': frameworks - start, 'app': done - frameworks, 'total': done - start}}))
+"""
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+def time_import(env):
+    """Import timings from a fresh interpreter, in seconds."""
+    output = subprocess.run(
+        [sys.executable, '-c', IMPORT_PROBE], cwd=ROOT, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def poll(url, deadline):
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                response.read()
+                return time.perf_counter()
+        except OSError:
+            time.sleep(0.005)
+    raise TimeoutError(f'No answer from {url}')
+
+def time_launch(command, env, timeout=120):
+    """Seconds from process launch until /api/_ready answers and until / is served."""
+    port = free_port()
+    env = dict(env, TRADING_JOURNAL_PORT=str(port))
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        ready = poll(f'http://127.0.0.1:{port}/api/_ready', start + timeout)
+        first_page = poll(f'http://127.0.0.1:{port}/', start + timeout)
+    finally:
+        process.terminate()
+        process.wait()
+    return {'ready': ready - start, 'first_page': first_page - start}
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the journal cold start.')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--instance', help='Instance folder to start against (default: an empty scratch one).')
+    parser.add_argument('--command', help='Launch command to time instead of `python app.py --server-only`.')
+    args = parser.parse_args()
+    command = shlex.split(args.command) if args.command else [sys.executable, 'app.py', '--server-only']
+
+    timings = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        env = dict(os.environ, TRADING_JOURNAL_INSTANCE=args.instance or scratch)
+        time_launch(command, env)
+        for _ in range(args.repeat):
+            if not args.command:
+                for phase, seconds in time_import(env).items():
+                    timings.setdefault(f'import_{phase}', []).append(seconds)
+            for phase, seconds in time_launch(command, env).items():
+                timings.setdefault(f'launch_{phase}', []).append(seconds)
+
+    print(f"{'phase':<20} {'median ms':>10} {'min ms':>10}")
+    for phase, values in timings.items():
+        print(f'{phase:<20} {statistics.median(values) * 1000:10.1f} {min(values) * 1000:10.1f}')
+
+if __name__ == '__main__':
+    main()
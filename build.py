@@ -1,4 +1,5 @@
 import PyInstaller.__main__
+import argparse
 import os
 import shutil
 
@@ -11,16 +12,25 @@ def get_path(path):
     """
     return os.path.join(os.path.dirname(__file__), path)
 
+# Build profiles:
+# onefile - a single executable, unpacked to a temp dir on every launch (slower start)
+# onedir  - a folder with the executable next to its libraries, starts without unpacking
+BUILD_PROFILES = ('onefile', 'onedir')
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=f'Build the {APP_NAME} desktop app with PyInstaller.')
+    parser.add_argument('--profile', choices=BUILD_PROFILES, default='onefile')
+    args = parser.parse_args()
+
     # Define the PyInstaller command
     # --noconfirm: Overwrite output without asking
-    # --onefile: Create a single executable file
+    # --onefile / --onedir: Single executable or folder build (see BUILD_PROFILES)
     # --windowed: Do not create a console window
     # --add-data: Bundle data files (templates, static)
     pyinstaller_command = [
         'app.py',
         '--noconfirm',
-        '--onefile',
+        f'--{args.profile}',
         '--windowed',
         f'--name={APP_NAME}',
         f'--add-data={get_path("templates")}{os.pathsep}templates',
@@ -33,4 +43,5 @@ if __name__ == '__main__':
     PyInstaller.__main__.run(pyinstaller_command)
 
     print("\n\nBuild complete.")
-    print(f"Executable is located in the '{get_path('dist')}' folder.") 
\ No newline at end of file
+    location = get_path('dist') if args.profile == 'onefile' else os.path.join(get_path('dist'), APP_NAME)
+    print(f"Executable is located in the '{location}' folder.") 
\ No newline at end of file
@@ -1,55 +1,72 @@
+import argparse
+import hashlib
+import math
 import sqlite3
 import random
+import time
 from datetime import datetime, timedelta
 import os
 
+from utils.instruments import instrument_spec, derived_values
+
 # --- Configuration ---
-DB_FILE = os.path.join('instance', 'trading_journal.db')
-NUM_TRADES = 100  # Number of fake trades to generate
-START_DATE = datetime.now() - timedelta(days=180) # Trades over the last 6 months
+DEFAULT_DB_FILE = os.path.join(os.environ.get('TRADING_JOURNAL_INSTANCE') or 'instance', 'trading_journal.db')
+DEFAULT_NUM_TRADES = 100  # Number of fake trades to generate
+DEFAULT_DAYS = 180  # Trades over the last 6 months
+DEFAULT_INSTRUMENTS = ['EUR/USD', 'GBP/USD', 'USD/JPY', 'AUD/USD', 'XAU/USD']
+BATCH_SIZE = 10000
+# Entry price ranges of instruments not priced like a forex pair
+PRICE_RANGES = {'XAU/USD': (1800, 2400), 'XAG/USD': (20, 30)}
+
+# Smallest valid PNG (1x1 transparent pixel), shared by every generated image row
+PLACEHOLDER_PNG = bytes.fromhex(
+    '89504e470d0a1a0a0000000d4948445200000001000000010806000000'
+    '1f15c4890000000d49444154789c6360000002000100e221bc330000000049454e44ae426082'
+)
+# Stored like any deduplicated upload: one blob, referenced by every generated image row
+PLACEHOLDER_SHA256 = hashlib.sha256(PLACEHOLDER_PNG).hexdigest()
+PLACEHOLDER_IMAGE = f"{PLACEHOLDER_SHA256[:2]}/{PLACEHOLDER_SHA256[2:4]}/{PLACEHOLDER_SHA256}.png"
+
+TRADE_COLUMNS = [
+    'entry_datetime', 'exit_datetime', 'instrument', 'order_type',
+    'entry_price', 'exit_price', 'initial_stop_loss', 'initial_take_profit',
+    'position_size', 'status', 'net_profit', 'r_value',
+    'rationale', 'review', 'emotions', 'tags', 'created_at', 'updated_at'
+]
 
-def get_db_connection():
+def get_db_connection(db_file):
     """Establishes a connection to the SQLite database."""
-    if not os.path.exists('instance'):
-        os.makedirs('instance')
-    conn = sqlite3.connect(DB_FILE)
+    os.makedirs(os.path.dirname(db_file) or '.', exist_ok=True)
+    conn = sqlite3.connect(db_file)
     conn.row_factory = sqlite3.Row
     return conn
 
-def calculate_profit(entry_price, exit_price, position_size, order_type, instrument):
-    """Calculates net profit based on trade parameters."""
-    pip_size = 0.01 if 'jpy' in instrument.lower() else 0.0001
-    pip_value_per_lot = 10  # For USD quoted pairs
+def sqlite_datetime(value):
+    """Formats a datetime the way SQLAlchemy stores it in SQLite."""
+    return value.isoformat(sep=' ', timespec='microseconds')
 
-    if order_type.upper() == 'BUY':
-        pips = (exit_price - entry_price) / pip_size
-    else:  # SELL
-        pips = (entry_price - exit_price) / pip_size
-        
-    profit = pips * pip_value_per_lot * position_size
-    return round(profit, 2)
-
-def create_fake_trade(trade_id):
+def create_fake_trade(rng, start_date, days, instruments, created_at):
     """Generates a single fake trade with realistic and consistent data."""
-    instrument = random.choice(['EUR/USD', 'GBP/USD', 'USD/JPY', 'AUD/USD', 'XAU/USD'])
-    order_type = random.choice(['BUY', 'SELL'])
-    status = random.choice(['WIN', 'LOSS', 'BREAKEVEN'])
+    instrument = rng.choice(instruments)
+    order_type = rng.choice(['BUY', 'SELL'])
+    status = rng.choice(['WIN', 'LOSS', 'BREAKEVEN'])
     
-    entry_datetime = START_DATE + timedelta(
-        days=random.randint(0, 179),
-        hours=random.randint(0, 23),
-        minutes=random.randint(0, 59)
+    entry_datetime = start_date + timedelta(
+        days=rng.randint(0, days - 1),
+        hours=rng.randint(0, 23),
+        minutes=rng.randint(0, 59)
     )
-    exit_datetime = entry_datetime + timedelta(minutes=random.randint(5, 240))
+    exit_datetime = entry_datetime + timedelta(minutes=rng.randint(5, 240))
 
-    pip_size = 0.01 if 'jpy' in instrument.lower() else 0.0001
-    price_decimals = 2 if 'jpy' in instrument.lower() else 4
-    
-    entry_price = round(random.uniform(1.05, 1.35) if 'jpy' not in instrument.lower() else random.uniform(100, 150), price_decimals)
-    position_size = round(random.choice([0.01, 0.02, 0.05, 0.1, 0.5, 1.0]), 2)
+    pip_size = instrument_spec(instrument)['pip_size']
+    price_decimals = round(-math.log10(pip_size))
+    low, high = PRICE_RANGES.get(instrument, (100, 150) if pip_size == 0.01 else (1.05, 1.35))
+
+    entry_price = round(rng.uniform(low, high), price_decimals)
+    position_size = round(rng.choice([0.01, 0.02, 0.05, 0.1, 0.5, 1.0]), 2)
     
     # Determine exit price based on status
-    pips_moved = random.randint(5, 150) * pip_size
+    pips_moved = rng.randint(5, 150) * pip_size
     
     if status == 'WIN':
         exit_price = entry_price + pips_moved if order_type == 'BUY' else entry_price - pips_moved
@@ -61,72 +78,147 @@ def create_fake_trade(trade_id):
     exit_price = round(exit_price, price_decimals)
     
     # Set logical SL/TP
-    sl_pips = random.randint(10, 50) * pip_size
-    tp_pips = random.randint(20, 200) * pip_size
+    sl_pips = rng.randint(10, 50) * pip_size
+    tp_pips = rng.randint(20, 200) * pip_size
     
     stop_loss = entry_price - sl_pips if order_type == 'BUY' else entry_price + sl_pips
     take_profit = entry_price + tp_pips if order_type == 'BUY' else entry_price - tp_pips
     
-    net_profit = calculate_profit(entry_price, exit_price, position_size, order_type, instrument)
+    derived = derived_values({
+        'instrument': instrument, 'order_type': order_type, 'entry_price': entry_price,
+        'exit_price': exit_price, 'initial_stop_loss': round(stop_loss, price_decimals), 'position_size': position_size
+    })
 
     return (
-        entry_datetime, exit_datetime, instrument, order_type,
+        sqlite_datetime(entry_datetime), sqlite_datetime(exit_datetime), instrument, order_type,
         entry_price, exit_price, round(stop_loss, price_decimals), round(take_profit, price_decimals),
-        position_size, status, net_profit,
-        round(net_profit / (sl_pips / pip_size * 10 * position_size) if sl_pips > 0 and position_size > 0 else 0, 2), # R-value
+        position_size, status, derived['net_profit'], derived['r_value'],
         "This is a generated rationale for the trade setup.",
         "This is a generated review of the trade outcome.",
-        random.choice(["Confident", "Anxious", "Neutral", "Greedy"]),
-        random.choice(["Trend Following", "Breakout", "Scalping", "News Trade"])
+        rng.choice(["Confident", "Anxious", "Neutral", "Greedy"]),
+        rng.choice(["Trend Following", "Breakout", "Scalping", "News Trade"]),
+        created_at, created_at
     )
 
-def main():
-    """Main function to clear existing trades and populate the database."""
-    print(f"Connecting to database: {DB_FILE}")
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def clear_data(cursor):
+    """Removes existing trades, images and their sequences."""
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='sqlite_sequence'")
+    has_sequence_table = cursor.fetchone()
 
-    try:
-        # Check if sqlite_sequence table exists
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='sqlite_sequence'")
-        has_sequence_table = cursor.fetchone()
-
-        print("Clearing existing data from 'trades' table...")
-        cursor.execute("DELETE FROM trades")
-        if has_sequence_table:
-            cursor.execute("DELETE FROM sqlite_sequence WHERE name = 'trades'")
-        
-        # Check if trade_image table exists before trying to clear it
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='trade_image'")
+    # Images and tag index rows reference trades and blobs, clear them first
+    for table in ('trade_images', 'image_blobs', 'trade_tags', 'trades'):
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table,))
         if cursor.fetchone():
-            print("Clearing existing data from 'trade_image' table...")
-            cursor.execute("DELETE FROM trade_image")
+            print(f"Clearing existing data from '{table}' table...")
+            cursor.execute(f"DELETE FROM {table}")
             if has_sequence_table:
-                cursor.execute("DELETE FROM sqlite_sequence WHERE name = 'trade_image'")
-
-        print("Existing data cleared.")
-
-        print(f"Generating and inserting {NUM_TRADES} fake trades...")
-        for i in range(NUM_TRADES):
-            trade_data = create_fake_trade(i + 1)
-            cursor.execute("""
-                INSERT INTO trades (
-                    entry_datetime, exit_datetime, instrument, order_type,
-                    entry_price, exit_price, initial_stop_loss, initial_take_profit,
-                    position_size, status, net_profit, r_value,
-                    rationale, review, emotions, tags
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, trade_data)
-        
+                cursor.execute("DELETE FROM sqlite_sequence WHERE name = ?", (table,))
+
+def generate(db_file=DEFAULT_DB_FILE, num_trades=DEFAULT_NUM_TRADES, days=DEFAULT_DAYS,
+             instruments=None, images_per_trade=0, seed=None, clear=True, upload_folder=None):
+    """
+    Bulk-inserts `num_trades` fake trades (and optional image rows) in batched
+    executemany calls inside a single transaction. Returns the elapsed seconds.
+    The tables must already exist (start the app once to create them).
+    """
+    rng = random.Random(seed)
+    instruments = instruments or DEFAULT_INSTRUMENTS
+    unlisted = [name for name in instruments if instrument_spec(name) is None]
+    if unlisted:
+        raise ValueError(f'No instrument spec for {", ".join(unlisted)} (see utils/instruments.py)')
+    start_date = datetime.now() - timedelta(days=days)
+    created_at = sqlite_datetime(datetime.utcnow())
+    started = time.perf_counter()
+
+    conn = get_db_connection(db_file)
+    cursor = conn.cursor()
+    # Generation is a disposable bulk load: skip per-commit fsyncs
+    cursor.execute("PRAGMA synchronous = OFF")
+    try:
+        if clear:
+            clear_data(cursor)
+
+        if images_per_trade:
+            upload_folder = upload_folder or os.path.join(os.path.dirname(db_file), 'uploads')
+            placeholder_path = os.path.join(upload_folder, PLACEHOLDER_IMAGE)
+            os.makedirs(os.path.dirname(placeholder_path), exist_ok=True)
+            with open(placeholder_path, 'wb') as placeholder:
+                placeholder.write(PLACEHOLDER_PNG)
+            cursor.execute(
+                "INSERT OR IGNORE INTO image_blobs (sha256, image_path, size, ref_count, created_at) VALUES (?, ?, ?, 0, ?)",
+                (PLACEHOLDER_SHA256, PLACEHOLDER_IMAGE, len(PLACEHOLDER_PNG), created_at)
+            )
+            cursor.execute(
+                "UPDATE image_blobs SET ref_count = ref_count + ? WHERE sha256 = ?",
+                (num_trades * images_per_trade, PLACEHOLDER_SHA256)
+            )
+
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM trades")
+        next_id = cursor.fetchone()[0] + 1
+
+        print(f"Generating and inserting {num_trades} fake trades...")
+        insert_trade = (
+            f"INSERT INTO trades (id, {', '.join(TRADE_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * (len(TRADE_COLUMNS) + 1))})"
+        )
+        insert_image = (
+            "INSERT INTO trade_images (trade_id, image_path, content_hash, image_type, description, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)"
+        )
+        insert_tag = "INSERT INTO trade_tags (trade_id, kind, name) VALUES (?, ?, ?)"
+        emotions_index, tags_index = TRADE_COLUMNS.index('emotions'), TRADE_COLUMNS.index('tags')
+        for batch_start in range(0, num_trades, BATCH_SIZE):
+            batch_ids = range(next_id + batch_start, next_id + min(batch_start + BATCH_SIZE, num_trades))
+            batch = [
+                (trade_id,) + create_fake_trade(rng, start_date, days, instruments, created_at)
+                for trade_id in batch_ids
+            ]
+            cursor.executemany(insert_trade, batch)
+            # Keep the tag / emotion search index in step (one value of each per fake trade)
+            cursor.executemany(insert_tag, (
+                (row[0], kind, row[index + 1].lower())
+                for row in batch for kind, index in (('emotion', emotions_index), ('tag', tags_index))
+            ))
+            if images_per_trade:
+                cursor.executemany(insert_image, (
+                    (trade_id, PLACEHOLDER_IMAGE, PLACEHOLDER_SHA256, 'ENTRY' if n % 2 == 0 else 'EXIT', 'Generated chart', created_at)
+                    for trade_id in batch_ids for n in range(images_per_trade)
+                ))
+
         conn.commit()
-        print(f"Successfully inserted {NUM_TRADES} new fake trades.")
+        elapsed = time.perf_counter() - started
+        print(f"Successfully inserted {num_trades} new fake trades in {elapsed:.2f}s.")
+        return elapsed
 
     except sqlite3.Error as e:
         print(f"An error occurred: {e}")
         conn.rollback()
+        raise
     finally:
         conn.close()
         print("Database connection closed.")
 
+def main():
+    """Parses the command line and populates the database."""
+    parser = argparse.ArgumentParser(description='Populate the trading journal with fake trades.')
+    parser.add_argument('--trades', type=int, default=DEFAULT_NUM_TRADES, help='Number of trades to generate.')
+    parser.add_argument('--days', type=int, default=DEFAULT_DAYS, help='Spread trades over this many past days.')
+    parser.add_argument('--instruments', default=','.join(DEFAULT_INSTRUMENTS), help='Comma separated instrument mix.')
+    parser.add_argument('--images-per-trade', type=int, default=0, help='Image rows per trade (placeholder file).')
+    parser.add_argument('--seed', type=int, help='Random seed for reproducible data.')
+    parser.add_argument('--db', default=DEFAULT_DB_FILE, help='SQLite database file.')
+    parser.add_argument('--append', action='store_true', help='Keep existing trades instead of clearing them.')
+    args = parser.parse_args()
+
+    print(f"Connecting to database: {args.db}")
+    try:
+        generate(
+            db_file=args.db, num_trades=args.trades, days=args.days,
+            instruments=[name.strip() for name in args.instruments.split(',') if name.strip()],
+            images_per_trade=args.images_per_trade, seed=args.seed, clear=not args.append
+        )
+    except sqlite3.Error:
+        raise SystemExit(1)
+
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,21 @@
+from models import db
+from datetime import datetime
+
+class ImageBlob(db.Model):
+    """A stored image file, keyed by the SHA-256 of its content and shared by every TradeImage using it."""
+    __tablename__ = 'image_blobs'
+
+    sha256 = db.Column(db.String(64), primary_key=True)
+    image_path = db.Column(db.String(255), nullable=False)  # Relative to UPLOAD_FOLDER, e.g. ab/cd/<sha256>.png
+    size = db.Column(db.Integer, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'sha256': self.sha256,
+            'image_path': self.image_path,
+            'size': self.size,
+            'ref_count': self.ref_count,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
@@ -0,0 +1,17 @@
+from models import db
+
+class JournalVersion(db.Model):
+    """
+    Single-row change counter for the journal. SQLite triggers (see
+    utils/migrations.py) bump it on every update or delete of trades and
+    trade_images, whichever process makes the change. Inserts show up in
+    max(id), which utils/http_cache.journal_version() adds to the stamp.
+    """
+    __tablename__ = 'journal_version'
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    # Fingerprint of the schema last applied by utils/migrations.upgrade_schema()
+    schema_hash = db.Column(db.String(64))
+    # journal_version() stamp at which the startup drift checks last passed
+    checked_version = db.Column(db.String(64))
@@ -24,8 +24,16 @@ class Trade(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
-    # Relationship with TradeImage
-    images = db.relationship('TradeImage', backref='trade', lazy=True)
+    __table_args__ = (
+        # Every list orders by entry_datetime (with id as the keyset tie-breaker)
+        # and the weekly view range-scans it.
+        db.Index('ix_trades_entry_datetime_id', 'entry_datetime', 'id'),
+        db.Index('ix_trades_instrument_entry_datetime', 'instrument', 'entry_datetime'),
+    )
+
+    # Relationship with TradeImage. Loaded with one batched `IN` query per result
+    # set instead of one SELECT per trade, so listing N trades costs constant queries.
+    images = db.relationship('TradeImage', backref='trade', lazy='selectin')
 
     def to_dict(self):
         return {
@@ -0,0 +1,38 @@
+from models import db
+
+class TradeAggregate(db.Model):
+    """Running totals per instrument and month, maintained on every trade write."""
+    __tablename__ = 'trade_aggregates'
+
+    id = db.Column(db.Integer, primary_key=True)
+    instrument = db.Column(db.String(50), nullable=False)
+    month = db.Column(db.String(7), nullable=False)  # YYYY-MM of entry_datetime
+    trade_count = db.Column(db.Integer, nullable=False, default=0)
+    win_count = db.Column(db.Integer, nullable=False, default=0)
+    loss_count = db.Column(db.Integer, nullable=False, default=0)
+    gross_profit = db.Column(db.Float, nullable=False, default=0)
+    gross_loss = db.Column(db.Float, nullable=False, default=0)  # Stored as a positive amount
+    net_profit = db.Column(db.Float, nullable=False, default=0)
+    duration_seconds = db.Column(db.Float, nullable=False, default=0)
+    # R-multiple histogram buckets, matching the advanced analysis chart
+    r_lt_neg2 = db.Column(db.Integer, nullable=False, default=0)
+    r_neg2_neg1 = db.Column(db.Integer, nullable=False, default=0)
+    r_neg1_0 = db.Column(db.Integer, nullable=False, default=0)
+    r_0_1 = db.Column(db.Integer, nullable=False, default=0)
+    r_1_2 = db.Column(db.Integer, nullable=False, default=0)
+    r_gt_2 = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (db.UniqueConstraint('instrument', 'month', name='uq_trade_aggregates_instrument_month'),)
+
+    def to_dict(self):
+        return {
+            'instrument': self.instrument,
+            'month': self.month,
+            'trade_count': self.trade_count,
+            'win_count': self.win_count,
+            'loss_count': self.loss_count,
+            'gross_profit': self.gross_profit,
+            'gross_loss': self.gross_loss,
+            'net_profit': self.net_profit,
+            'duration_seconds': self.duration_seconds
+        }
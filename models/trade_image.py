@@ -7,15 +7,21 @@ class TradeImage(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     trade_id = db.Column(db.Integer, db.ForeignKey('trades.id'), nullable=False)
     image_path = db.Column(db.String(255), nullable=False)
+    # SHA-256 of the shared ImageBlob; NULL for uploads made before deduplication
+    content_hash = db.Column(db.String(64), db.ForeignKey('image_blobs.sha256'))
     image_type = db.Column(db.String(20), nullable=False)  # ENTRY or EXIT
     description = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Image replacement looks images up by (trade_id, image_type)
+    __table_args__ = (db.Index('ix_trade_images_trade_id_image_type', 'trade_id', 'image_type'),)
+
     def to_dict(self):
         return {
             'id': self.id,
             'trade_id': self.trade_id,
             'image_path': self.image_path,
+            'content_hash': self.content_hash,
             'image_type': self.image_type,
             'description': self.description,
             'created_at': self.created_at.isoformat()
@@ -0,0 +1,46 @@
+from models import db
+
+class TradeRollup(db.Model):
+    """
+    Per-period totals (day, ISO week, month) for each instrument, plus one
+    row per period for all instruments together (instrument '*').
+    Day rows are rebuilt from trades; weeks and months are composed from days.
+    """
+    __tablename__ = 'trade_rollups'
+
+    id = db.Column(db.Integer, primary_key=True)
+    period = db.Column(db.String(5), nullable=False)  # day, week or month
+    period_start = db.Column(db.String(10), nullable=False)  # YYYY-MM-DD; weeks start on Monday
+    instrument = db.Column(db.String(50), nullable=False)
+    trade_count = db.Column(db.Integer, nullable=False, default=0)
+    win_count = db.Column(db.Integer, nullable=False, default=0)
+    loss_count = db.Column(db.Integer, nullable=False, default=0)
+    gross_profit = db.Column(db.Float, nullable=False, default=0)
+    gross_loss = db.Column(db.Float, nullable=False, default=0)  # Stored as a positive amount
+    net_profit = db.Column(db.Float, nullable=False, default=0)
+    # Cumulative P&L within the period, starting from 0: its highest and lowest
+    # points and the deepest fall from a running peak
+    peak_equity = db.Column(db.Float, nullable=False, default=0)
+    low_equity = db.Column(db.Float, nullable=False, default=0)
+    max_drawdown = db.Column(db.Float, nullable=False, default=0)
+
+    __table_args__ = (
+        # Calendar reads are range scans over one period kind and instrument
+        db.UniqueConstraint('period', 'instrument', 'period_start', name='uq_trade_rollups_period_instrument_start'),
+    )
+
+    def to_dict(self):
+        return {
+            'period': self.period,
+            'period_start': self.period_start,
+            'instrument': self.instrument,
+            'trade_count': self.trade_count,
+            'win_count': self.win_count,
+            'loss_count': self.loss_count,
+            'gross_profit': self.gross_profit,
+            'gross_loss': self.gross_loss,
+            'net_profit': self.net_profit,
+            'peak_equity': self.peak_equity,
+            'low_equity': self.low_equity,
+            'max_drawdown': self.max_drawdown
+        }
@@ -0,0 +1,26 @@
+from models import db
+
+class TradeTag(db.Model):
+    """
+    Normalized index of the comma separated Trade.tags / Trade.emotions text,
+    one row per (trade, kind, name), so filtering never needs a LIKE scan.
+    """
+    __tablename__ = 'trade_tags'
+
+    id = db.Column(db.Integer, primary_key=True)
+    trade_id = db.Column(db.Integer, db.ForeignKey('trades.id'), nullable=False)
+    kind = db.Column(db.String(10), nullable=False)  # tag or emotion
+    name = db.Column(db.String(100), nullable=False)  # Trimmed and lower-cased
+
+    __table_args__ = (
+        # Lookups go name -> trades; the trade_id column makes them covering
+        db.Index('ix_trade_tags_kind_name_trade_id', 'kind', 'name', 'trade_id'),
+        db.Index('ix_trade_tags_trade_id', 'trade_id'),
+    )
+
+    def to_dict(self):
+        return {
+            'trade_id': self.trade_id,
+            'kind': self.kind,
+            'name': self.name
+        }
@@ -4,6 +4,7 @@
 let trades = [];
 let statistics = {};
 let currentWeekOffset = 0;
+let instrumentSpecs = {};
 
 // DOM Elements
 const tradesTableBody = document.getElementById('tradesTableBody');
@@ -19,6 +20,7 @@ document.addEventListener('DOMContentLoaded', () => {
     setupEventListeners();
     loadWeeklyTrades();
     loadStatistics();
+    loadInstrumentSpecs();
 });
 
 // Event Listeners
@@ -80,7 +82,7 @@ function setupEventListeners() {
 
     // --- Net Profit Calculation Logic ---
     const tradeForm = document.getElementById('addTradeForm');
-    const fieldsForCalculation = ['entry_price', 'exit_price', 'position_size', 'order_type'];
+    const fieldsForCalculation = ['instrument', 'entry_price', 'exit_price', 'initial_stop_loss', 'position_size', 'order_type'];
     fieldsForCalculation.forEach(fieldName => {
         const input = tradeForm.querySelector(`[name="${fieldName}"]`);
         if (input) {
@@ -120,6 +122,16 @@ async function loadStatistics() {
     }
 }
 
+// Load the instrument specs the server computes net profit / R-value with
+async function loadInstrumentSpecs() {
+    try {
+        const response = await fetch('/api/instruments');
+        instrumentSpecs = (await response.json()).instruments;
+    } catch (error) {
+        console.error('Error loading instrument specs:', error);
+    }
+}
+
 // Load weekly trades
 async function loadWeeklyTrades() {
     try {
@@ -267,7 +279,9 @@ function showTradeDetail(trade) {
             if (container) {
                 container.innerHTML += `
                     <div class="trade-image-item">
-                        <img src="/uploads/${img.image_path}" class="img-fluid" alt="Trade image">
+                        <a href="/uploads/${img.image_path}" target="_blank">
+                            <img src="/uploads/${img.image_path}?size=medium" class="img-fluid" alt="Trade image" loading="lazy">
+                        </a>
                         <p class="small text-muted mt-1">${img.description || ''}</p>
                     </div>
                 `;
@@ -367,6 +381,7 @@ async function editTrade(tradeId) {
     // Calculated fields
     form.querySelector('[name="net_profit"]').value = trade.net_profit || '';
     form.querySelector('[name="r_value"]').value = trade.r_value || '';
+    calculateNetProfit();
 
     const modal = new bootstrap.Modal(document.getElementById('addTradeModal'));
     modal.show();
@@ -480,48 +495,37 @@ function formatDate(dateStr) {
     });
 }
 
+// Preview of the server's P&L engine (utils/instruments.py). Instruments
+// without a spec are not computed: their net profit and R-value are entered.
 function calculateNetProfit() {
     const form = document.getElementById('addTradeForm');
-    const entryPriceInput = form.querySelector('[name="entry_price"]');
-    const entryPrice = parseFloat(entryPriceInput.value);
-    const exitPrice = parseFloat(form.querySelector('[name="exit_price"]').value);
-    const positionSize = parseFloat(form.querySelector('[name="position_size"]').value);
-    const orderType = form.querySelector('[name="order_type"]').value;
+    const value = (name) => parseFloat(form.querySelector(`[name="${name}"]`).value);
     const netProfitInput = form.querySelector('[name="net_profit"]');
+    const rValueInput = form.querySelector('[name="r_value"]');
+    const instrument = form.querySelector('[name="instrument"]').value.trim().toUpperCase();
+    const orderType = form.querySelector('[name="order_type"]').value.toUpperCase();
+    const spec = instrumentSpecs[instrument];
 
-    if (isNaN(entryPrice) || isNaN(exitPrice) || isNaN(positionSize) || !orderType || !entryPriceInput.value) {
-        netProfitInput.value = '';
+    netProfitInput.readOnly = rValueInput.readOnly = Boolean(spec);
+    if (!spec) {
         return;
     }
 
-    // Dynamically determine pip size by inspecting the entry price's decimal places.
-    const getPipSize = (priceString) => {
-        if (priceString.includes('.')) {
-            const decimalPlaces = priceString.split('.')[1].length;
-            // Instruments like JPY pairs typically have 2 or 3 decimal places.
-            if (decimalPlaces <= 3) {
-                return 0.01;
-            }
-        }
-        // Most other pairs have 4 or 5 decimal places (the 5th being a pipette).
-        return 0.0001;
-    };
-
-    const pipSize = getPipSize(entryPriceInput.value);
-
-    // The value of 1 pip for 1 standard lot (100,000 units) for a USD-quoted pair.
-    const pipValuePerStandardLot = 10;
-
-    // Calculate the difference in pips
-    let pips = 0;
-    if (orderType.toUpperCase() === 'BUY') {
-        pips = (exitPrice - entryPrice) / pipSize;
-    } else if (orderType.toUpperCase() === 'SELL') {
-        pips = (entryPrice - exitPrice) / pipSize;
+    const entryPrice = value('entry_price');
+    const exitPrice = value('exit_price');
+    const positionSize = value('position_size');
+    if (isNaN(entryPrice) || isNaN(exitPrice) || isNaN(positionSize) || !orderType) {
+        netProfitInput.value = '';
+        rValueInput.value = '';
+        return;
     }
 
-    // Calculate net profit using the standard formula
-    const profit = pips * pipValuePerStandardLot * positionSize;
-
+    const direction = orderType === 'BUY' ? 1 : -1;
+    const pips = (exitPrice - entryPrice) * direction / spec.pip_size;
+    const profit = Math.round(pips * spec.pip_value * positionSize * 100) / 100;
     netProfitInput.value = profit.toFixed(2);
-} 
\ No newline at end of file
+
+    const stopLoss = value('initial_stop_loss');
+    const risk = Math.abs(entryPrice - stopLoss) / spec.pip_size * spec.pip_value * positionSize;
+    rValueInput.value = risk > 0 ? (profit / risk).toFixed(2) : '0.00';
+}
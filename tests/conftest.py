@@ -0,0 +1,48 @@
+"""
+Tests run the app against a scratch instance folder, set before app.py is
+imported (it creates the schema at import time).
+"""
+import io
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ['TRADING_JOURNAL_INSTANCE'] = tempfile.mkdtemp(prefix='trading-journal-tests-')
+
+import app as journal_app  # noqa: E402
+
+# Smallest valid PNG (1x1 transparent pixel)
+PNG_BYTES = bytes.fromhex(
+    '89504e470d0a1a0a0000000d4948445200000001000000010806000000'
+    '1f15c4890000000d49444154789c6360000002000100e221bc330000000049454e44ae426082'
+)
+
+TRADE_FORM = {
+    'entry_datetime': '2024-01-02T10:00', 'exit_datetime': '2024-01-02T12:00', 'instrument': 'EUR/USD',
+    'order_type': 'BUY', 'entry_price': '1.1000', 'exit_price': '1.1050', 'initial_stop_loss': '1.0950',
+    'initial_take_profit': '1.1100', 'position_size': '1', 'status': 'WIN', 'tags': 'Breakout', 'emotions': 'Calm'
+}
+
+@pytest.fixture
+def app():
+    return journal_app.app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def create_trade(client):
+    """Posts the trade form (with optional overrides / images) and returns the created trade."""
+    def create(images=None, **overrides):
+        data = dict(TRADE_FORM, **overrides)
+        for field, content in (images or {}).items():
+            data[field] = (io.BytesIO(content), f'{field}.png')
+        response = client.post('/api/trades', data=data, content_type='multipart/form-data')
+        assert response.status_code == 201, response.get_json()
+        return response.get_json()
+    return create
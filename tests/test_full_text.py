@@ -0,0 +1,20 @@
+import pytest
+
+from utils.full_text import highlight
+
+def test_highlight_escapes_note_text():
+    assert highlight('\x02pin\x03 bar <img src=x onerror=alert(1)>') == \
+        '<mark>pin</mark> bar &lt;img src=x onerror=alert(1)&gt;'
+
+def test_note_search_snippets_are_escaped(app, client, create_trade):
+    from utils.full_text import full_text_available
+    with app.app_context():
+        if not full_text_available():
+            pytest.skip('SQLite build without FTS5')
+    create_trade(rationale='Pinbar reversal <img src=x onerror=alert(1)> at support')
+    response = client.get('/api/trades/search/notes?q=reversal')
+    assert response.status_code == 200
+    snippet = response.get_json()['results'][0]['snippet']
+    assert '<img' not in snippet
+    assert '&lt;img' in snippet
+    assert '<mark>reversal</mark>' in snippet
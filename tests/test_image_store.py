@@ -0,0 +1,89 @@
+import io
+
+from tests.conftest import PNG_BYTES, journal_app
+
+def served(client, image):
+    """The image file is still there once released files have been unlinked."""
+    journal_app.unlink_queue.join()
+    return client.get(f"/uploads/{image['image_path']}").status_code == 200
+
+def test_replacing_image_with_same_bytes_keeps_it(client, create_trade):
+    trade = create_trade(images={'entry_image': PNG_BYTES})
+    response = client.post(
+        f"/api/trades/{trade['id']}/images",
+        data={'image': (io.BytesIO(PNG_BYTES), 'again.png'), 'image_type': 'ENTRY', 'description': 'same'},
+        content_type='multipart/form-data'
+    )
+    assert response.status_code == 201
+    assert response.get_json()['description'] == 'same'
+    images = client.get(f"/api/trades/{trade['id']}").get_json()['images']
+    assert len(images) == 1
+    assert served(client, images[0])
+
+def test_update_form_with_same_image_keeps_it(client, create_trade):
+    trade = create_trade(images={'entry_image': PNG_BYTES})
+    response = client.post(
+        f"/api/trades/update/{trade['id']}",
+        data={'entry_image': (io.BytesIO(PNG_BYTES), 'again.png')},
+        content_type='multipart/form-data'
+    )
+    assert response.status_code == 200
+    images = response.get_json()['images']
+    assert len(images) == 1
+    assert served(client, images[0])
+
+def test_released_blob_is_revived_in_same_transaction(app, client, create_trade):
+    """remove_image() then store_image() of the same bytes, as a replacement without the shortcut does."""
+    import hashlib
+    import os
+    import tempfile
+    from models import db
+    from models.image_blob import ImageBlob
+    from models.trade_image import TradeImage
+    from utils.image_store import StagedUpload
+
+    # Bytes no other test uses, so the blob has a single reference
+    trade = create_trade(images={'exit_image': PNG_BYTES + b'revive'})
+    content = trade['images'][0]
+    with app.app_context():
+        with open(os.path.join(app.config['UPLOAD_FOLDER'], content['image_path']), 'rb') as stored:
+            data = stored.read()
+        handle, temp_path = tempfile.mkstemp(dir=app.config['UPLOAD_FOLDER'], suffix='.upload')
+        with os.fdopen(handle, 'wb') as temp_file:
+            temp_file.write(data)
+        staged = StagedUpload(hashlib.sha256(data).hexdigest(), temp_path, len(data), 'png')
+
+        journal_app.remove_image(db.session.get(TradeImage, content['id']))
+        journal_app.store_image(staged, trade['id'], 'EXIT', None)
+        db.session.commit()
+        assert db.session.get(ImageBlob, staged.sha256).ref_count == 1
+        db.session.remove()
+
+    images = client.get(f"/api/trades/{trade['id']}").get_json()['images']
+    assert len(images) == 1
+    assert served(client, images[0])
+
+def test_file_reused_by_a_running_upload_is_not_unlinked(app, client, create_trade):
+    """A release committed elsewhere must not unlink a file an uncommitted upload reuses."""
+    import os
+    from models import db
+    from utils.image_store import place_staged, stage_stream, unlink_released
+
+    content = PNG_BYTES + b'reused'
+    trade = create_trade(images={'entry_image': content})
+    folder = app.config['UPLOAD_FOLDER']
+    unlinked = []
+    with app.app_context():
+        staged = stage_stream(folder, io.BytesIO(content), 'png')
+        path = place_staged(folder, staged)
+        assert path == trade['images'][0]['image_path']
+        # The unlink worker handling a release while the upload has not committed
+        assert not unlink_released(path, lambda relative_path: False, unlinked.append)
+        db.session.rollback()
+        db.session.remove()
+    assert unlinked == []
+    assert os.path.exists(os.path.join(folder, path))
+    # The rollback rechecked the file: the committed trade still uses it
+    assert served(client, trade['images'][0])
+    assert unlink_released(path, lambda relative_path: False, unlinked.append)
+    assert unlinked == [path]
@@ -0,0 +1,7 @@
+from utils.metrics import RequestMetrics
+from utils.serializer import TradeSerializer
+
+def test_cache_stats_are_exported_as_gauges():
+    text = RequestMetrics().render({'trade_json_cache': TradeSerializer(max_entries=10).stats()})
+    assert '# TYPE trading_journal_trade_json_cache_entries gauge' in text
+    assert 'trading_journal_trade_json_cache_max_entries 10' in text
@@ -0,0 +1,39 @@
+from datetime import date, timedelta
+
+import pytest
+
+from tests.conftest import PNG_BYTES
+from utils.query_counter import QueryCounter
+
+# The fixture trades are entered on 2024-01-02, in the week starting Monday 2024-01-01
+FIXTURE_WEEK_OFFSET = (date.today() - timedelta(days=date.today().weekday()) - date(2024, 1, 1)).days // 7
+
+def listed_trades(body):
+    """The trades of a list response, whichever shape the endpoint returns."""
+    if isinstance(body, list):
+        return body
+    if 'days' in body:
+        return [trade for day in body['days'] for trade in day['trades']]
+    return body['trades']
+
+def statements_for(app, client, path):
+    from models import db
+    with app.app_context():
+        engine = db.engine
+    with QueryCounter(engine) as counter:
+        response = client.get(path)
+    assert response.status_code == 200
+    return counter.count, len(listed_trades(response.get_json()))
+
+@pytest.mark.parametrize('path', [
+    '/api/trades', '/api/trades?limit=500', f'/api/trades/weekly?week_offset={FIXTURE_WEEK_OFFSET}'
+])
+def test_trade_lists_run_a_constant_number_of_statements(app, client, create_trade, path):
+    create_trade(images={'entry_image': PNG_BYTES})
+    small, listed = statements_for(app, client, path)
+    assert listed >= 1
+    for number in range(20):
+        create_trade(images={'entry_image': PNG_BYTES + bytes([number])}, tags=f'Tag{number}')
+    large, listed_after = statements_for(app, client, path)
+    assert listed_after == listed + 20
+    assert large == small
@@ -0,0 +1,31 @@
+import pytest
+
+from utils.query_plans import check_query_plans, plan_problems
+
+@pytest.fixture
+def plans(app, create_trade):
+    create_trade()
+    with app.app_context():
+        return check_query_plans()
+
+HOT_QUERIES = [
+    'trade list', 'keyset page', 'weekly range', 'instrument range',
+    'tag lookup', 'tags of trade', 'images of trades', 'image replacement'
+]
+
+def test_every_hot_query_is_checked(plans):
+    assert sorted(plans) == sorted(HOT_QUERIES)
+
+@pytest.mark.parametrize('name', HOT_QUERIES)
+def test_hot_queries_use_indexes(plans, name):
+    plan, problems = plans[name]
+    assert plan
+    assert problems == [], f'{name}: {plan}'
+
+def test_trade_list_reads_the_entry_index(plans):
+    plan, _ = plans['trade list']
+    assert any('ix_trades_entry_datetime_id' in line for line in plan), plan
+
+def test_full_scans_and_sorts_are_reported():
+    assert plan_problems(['SCAN trades', 'USE TEMP B-TREE FOR ORDER BY']) == ['SCAN trades', 'USE TEMP B-TREE FOR ORDER BY']
+    assert plan_problems(['SEARCH trades USING INDEX ix_trades_entry_datetime_id (entry_datetime>?)']) == []
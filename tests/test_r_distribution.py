@@ -0,0 +1,34 @@
+import app as journal_app
+from models import db
+from utils.statistics import R_BIN_LABELS
+
+# Unlisted instrument, so the entered r_value (none: stored as 0) is kept
+PRICES = {'instrument': 'ACME', 'entry_price': '100', 'exit_price': '130', 'initial_stop_loss': '90',
+          'initial_take_profit': '140', 'net_profit': '300'}
+
+def r_distribution(client, query=''):
+    data = client.get(f'/api/advanced-analysis{query}').get_json()['charts']['rMultipleDistribution']['data']
+    return dict(zip(R_BIN_LABELS, data or [0] * len(R_BIN_LABELS)))
+
+def test_trades_without_r_value_are_binned_by_price(client, create_trade):
+    before = r_distribution(client)
+    trade = create_trade(**PRICES)
+    assert trade['r_value'] == 0
+    after = r_distribution(client)
+    # +30 over a 10 stop distance is +3R
+    assert after['>2R'] == before['>2R'] + 1
+    assert after['0R to 1R'] == before['0R to 1R']
+    # The SQL totals of a filtered view agree with the aggregates
+    assert r_distribution(client, '?instrument=ACME')['>2R'] >= 1
+    assert r_distribution(client, '?instrument=ACME')['0R to 1R'] == 0
+
+def test_existing_aggregates_are_rebuilt_for_a_new_revision(app, client, create_trade):
+    create_trade(**PRICES)
+    with app.app_context():
+        journal_app.repair_materialized_tables()
+        # Aggregates written by an older revision, binning the stored 0 as 0R
+        db.session.execute(db.text("UPDATE trade_aggregates SET r_0_1 = r_0_1 + r_gt_2, r_gt_2 = 0"))
+        db.session.execute(db.text("UPDATE journal_version SET checked_version = '1:' || checked_version"))
+        db.session.commit()
+        assert journal_app.repair_materialized_tables()
+    assert r_distribution(client) == r_distribution(client, '?start=1970-01-01')
@@ -0,0 +1,44 @@
+import sqlite3
+
+from flask import jsonify
+
+from utils.result_cache import ResultCache, cached_result
+
+def test_set_after_invalidate_is_dropped():
+    cache = ResultCache()
+    generation = cache.generation
+    cache.invalidate()  # a write commits while the response is computed
+    cache.set('key', b'{}', 'application/json', None, generation)
+    assert cache.get('key') is None
+
+def test_write_during_computation_is_not_cached(app):
+    cache = ResultCache()
+    calls = []
+
+    @cached_result(cache, 'racy')
+    def view():
+        calls.append(1)
+        if len(calls) == 1:
+            cache.invalidate()
+        return jsonify({'calls': len(calls)})
+
+    with app.app_context():
+        for expected in (1, 2, 2):
+            with app.test_request_context('/racy'):
+                assert view().get_json() == {'calls': expected}
+
+def test_out_of_process_write_retires_entries(client, create_trade):
+    create_trade()
+    path = '/api/advanced-analysis/rolling?window=1&step=1'
+    before = len(client.get(path).get_json()['trades']['labels'])
+    # Another process (CLI import, generate_fake_data.py) cannot call invalidate()
+    database = client.application.config['SQLALCHEMY_DATABASE_URI'].removeprefix('sqlite:///')
+    with sqlite3.connect(database) as connection:
+        connection.execute(
+            'INSERT INTO trades (entry_datetime, exit_datetime, instrument, order_type, entry_price, exit_price, '
+            'initial_stop_loss, initial_take_profit, position_size, status, net_profit, r_value, created_at, updated_at) '
+            'SELECT entry_datetime, exit_datetime, instrument, order_type, entry_price, exit_price, initial_stop_loss, '
+            'initial_take_profit, position_size, status, net_profit, r_value, created_at, updated_at FROM trades LIMIT 1'
+        )
+    connection.close()
+    assert len(client.get(path).get_json()['trades']['labels']) == before + 1
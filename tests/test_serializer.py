@@ -0,0 +1,22 @@
+from tests.conftest import journal_app
+
+def test_trade_list_matches_to_dict(app, client, create_trade):
+    create_trade()
+    from models.trade import Trade
+    with app.app_context():
+        expected = [trade.to_dict() for trade in Trade.query.order_by(Trade.entry_datetime.desc()).all()]
+    assert client.get('/api/trades').get_json() == expected
+    # A second, cached encoding gives the same document
+    assert client.get('/api/trades', headers={'Cache-Control': 'no-cache'}).get_json() == expected
+
+def test_deleted_trades_leave_the_cache(client, create_trade):
+    serializer = journal_app.trade_serializer
+    first, second, third = create_trade(), create_trade(), create_trade()
+    client.get('/api/trades')
+    cached = serializer.stats()['entries']
+
+    assert client.delete(f"/api/trades/{first['id']}").status_code == 204
+    assert serializer.stats()['entries'] == cached - 1
+    response = client.delete('/api/trades/batch', json={'ids': [second['id'], third['id']]})
+    assert response.status_code == 200
+    assert serializer.stats()['entries'] == cached - 3
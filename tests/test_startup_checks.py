@@ -0,0 +1,41 @@
+from datetime import datetime
+
+import app as journal_app
+from models import db
+from utils.statistics import journal_totals
+
+def test_drift_checks_skip_unchanged_journal(app, create_trade):
+    create_trade()
+    with app.app_context():
+        assert journal_app.repair_materialized_tables()
+        assert not journal_app.repair_materialized_tables()
+
+def test_drift_checks_repair_external_writes(app, create_trade):
+    create_trade()
+    with app.app_context():
+        journal_app.repair_materialized_tables()
+        before = journal_totals()['trade_count']
+        # A row written behind the app's back, as generate_fake_data.py does
+        now = datetime(2024, 3, 1, 9, 0)
+        db.session.execute(db.text(
+            "INSERT INTO trades (entry_datetime, exit_datetime, instrument, order_type, entry_price, exit_price, "
+            "initial_stop_loss, initial_take_profit, position_size, net_profit, r_value, status, tags, emotions, created_at, updated_at) "
+            "VALUES (:now, :now, 'EUR/USD', 'BUY', 1.1, 1.2, 1.0, 1.2, 1, 1000, 1, 'WIN', '', '', :now, :now)"
+        ), {'now': now})
+        db.session.commit()
+        assert journal_app.repair_materialized_tables()
+        assert journal_totals()['trade_count'] == before + 1
+        assert not journal_app.repair_materialized_tables()
+
+def test_launcher_waits_for_the_readiness_probe(app):
+    import threading
+    from werkzeug.serving import make_server
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        assert journal_app.wait_for_server(f'http://127.0.0.1:{server.port}', timeout=5)
+    finally:
+        server.shutdown()
+    assert not journal_app.wait_for_server(f'http://127.0.0.1:{server.port}', timeout=0.2)
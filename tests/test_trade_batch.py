@@ -0,0 +1,25 @@
+import pytest
+
+@pytest.mark.parametrize('fields, error', [
+    ({'instrument': None}, 'instrument must be a string'),
+    ({'instrument': ['EUR/USD']}, 'instrument must be a string'),
+    ({'instrument': '  '}, 'instrument must not be empty'),
+    ({'order_type': 'HOLD'}, 'order_type must be one of: BUY, SELL'),
+    ({'status': 'MAYBE'}, 'status must be one of: WIN, LOSS, BREAKEVEN'),
+    ({'tags': 5}, 'tags must be a string'),
+])
+def test_invalid_batch_values_are_rejected(client, create_trade, fields, error):
+    trade = create_trade()
+    response = client.patch('/api/trades/batch', json={'ids': [trade['id']], 'set': fields})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == error
+    assert client.get(f"/api/trades/{trade['id']}").get_json()['instrument'] == 'EUR/USD'
+
+def test_batch_values_are_normalized(client, create_trade):
+    trade = create_trade()
+    response = client.patch('/api/trades/batch', json={
+        'ids': [trade['id']], 'set': {'instrument': ' GBP/USD ', 'order_type': 'sell', 'status': 'loss', 'tags': ''}
+    })
+    assert response.status_code == 200
+    updated = client.get(f"/api/trades/{trade['id']}").get_json()
+    assert (updated['instrument'], updated['order_type'], updated['status'], updated['tags']) == ('GBP/USD', 'SELL', 'LOSS', '')
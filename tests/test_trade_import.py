@@ -0,0 +1,29 @@
+import io
+import json
+
+from tests.conftest import TRADE_FORM
+
+def import_ndjson(client, rows):
+    body = '\n'.join(json.dumps(row) for row in rows).encode()
+    return client.post(
+        '/api/trades/import', data={'file': (io.BytesIO(body), 'trades.ndjson')}, content_type='multipart/form-data'
+    )
+
+def test_rows_with_wrong_types_are_rejected(client):
+    response = import_ndjson(client, [
+        TRADE_FORM,
+        dict(TRADE_FORM, instrument=5),
+        dict(TRADE_FORM, entry_price=[1.1]),
+        dict(TRADE_FORM, position_size=True),
+        dict(TRADE_FORM, tags={'a': 1}),
+        dict(TRADE_FORM, entry_datetime=20240102),
+        dict(TRADE_FORM, exit_price='nan'),
+        'not an object',
+        dict(TRADE_FORM, entry_price=1.1, exit_price=1.105)
+    ])
+    assert response.status_code == 201
+    report = response.get_json()
+    assert report['imported'] == 2
+    assert report['rejected'] == 7
+    assert [error['row'] for error in report['errors']] == [2, 3, 4, 5, 6, 7, 8]
+    assert report['errors'][0]['error'] == 'instrument must be a string'
@@ -0,0 +1,45 @@
+import pytest
+
+from tests.conftest import TRADE_FORM
+
+INVALID_FIELDS = [
+    ({'order_type': 'LONG'}, 'order_type must be one of: BUY, SELL'),
+    ({'status': 'open'}, 'status must be one of: WIN, LOSS, BREAKEVEN'),
+    ({'instrument': '  '}, 'instrument must not be empty'),
+    ({'entry_price': 'abc'}, "entry_price must be a number, got 'abc'"),
+]
+
+@pytest.mark.parametrize('fields, error', INVALID_FIELDS)
+def test_create_rejects_invalid_values(client, fields, error):
+    response = client.post('/api/trades', data=dict(TRADE_FORM, **fields), content_type='multipart/form-data')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == error
+
+@pytest.mark.parametrize('fields, error', INVALID_FIELDS)
+def test_update_form_rejects_invalid_values(client, create_trade, fields, error):
+    trade = create_trade()
+    response = client.post(f"/api/trades/update/{trade['id']}", data=fields, content_type='multipart/form-data')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == error
+    assert client.get(f"/api/trades/{trade['id']}").get_json()['order_type'] == 'BUY'
+
+@pytest.mark.parametrize('fields, error', INVALID_FIELDS)
+def test_put_rejects_invalid_values(client, create_trade, fields, error):
+    trade = create_trade()
+    response = client.put(f"/api/trades/{trade['id']}", json=dict(TRADE_FORM, **fields))
+    assert response.status_code == 400
+    assert response.get_json()['error'] == error
+
+def test_updates_normalize_choices(client, create_trade):
+    trade = create_trade()
+    response = client.post(
+        f"/api/trades/update/{trade['id']}", data={'order_type': 'sell', 'status': 'loss', 'instrument': ' GBP/USD '},
+        content_type='multipart/form-data'
+    )
+    assert response.status_code == 200
+    updated = response.get_json()
+    assert (updated['instrument'], updated['order_type'], updated['status']) == ('GBP/USD', 'SELL', 'LOSS')
+    assert updated['entry_price'] == trade['entry_price']
+    response = client.put(f"/api/trades/{trade['id']}", json=dict(TRADE_FORM, order_type='buy', status='win'))
+    assert response.status_code == 200
+    assert (response.get_json()['order_type'], response.get_json()['status']) == ('BUY', 'WIN')
@@ -0,0 +1,35 @@
+import os
+
+import pytest
+
+from tests.conftest import journal_app
+from utils.thumbnails import DERIVATIVE_SIZES, DERIVATIVE_FOLDER
+
+@pytest.fixture
+def secret(app):
+    """A file next to the upload folder, and its WebP-suffixed twin, that must never be served."""
+    paths = [os.path.join(os.path.dirname(app.config['UPLOAD_FOLDER']), name) for name in ('secret.txt', 'secret.txt.webp')]
+    # Relative paths only resolve through folders that exist
+    for size in DERIVATIVE_SIZES:
+        os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], DERIVATIVE_FOLDER, size), exist_ok=True)
+    for path in paths:
+        with open(path, 'w') as stream:
+            stream.write('secret')
+    yield
+    for path in paths:
+        os.remove(path)
+
+@pytest.mark.parametrize('url', [
+    '/uploads/..%2Fsecret.txt',
+    '/uploads/..%2F..%2F..%2Fsecret.txt?size=thumb',
+    '/images/..%2F..%2F..%2Fsecret.txt?size=medium'
+])
+def test_paths_outside_upload_folder_are_refused(client, secret, url):
+    response = client.get(url)
+    assert response.status_code == 404
+    assert response.get_json()['error'].startswith('Unknown file')
+
+def test_traversing_paths_are_not_resized(app):
+    worker = journal_app.derivative_worker
+    assert not worker.enqueue('../outside.png')
+    assert worker.derivative_path('../../../secret.txt', 'thumb') is None
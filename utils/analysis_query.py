@@ -0,0 +1,150 @@
+"""
+Filtered and grouped analytics computed in a single SQL pass.
+
+Filters and the group_by dimension come from query parameters; every metric
+the advanced analysis page shows is derived from the SUM_COLUMNS totals
+produced here, so filtered and unfiltered results use the same formulas.
+"""
+from models import db
+from models.trade import Trade
+from models.trade_tag import TradeTag
+from utils.statistics import SUM_COLUMNS, R_BIN_COLUMNS, R_BIN_LABELS
+from utils.trade_export import parse_date_filter
+from utils.tag_index import parse_names
+
+GROUP_BY_DIMENSIONS = ('instrument', 'order_type', 'tag', 'emotion', 'month')
+
+def split_values(value):
+    return [part.strip() for part in value.split(',') if part.strip()] if value else []
+
+def trades_with_all(kind, names):
+    """Conditions matching trades indexed with every one of `names`."""
+    return [
+        Trade.id.in_(db.select(TradeTag.trade_id).where(TradeTag.kind == kind, TradeTag.name == name))
+        for name in names
+    ]
+
+def filter_conditions(args):
+    """
+    SQL conditions on Trade from request args:
+    instrument / order_type (comma separated, any of), tags / emotions
+    (comma separated, all of), start / end (entry date).
+    Raises ValueError on malformed dates.
+    """
+    conditions = []
+    instruments = split_values(args.get('instrument'))
+    if instruments:
+        conditions.append(Trade.instrument.in_(instruments))
+    order_types = split_values(args.get('order_type'))
+    if order_types:
+        conditions.append(Trade.order_type.in_([order_type.upper() for order_type in order_types]))
+    conditions += trades_with_all('tag', parse_names(args.get('tags')))
+    conditions += trades_with_all('emotion', parse_names(args.get('emotions')))
+    start = parse_date_filter(args.get('start'))
+    if start:
+        conditions.append(Trade.entry_datetime >= start)
+    end = parse_date_filter(args.get('end'), end_of_day=True)
+    if end:
+        conditions.append(Trade.entry_datetime <= end)
+    return conditions
+
+def total_expressions():
+    """SQL aggregates producing every SUM_COLUMNS total straight from the trades table."""
+    net_profit = Trade.net_profit
+    # Same rules as instruments.has_initial_risk and statistics.distribution_r:
+    # a stored r_value of 0 falls back to the price-based R
+    has_risk = db.and_(Trade.entry_price != Trade.initial_stop_loss, Trade.position_size > 0)
+    direction = db.case((db.func.upper(Trade.order_type) == 'BUY', 1), else_=-1)
+    price_r = (Trade.exit_price - Trade.entry_price) * direction \
+        / db.func.nullif(db.func.abs(Trade.entry_price - Trade.initial_stop_loss), 0)
+    r = db.case((Trade.r_value != 0, Trade.r_value), else_=db.func.coalesce(price_r, 0))
+    r_bins = {
+        'r_lt_neg2': r <= -2,
+        'r_neg2_neg1': db.and_(r > -2, r <= -1),
+        'r_neg1_0': db.and_(r > -1, r < 0),
+        'r_0_1': db.and_(r >= 0, r < 1),
+        'r_1_2': db.and_(r >= 1, r < 2),
+        'r_gt_2': r >= 2
+    }
+    expressions = {
+        'trade_count': db.func.count(Trade.id),
+        'win_count': db.func.sum(db.case((net_profit > 0, 1), else_=0)),
+        'loss_count': db.func.sum(db.case((net_profit < 0, 1), else_=0)),
+        'gross_profit': db.func.sum(db.case((net_profit > 0, net_profit), else_=0)),
+        'gross_loss': db.func.sum(db.case((net_profit < 0, -net_profit), else_=0)),
+        'net_profit': db.func.sum(net_profit),
+        'duration_seconds': db.func.sum(
+            db.cast(db.func.strftime('%s', Trade.exit_datetime), db.Integer)
+            - db.cast(db.func.strftime('%s', Trade.entry_datetime), db.Integer)
+        )
+    }
+    for column in R_BIN_COLUMNS:
+        expressions[column] = db.func.sum(db.case((db.and_(has_risk, r_bins[column]), 1), else_=0))
+    return [db.func.coalesce(expressions[column], 0).label(column) for column in SUM_COLUMNS]
+
+def group_key(group_by):
+    """Key expression and extra join (if any) for a group_by dimension."""
+    if group_by == 'instrument':
+        return Trade.instrument, None
+    if group_by == 'order_type':
+        return Trade.order_type, None
+    if group_by == 'month':
+        return db.func.strftime('%Y-%m', Trade.entry_datetime), None
+    # Trades with several tags count towards each of their groups
+    return TradeTag.name, db.and_(TradeTag.trade_id == Trade.id, TradeTag.kind == group_by)
+
+def filtered_totals(conditions):
+    """Totals over the trades matching `conditions`, keyed like journal_totals()."""
+    row = db.session.execute(db.select(*total_expressions()).where(*conditions)).one()
+    return dict(zip(SUM_COLUMNS, row))
+
+def grouped_totals(group_by, conditions):
+    """List of (group, totals) for every group of the dimension, in one GROUP BY query."""
+    key, join_condition = group_key(group_by)
+    statement = db.select(key.label('group_key'), *total_expressions()).select_from(Trade)
+    if join_condition is not None:
+        statement = statement.join(TradeTag, join_condition)
+    statement = statement.where(*conditions).group_by(key).order_by(key)
+    return [(row[0], dict(zip(SUM_COLUMNS, row[1:]))) for row in db.session.execute(statement)]
+
+def contribution_totals(conditions):
+    """
+    Merged aggregate contributions {(instrument, month): totals} of the matching
+    trades, the set-based counterpart of merge_contribution(trade_contribution(...)).
+    """
+    month = db.func.strftime('%Y-%m', Trade.entry_datetime)
+    statement = db.select(Trade.instrument, month, *total_expressions()) \
+        .where(*conditions).group_by(Trade.instrument, month)
+    return {
+        (row[0], row[1]): dict(zip(SUM_COLUMNS, row[2:]))
+        for row in db.session.execute(statement)
+    }
+
+def filtered_monthly(conditions):
+    """(month, net profit) pairs of the trades matching `conditions`."""
+    month = db.func.strftime('%Y-%m', Trade.entry_datetime)
+    statement = db.select(month, db.func.sum(Trade.net_profit)) \
+        .where(*conditions).group_by(month).order_by(month)
+    return db.session.execute(statement).all()
+
+def summary_metrics(totals):
+    """Win rate, profit factor, expectancy and R distribution from a totals dict."""
+    trade_count = totals['trade_count']
+    win_count, loss_count = totals['win_count'], totals['loss_count']
+    win_rate = (win_count / trade_count * 100) if trade_count > 0 else 0
+    loss_rate = 100 - win_rate if trade_count > 0 else 0
+    gross_profit, gross_loss = totals['gross_profit'], abs(totals['gross_loss'])
+    avg_win = gross_profit / win_count if win_count > 0 else 0
+    avg_loss = gross_loss / loss_count if loss_count > 0 else 0
+    return {
+        'tradeCount': trade_count,
+        'winRate': round(win_rate, 2),
+        'profitFactor': round(gross_profit / gross_loss, 2) if gross_loss > 0 else 0,
+        'expectancy': round((win_rate / 100 * avg_win) - (loss_rate / 100 * avg_loss), 2),
+        'riskReward': round(avg_win / avg_loss, 2) if avg_loss > 0 else 0,
+        'netProfit': round(totals['net_profit'], 2),
+        'rMultipleDistribution': {
+            'labels': list(R_BIN_LABELS),
+            'data': [totals[column] for column in R_BIN_COLUMNS]
+        }
+    }
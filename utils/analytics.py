@@ -0,0 +1,76 @@
+"""
+Vectorized analytics kernel for the advanced analysis page.
+
+Columns are pulled straight from SQL into NumPy arrays (no ORM hydration) and
+every per-trade series is computed with array operations instead of Python loops.
+"""
+import numpy as np
+
+from models import db
+from models.trade import Trade
+
+# Column name -> SQL expression. Dates are formatted by SQLite so no
+# datetime objects are ever built in Python.
+COLUMN_EXPRESSIONS = {
+    'dates': db.func.date(Trade.entry_datetime),
+    'net_profit': Trade.net_profit
+}
+STRING_COLUMNS = {'dates'}
+
+def load_columns(names, query_filter=None):
+    """
+    Loads the requested analysis columns of the journal, oldest trade first.
+    Numeric columns become float arrays; `dates` ('YYYY-MM-DD') stays a
+    plain string list.
+    """
+    statement = db.select(*[COLUMN_EXPRESSIONS[name] for name in names]) \
+        .order_by(Trade.entry_datetime.asc())
+    if query_filter is not None:
+        statement = statement.where(query_filter)
+    rows = db.session.execute(statement).all()
+    values = list(zip(*rows)) if rows else [()] * len(names)
+    return {
+        name: list(column) if name in STRING_COLUMNS else np.array(column, dtype=float)
+        for name, column in zip(names, values)
+    }
+
+def equity_and_drawdown(net_profit):
+    """
+    Cumulative equity and drawdown (% below the running peak) per trade.
+    The peak starts at 0, so drawdown is 0 until the account has been in profit.
+    """
+    equity = np.cumsum(net_profit)
+    peak = np.maximum.accumulate(np.maximum(equity, 0)) if len(equity) else equity
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drawdown = np.where(peak > 0, (peak - equity) / peak * 100, 0.0)
+    drawdown_list = drawdown.tolist()
+    # Keep the integer 0 the original loop emitted before the first peak
+    for i in np.flatnonzero(peak <= 0):
+        drawdown_list[i] = 0
+    return equity.tolist(), drawdown_list
+
+def max_run_length(mask):
+    """Length of the longest run of consecutive True values."""
+    if not mask.any():
+        return 0
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return int((ends - starts).max())
+
+def max_streaks(net_profit):
+    """Longest winning and losing streaks; breakeven trades end both."""
+    return max_run_length(net_profit > 0), max_run_length(net_profit < 0)
+
+def equity_series(columns):
+    """Equity curve, drawdown and streaks for the advanced analysis charts."""
+    net_profit = columns['net_profit']
+    equity_curve, drawdown_data = equity_and_drawdown(net_profit)
+    max_win_streak, max_loss_streak = max_streaks(net_profit)
+    return {
+        'dates': columns['dates'],
+        'equity_curve': equity_curve,
+        'drawdown': drawdown_data,
+        'max_win_streak': max_win_streak,
+        'max_loss_streak': max_loss_streak
+    }
@@ -0,0 +1,116 @@
+"""
+Vectorized recompute of the derived trade columns (net_profit, r_value).
+
+Runs the utils.instruments formulas over whole column arrays, in id-ordered
+chunks, and only writes back rows whose stored values differ. Existing
+journals are never rewritten implicitly: `flask recompute-trades` lists the
+changes and asks before writing. NumPy is imported on first use, so
+importing this module (trade_batch does) stays cheap at startup.
+"""
+from datetime import datetime
+
+from models import db
+from models.trade import Trade
+from utils.instruments import instrument_spec
+from utils.migrations import data_version, set_data_version
+from utils.statistics import rebuild_aggregates
+from utils.rollups import rebuild_rollups
+
+# Bump when the engine's formulas change; older journals get a warning on start
+DERIVED_VALUES_VERSION = 1
+RECOMPUTE_CHUNK_SIZE = 50000
+# Rewritten rows get a new updated_at, which keys the serialized-trade cache
+UPDATE_SQL = 'UPDATE trades SET net_profit = ?, r_value = ?, updated_at = ? WHERE id = ?'
+
+def derived_arrays(instruments, direction, entry_price, exit_price, initial_stop_loss, position_size, net_profit, r_value):
+    """
+    Array form of instruments.derived_values: returns (net_profit, r_value).
+    `direction` holds +1 for BUY and -1 for SELL trades. Trades in unlisted
+    instruments keep the given net_profit / r_value.
+    """
+    import numpy as np
+
+    names, inverse = np.unique(np.asarray(instruments, dtype=str), return_inverse=True)
+    specs = [instrument_spec(name) for name in names]
+    listed = np.array([spec is not None for spec in specs])[inverse]
+    pip_size = np.array([spec['pip_size'] if spec else 1.0 for spec in specs])[inverse]
+    pip_value = np.array([spec['pip_value'] if spec else 0.0 for spec in specs])[inverse]
+
+    derived_profit = np.round((exit_price - entry_price) * direction / pip_size * pip_value * position_size, 2)
+    risk = np.abs(entry_price - initial_stop_loss) / pip_size * pip_value * position_size
+    with np.errstate(divide='ignore', invalid='ignore'):
+        derived_r = np.where(risk > 0, derived_profit / risk, 0.0)
+    return np.where(listed, derived_profit, net_profit), np.where(listed, derived_r, r_value)
+
+def derived_value_changes(conditions=()):
+    """
+    Yields, per id-ordered chunk of the matching trades, the rows whose stored
+    values differ from the engine's as arrays (ids, instruments, old_profit,
+    net_profit, old_r, r_value). Nothing is written.
+    """
+    import numpy as np
+
+    connection = db.session.connection()
+    columns = (
+        Trade.id, Trade.instrument,
+        db.case((db.func.upper(Trade.order_type) == 'BUY', 1), else_=-1),
+        Trade.entry_price, Trade.exit_price, Trade.initial_stop_loss, Trade.position_size,
+        Trade.net_profit, Trade.r_value
+    )
+    last_id = 0
+    while True:
+        statement = db.select(*columns).where(Trade.id > last_id, *conditions) \
+            .order_by(Trade.id).limit(RECOMPUTE_CHUNK_SIZE)
+        rows = connection.execute(statement).all()
+        if not rows:
+            return
+        ids, instruments, *numbers = zip(*rows)
+        direction, entry_price, exit_price, initial_stop_loss, position_size, old_profit, old_r = (
+            np.array(values, dtype=float) for values in numbers
+        )
+        net_profit, r_value = derived_arrays(
+            instruments, direction, entry_price, exit_price, initial_stop_loss, position_size, old_profit, old_r
+        )
+        stale = ~(np.isclose(net_profit, old_profit, rtol=0, atol=1e-9) & np.isclose(r_value, old_r, rtol=0, atol=1e-9))
+        positions = np.flatnonzero(stale)
+        if len(positions):
+            yield (
+                np.array(ids)[positions], np.asarray(instruments, dtype=object)[positions],
+                old_profit[positions], net_profit[positions], old_r[positions], r_value[positions]
+            )
+        last_id = ids[-1]
+
+def recompute_derived_values(conditions=()):
+    """
+    Rewrites net_profit / r_value of the matching trades in the current
+    transaction. Returns the number of rows that changed.
+    """
+    connection = db.session.connection()
+    changed = 0
+    for ids, _, _, net_profit, _, r_value in derived_value_changes(conditions):
+        # Same text format SQLAlchemy writes for DateTime columns
+        updated_at = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')
+        connection.exec_driver_sql(UPDATE_SQL, [
+            (float(profit), float(r), updated_at, int(trade_id)) for trade_id, profit, r in zip(ids, net_profit, r_value)
+        ])
+        changed += len(ids)
+    return changed
+
+def recompute_journal():
+    """
+    Recomputes every trade, rebuilds the statistics when anything changed and
+    records the formula version. Only run on request (flask recompute-trades).
+    """
+    changed = recompute_derived_values()
+    db.session.commit()
+    if changed:
+        rebuild_aggregates()
+        rebuild_rollups()
+    mark_derived_values_current()
+    return changed
+
+def mark_derived_values_current():
+    set_data_version(DERIVED_VALUES_VERSION)
+
+def derived_values_outdated():
+    return data_version() < DERIVED_VALUES_VERSION
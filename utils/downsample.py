@@ -0,0 +1,48 @@
+"""Largest-Triangle-Three-Buckets downsampling for chart payloads."""
+import numpy as np
+
+def lttb_indices(y, max_points):
+    """
+    Indices of the points LTTB keeps out of `y` (x is the trade position).
+    The first and last points are always kept, and the global maximum and
+    minimum win their bucket so peaks and troughs survive downsampling.
+    """
+    y = np.asarray(y, dtype=float)
+    size = len(y)
+    if max_points >= size or max_points < 3:
+        return np.arange(size)
+
+    x = np.arange(size, dtype=float)
+    forced = {int(np.argmax(y)), int(np.argmin(y))}
+    every = (size - 2) / (max_points - 2)
+    selected = [0]
+    anchor = 0
+    for bucket in range(max_points - 2):
+        start = int(bucket * every) + 1
+        end = int((bucket + 1) * every) + 1
+        # Average of the next bucket (the last point for the final bucket)
+        next_start = end
+        next_end = min(int((bucket + 2) * every) + 1, size)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        pinned = [index for index in forced if start <= index < end]
+        if pinned:
+            pick = pinned[0]
+        else:
+            area = np.abs(
+                (x[anchor] - avg_x) * (y[start:end] - y[anchor])
+                - (x[anchor] - x[start:end]) * (avg_y - y[anchor])
+            )
+            pick = start + int(np.argmax(area))
+        selected.append(pick)
+        anchor = pick
+    selected.append(size - 1)
+    return np.array(selected)
+
+def downsample_series(labels, data, max_points):
+    """Downsamples a (labels, data) chart series to at most `max_points` points."""
+    if not max_points or len(data) <= max_points:
+        return labels, data
+    indices = lttb_indices(data, max_points)
+    return [labels[i] for i in indices], [data[i] for i in indices]
@@ -0,0 +1,94 @@
+"""
+Ranked full-text search over the rationale and review notes of trades.
+
+The trades_fts FTS5 index (see utils.migrations) is kept in sync by triggers,
+so every write path, including bulk imports, is searchable immediately.
+"""
+import re
+from html import escape
+
+from models import db
+from models.trade import Trade
+from utils.migrations import FULL_TEXT_TABLE
+
+SEARCH_ORDERS = ('rank', 'date')
+SNIPPET_TOKENS = 12
+# FTS5 wraps matches in these control characters, which notes typed in the
+# form do not contain; the snippet is HTML-escaped before they become <mark> tags
+SNIPPET_SENTINELS = ('\x02', '\x03')
+SNIPPET_MARKERS = ('<mark>', '</mark>')
+
+fts = db.table(FULL_TEXT_TABLE, db.column('rowid'), db.column(FULL_TEXT_TABLE), db.column('rank'))
+
+def full_text_available():
+    return db.session.execute(
+        db.text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': FULL_TEXT_TABLE}
+    ).first() is not None
+
+def match_expression(text):
+    """
+    Turns free text into an FTS5 query: every word must match, OR between words
+    is kept, and a trailing * keeps prefix matching. Words are quoted, so
+    punctuation in the notes' vocabulary never becomes query syntax.
+    """
+    terms = []
+    for word in text.split():
+        if word == 'OR' and terms and terms[-1] != 'OR':
+            terms.append(word)
+            continue
+        prefix = word.endswith('*')
+        word = re.sub(r'[^\w]+', ' ', word).strip()
+        if word:
+            terms.append('"' + word + '"' + ('*' if prefix else ''))
+    if terms and terms[-1] == 'OR':
+        terms.pop()
+    return ' '.join(terms)
+
+def highlight(snippet):
+    """HTML-safe snippet: the note text is escaped, only the match markers are markup."""
+    if snippet is None:
+        return None
+    text = escape(snippet)
+    for sentinel, marker in zip(SNIPPET_SENTINELS, SNIPPET_MARKERS):
+        text = text.replace(sentinel, marker)
+    return text
+
+def search_notes(text, conditions=(), order='rank', limit=50, offset=0):
+    """
+    Trades whose notes match `text`, combined with the Trade `conditions`.
+    Returns (trade, rank, snippet) rows, best match first for order=rank or
+    newest first for order=date. Raises ValueError when `text` has no searchable words.
+    """
+    expression = match_expression(text)
+    if not expression:
+        raise ValueError('Search query has no searchable words')
+    matches = fts.c[FULL_TEXT_TABLE].op('MATCH')(expression)
+
+    # Pick the page first; snippets are only built for its rows because
+    # SQLite would otherwise compute one per match before sorting.
+    if order == 'date':
+        # The match list is materialized once and probed while walking the date index
+        matching_ids = db.select(fts.c.rowid).where(matches)
+        statement = db.select(Trade.id, db.null()) \
+            .where(Trade.id.in_(matching_ids), *conditions) \
+            .order_by(Trade.entry_datetime.desc(), Trade.id.desc())
+    else:
+        statement = db.select(Trade.id, fts.c.rank).select_from(fts) \
+            .join(Trade, Trade.id == fts.c.rowid) \
+            .where(matches, *conditions) \
+            .order_by(fts.c.rank, Trade.id.desc())
+    page = db.session.execute(statement.limit(limit).offset(offset)).all()
+    if not page:
+        return []
+    ids = [trade_id for trade_id, _ in page]
+
+    start_sentinel, end_sentinel = SNIPPET_SENTINELS
+    # -1 lets FTS5 pick whichever of rationale / review matched best
+    snippet = db.func.snippet(db.literal_column(FULL_TEXT_TABLE), -1, start_sentinel, end_sentinel, '…', SNIPPET_TOKENS)
+    snippets = {
+        trade_id: highlight(text) for trade_id, text in db.session.execute(
+            db.select(fts.c.rowid, snippet).where(matches, fts.c.rowid.in_(ids))
+        )
+    }
+    trades = {trade.id: trade for trade in Trade.query.filter(Trade.id.in_(ids))}
+    return [(trades[trade_id], rank, snippets.get(trade_id)) for trade_id, rank in page]
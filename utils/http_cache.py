@@ -0,0 +1,59 @@
+"""
+Conditional GET support.
+
+JSON endpoints get an ETag built from the journal version counter, so a repeat
+request answers 304 after a single-row lookup, before any trade is loaded.
+Content-addressed images never change and are cached as immutable.
+"""
+import re
+from datetime import date
+from functools import wraps
+from hashlib import blake2b
+
+from flask import request, make_response
+
+from models import db
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+CONTENT_ADDRESSED_PATH = re.compile(r'^[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})\.\w+$')
+
+def journal_version():
+    """
+    Stamp that changes on any journal write: the update/delete counter plus
+    the highest trade and image ids (inserts). All three are O(1) lookups.
+    """
+    row = db.session.execute(db.text(
+        'SELECT (SELECT version FROM journal_version WHERE id = 1), '
+        '(SELECT MAX(id) FROM trades), (SELECT MAX(id) FROM trade_images)'
+    )).one()
+    return '.'.join(str(value or 0) for value in row)
+
+def journal_etag_value():
+    """
+    ETag for the current request: journal version + today's date (relative
+    views such as week_offset change at midnight) + the full query string.
+    """
+    key = f"{journal_version()}|{date.today().isoformat()}|{request.full_path}"
+    return blake2b(key.encode(), digest_size=12).hexdigest()
+
+def journal_etag(view):
+    """Adds ETag / 304 handling to a GET view that only depends on journal data."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        etag = journal_etag_value()
+        if etag in request.if_none_match:
+            response = make_response('', 304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag)
+        # Always revalidate: the ETag check is cheap, stale data is not
+        response.cache_control.no_cache = True
+        return response
+    return wrapper
+
+def content_hash_of(relative_path):
+    """SHA-256 of a content-addressed upload path, or None for other files."""
+    match = CONTENT_ADDRESSED_PATH.match(relative_path)
+    return match.group(1) if match else None
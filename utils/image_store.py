@@ -0,0 +1,224 @@
+"""
+Content-addressed, deduplicated storage for uploaded images.
+
+Uploads are hashed with SHA-256 while they are streamed to a temp file, then
+moved to a sharded path (ab/cd/<sha256>.<ext>). Identical screenshots attached
+to several trades share one file; ImageBlob.ref_count tracks how many
+TradeImage rows use it, and the file is only unlinked when that reaches zero.
+
+Storing is two-phase: stage_stream() copies and hashes the upload without
+touching the database, so it runs before a request starts writing; the
+transaction then only renames the staged file into place (place_staged()).
+
+A released file is unlinked after its transaction commits, by a background
+thread (unlink_released()). A concurrent upload of the same content may be
+reusing the file by then: place_staged() claims the path under the store
+lock until its own transaction ends, and claimed files are never unlinked.
+"""
+import hashlib
+import os
+import queue
+import tempfile
+import threading
+from collections import Counter, namedtuple
+
+from sqlalchemy import event
+
+from models import db
+from models.image_blob import ImageBlob
+
+CHUNK_SIZE = 1024 * 1024
+
+def blob_path(sha256, extension):
+    """Sharded path of a blob, relative to the upload folder."""
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}.{extension}"
+
+# A hashed upload waiting in a temp file inside the upload folder
+StagedUpload = namedtuple('StagedUpload', ['sha256', 'temp_path', 'size', 'extension'])
+
+def stage_stream(upload_folder, stream, extension):
+    """Phase 1: copies `stream` to a temp file in CHUNK_SIZE pieces while hashing it."""
+    digest = hashlib.sha256()
+    size = 0
+    handle, temp_path = tempfile.mkstemp(dir=upload_folder, suffix='.upload')
+    try:
+        with os.fdopen(handle, 'wb') as temp_file:
+            while chunk := stream.read(CHUNK_SIZE):
+                digest.update(chunk)
+                temp_file.write(chunk)
+                size += len(chunk)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return StagedUpload(digest.hexdigest(), temp_path, size, extension)
+
+def stage_file(path, extension):
+    """Phase 1 for a file already written inside the upload folder (resumable uploads)."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        while chunk := file.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return StagedUpload(digest.hexdigest(), path, os.path.getsize(path), extension)
+
+def discard_staged(staged):
+    """Removes a staged file that was not placed (the request failed or was rejected)."""
+    if staged is not None and os.path.exists(staged.temp_path):
+        os.remove(staged.temp_path)
+
+PLACED_FILES = 'image_store_placed_files'
+REUSED_FILES = 'image_store_reused_files'
+
+# Guards the files themselves: placing or reusing a file and unlinking a released one
+store_lock = threading.Lock()
+# Paths placed or reused by transactions that have not ended yet, with their count
+claimed_paths = Counter()
+
+def place_staged(upload_folder, staged):
+    """
+    Phase 2, inside the transaction: renames the staged file to its blob path,
+    or drops it when the content is already stored. Returns the relative path.
+    The path is claimed until the transaction ends, so a pending unlink of the
+    same file is skipped; a file placed here is removed again on rollback.
+    """
+    existing = db.session.get(ImageBlob, staged.sha256)
+    relative_path = existing.image_path if existing else blob_path(staged.sha256, staged.extension)
+    final_path = os.path.join(upload_folder, relative_path)
+    with store_lock:
+        claimed_paths[relative_path] += 1
+        if os.path.exists(final_path):
+            os.remove(staged.temp_path)
+            db.session.info.setdefault(REUSED_FILES, []).append(relative_path)
+        else:
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.replace(staged.temp_path, final_path)
+            db.session.info.setdefault(PLACED_FILES, []).append(relative_path)
+    return relative_path
+
+def release_claims(paths):
+    with store_lock:
+        for relative_path in paths:
+            claimed_paths[relative_path] -= 1
+            if claimed_paths[relative_path] <= 0:
+                del claimed_paths[relative_path]
+
+def unlink_released(relative_path, in_use, unlink):
+    """
+    Unlinks a released file unless a running transaction claimed it or
+    `in_use(relative_path)` finds a committed blob using it. Returns whether
+    it was unlinked. Holds the store lock, so place_staged() either finds the
+    file gone and writes its own copy, or claims it before this check.
+    """
+    with store_lock:
+        if claimed_paths[relative_path] or in_use(relative_path):
+            return False
+        unlink(relative_path)
+        return True
+
+def add_reference(sha256, relative_path, size):
+    """
+    Counts one more TradeImage using the blob. Returns (blob, is_new_blob).
+    A blob released earlier in the same transaction (an image replaced by
+    identical bytes) is kept, and its file is no longer unlinked.
+    """
+    blob = db.session.get(ImageBlob, sha256)
+    if blob is not None and blob in db.session.deleted:
+        db.session.add(blob)  # reverts the pending delete
+    is_new = blob is None
+    if is_new:
+        blob = ImageBlob(sha256=sha256, image_path=relative_path, size=size, ref_count=0)
+        db.session.add(blob)
+    cancel_unlink(blob.image_path)
+    blob.ref_count += 1
+    return blob, is_new
+
+def release_reference(image):
+    """
+    Drops a TradeImage's reference to its blob.
+    Returns the file path to unlink once the transaction commits, or None
+    while other trades still use the file.
+    """
+    if image.content_hash is None:
+        # Uploads from before deduplication own their file exclusively
+        return image.image_path
+    blob = db.session.get(ImageBlob, image.content_hash)
+    if blob is None:
+        return None
+    blob.ref_count -= 1
+    if blob.ref_count > 0:
+        return None
+    db.session.delete(blob)
+    return blob.image_path
+
+PENDING_UNLINKS = 'image_store_pending_unlinks'
+
+def unlink_after_commit(relative_path):
+    """Queues a file for deletion once the current transaction commits."""
+    db.session.info.setdefault(PENDING_UNLINKS, []).append(relative_path)
+
+def cancel_unlink(relative_path):
+    """Keeps a file queued by unlink_after_commit() in this transaction."""
+    pending = db.session.info.get(PENDING_UNLINKS)
+    while pending and relative_path in pending:
+        pending.remove(relative_path)
+
+def register_unlink_hooks(unlink, placed=None):
+    """
+    Calls `unlink(relative_path)` for queued files after a successful commit,
+    and forgets them on rollback, so a failed request never loses a file.
+    Files placed by a rolled back transaction are unlinked instead; after a
+    commit they are passed to `placed(relative_path)`. Either way the paths
+    claimed by place_staged() are released.
+    """
+    @event.listens_for(db.session, 'after_commit')
+    def unlink_pending_files(session):
+        placed_files = session.info.pop(PLACED_FILES, [])
+        release_claims(placed_files + session.info.pop(REUSED_FILES, []))
+        for relative_path in placed_files:
+            if placed:
+                placed(relative_path)
+        for relative_path in session.info.pop(PENDING_UNLINKS, []):
+            unlink(relative_path)
+
+    @event.listens_for(db.session, 'after_rollback')
+    def forget_pending_files(session):
+        session.info.pop(PENDING_UNLINKS, None)
+        # A reused file may have had its unlink skipped while claimed; it is
+        # checked again now that no blob of this transaction will use it
+        claimed = session.info.pop(PLACED_FILES, []) + session.info.pop(REUSED_FILES, [])
+        release_claims(claimed)
+        for relative_path in claimed:
+            unlink(relative_path)
+
+class UnlinkQueue:
+    """
+    Deletes released files on one background thread, so commits that free
+    many images (batch deletes) never wait on the filesystem.
+    """
+    def __init__(self, unlink, logger=None):
+        self.unlink = unlink
+        self.logger = logger
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def put(self, relative_path):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='unlink-queue', daemon=True)
+                self._thread.start()
+        self._queue.put(relative_path)
+
+    def join(self):
+        """Blocks until every queued file has been handled."""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            relative_path = self._queue.get()
+            try:
+                self.unlink(relative_path)
+            except Exception as e:
+                if self.logger:
+                    self.logger.error(f"Error unlinking {relative_path}: {e}")
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,83 @@
+"""
+Instrument specifications and the P&L / R engine.
+
+Every derived trade value (net profit, R-value) of a listed instrument is
+computed here, from the prices, the position size in lots and the
+instrument's spec, so the API, the importer, the bulk recompute, the fake
+data generator and the trade form (via /api/instruments) agree to the cent.
+Trades in unlisted instruments keep the values the user entered.
+This module has no database dependencies.
+"""
+ACCOUNT_CURRENCY = 'USD'
+STANDARD_LOT = 100000
+
+# pip_value is the account-currency value of one pip for one lot. Forex pairs
+# use the journal's long-standing $10 per standard-lot pip, which is exact for
+# USD-quoted pairs and an approximation for the others.
+INSTRUMENT_SPECS = {
+    'EUR/USD': {'pip_size': 0.0001, 'contract_size': STANDARD_LOT, 'quote_currency': 'USD', 'pip_value': 10},
+    'GBP/USD': {'pip_size': 0.0001, 'contract_size': STANDARD_LOT, 'quote_currency': 'USD', 'pip_value': 10},
+    'AUD/USD': {'pip_size': 0.0001, 'contract_size': STANDARD_LOT, 'quote_currency': 'USD', 'pip_value': 10},
+    'NZD/USD': {'pip_size': 0.0001, 'contract_size': STANDARD_LOT, 'quote_currency': 'USD', 'pip_value': 10},
+    'USD/CAD': {'pip_size': 0.0001, 'contract_size': STANDARD_LOT, 'quote_currency': 'CAD', 'pip_value': 10},
+    'USD/CHF': {'pip_size': 0.0001, 'contract_size': STANDARD_LOT, 'quote_currency': 'CHF', 'pip_value': 10},
+    'EUR/GBP': {'pip_size': 0.0001, 'contract_size': STANDARD_LOT, 'quote_currency': 'GBP', 'pip_value': 10},
+    'USD/JPY': {'pip_size': 0.01, 'contract_size': STANDARD_LOT, 'quote_currency': 'JPY', 'pip_value': 10},
+    'EUR/JPY': {'pip_size': 0.01, 'contract_size': STANDARD_LOT, 'quote_currency': 'JPY', 'pip_value': 10},
+    'GBP/JPY': {'pip_size': 0.01, 'contract_size': STANDARD_LOT, 'quote_currency': 'JPY', 'pip_value': 10},
+    # Metals: 100 oz gold / 5000 oz silver per lot, priced in USD
+    'XAU/USD': {'pip_size': 0.01, 'contract_size': 100, 'quote_currency': 'USD', 'pip_value': 1},
+    'XAG/USD': {'pip_size': 0.001, 'contract_size': 5000, 'quote_currency': 'USD', 'pip_value': 5},
+}
+
+def instrument_spec(instrument):
+    """Spec of an instrument, None for unlisted symbols (their P&L cannot be derived)."""
+    return INSTRUMENT_SPECS.get(str(instrument).strip().upper())
+
+def direction(order_type):
+    """+1 for BUY, -1 for SELL."""
+    return 1 if order_type.upper() == 'BUY' else -1
+
+def trade_profit(instrument, order_type, entry_price, exit_price, position_size):
+    """Net profit in the account currency, rounded to the cent."""
+    spec = instrument_spec(instrument)
+    pips = (exit_price - entry_price) * direction(order_type) / spec['pip_size']
+    return round(pips * spec['pip_value'] * position_size, 2)
+
+def initial_risk(instrument, entry_price, initial_stop_loss, position_size):
+    """Money at risk between the entry and the initial stop loss."""
+    spec = instrument_spec(instrument)
+    return abs(entry_price - initial_stop_loss) / spec['pip_size'] * spec['pip_value'] * position_size
+
+def has_initial_risk(entry_price, initial_stop_loss, position_size):
+    """Only trades with a stop away from the entry have an R-multiple."""
+    return entry_price != initial_stop_loss and position_size > 0
+
+def trade_r_value(instrument, entry_price, initial_stop_loss, position_size, net_profit):
+    """Net profit in multiples of the initial risk, 0 when there was no risk."""
+    risk = initial_risk(instrument, entry_price, initial_stop_loss, position_size)
+    return net_profit / risk if risk > 0 else 0.0
+
+def price_r_value(order_type, entry_price, exit_price, initial_stop_loss):
+    """R-multiple from the prices alone: the move in the trade's direction over the stop distance."""
+    stop_distance = abs(entry_price - initial_stop_loss)
+    return (exit_price - entry_price) * direction(order_type) / stop_distance if stop_distance else 0.0
+
+def entered_value(value):
+    """A net_profit / r_value as entered by the user; empty means 0."""
+    return float(value or 0)
+
+def derived_values(values):
+    """
+    net_profit and r_value of a trade, from a dict of its other column values.
+    For unlisted instruments the entered net_profit / r_value of `values` are kept.
+    """
+    if instrument_spec(values['instrument']) is None:
+        return {'net_profit': entered_value(values.get('net_profit')), 'r_value': entered_value(values.get('r_value'))}
+    net_profit = trade_profit(
+        values['instrument'], values['order_type'], values['entry_price'], values['exit_price'], values['position_size']
+    )
+    r_value = trade_r_value(
+        values['instrument'], values['entry_price'], values['initial_stop_loss'], values['position_size'], net_profit
+    )
+    return {'net_profit': net_profit, 'r_value': r_value}
@@ -0,0 +1,177 @@
+"""
+Opt-in request instrumentation, exposed in Prometheus text format.
+
+Per route: a latency histogram, the number and time of SQL statements (from
+SQLAlchemy cursor events) and the bytes of JSON responses. Image reads and
+writes are timed through image_io(). A request sent with the profile header
+is also run under cProfile and its stats are dumped to the profile folder.
+"""
+import cProfile
+import itertools
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+PROFILE_HEADER = 'X-Profile'
+METRIC_PREFIX = 'trading_journal'
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_sum{{{labels}}} {self.sum:.6f}'
+        yield f'{name}_count{{{labels}}} {self.count}'
+
+def label_text(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{key}="{escape(value)}"' for key, value in labels.items())
+
+class RequestMetrics:
+    """
+    Collects the metrics of one process. install() hooks it into the app and
+    engine; nothing is recorded (and no hook runs) unless it is installed.
+    """
+
+    def __init__(self, profile_folder=None):
+        self.profile_folder = profile_folder
+        self._lock = threading.Lock()
+        self._profile_lock = threading.Lock()
+        self._profile_numbers = itertools.count(1)
+        self.installed = False
+        self.latency = defaultdict(Histogram)  # (method, route, status) -> Histogram
+        self.sql_statements = defaultdict(int)  # route -> count
+        self.sql_seconds = defaultdict(float)  # route -> seconds
+        self.response_bytes = defaultdict(int)  # route -> bytes of JSON bodies
+        self.image_io_seconds = defaultdict(Histogram)  # operation -> Histogram
+
+    def install(self, app, engine):
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        self.installed = True
+
+    @staticmethod
+    def route():
+        return request.url_rule.rule if request.url_rule else 'unmatched'
+
+    def _before_request(self):
+        g.metrics_start = time.perf_counter()
+        g.metrics_sql = [0, 0.0]
+        if request.headers.get(PROFILE_HEADER) and self.profile_folder:
+            # Only one profiler can run at a time; concurrent requests go unprofiled
+            if self._profile_lock.acquire(blocking=False):
+                g.metrics_profiler = cProfile.Profile()
+                g.metrics_profiler.enable()
+
+    def _after_request(self, response):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return response
+        profiler = g.pop('metrics_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            response.headers[f'{PROFILE_HEADER}-File'] = self._dump_profile(profiler)
+            self._profile_lock.release()
+
+        elapsed = time.perf_counter() - start
+        route = self.route()
+        statements, sql_seconds = g.pop('metrics_sql', (0, 0.0))
+        body_bytes = 0
+        if response.mimetype == 'application/json' and not response.direct_passthrough:
+            body_bytes = response.calculate_content_length() or 0
+        with self._lock:
+            self.latency[(request.method, route, response.status_code)].observe(elapsed)
+            self.sql_statements[route] += statements
+            self.sql_seconds[route] += sql_seconds
+            self.response_bytes[route] += body_bytes
+        return response
+
+    def _teardown_request(self, exc):
+        # A failure before _after_request must not leave the profiler running
+        profiler = g.pop('metrics_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            self._profile_lock.release()
+
+    def _dump_profile(self, profiler):
+        os.makedirs(self.profile_folder, exist_ok=True)
+        route = re.sub(r'[^\w-]+', '_', self.route()).strip('_') or 'index'
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{next(self._profile_numbers)}-{request.method}-{route}.prof"
+        profiler.dump_stats(os.path.join(self.profile_folder, name))
+        return name
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['metrics_query_start'].pop()
+        if has_request_context() and 'metrics_sql' in g:
+            g.metrics_sql[0] += 1
+            g.metrics_sql[1] += elapsed
+
+    @contextmanager
+    def image_io(self, operation):
+        """Times an image read / write: `with metrics.image_io('store'): ...`."""
+        if not self.installed:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.image_io_seconds[operation].observe(elapsed)
+
+    def render(self, stats=None):
+        """
+        All metrics in the Prometheus text exposition format. `stats` maps a
+        name to a stats() dict (e.g. the caches'), exported as gauges.
+        """
+        name = f'{METRIC_PREFIX}_request_duration_seconds'
+        image_name = f'{METRIC_PREFIX}_image_io_seconds'
+        lines = [f'# HELP {name} Request latency by route.', f'# TYPE {name} histogram']
+        with self._lock:
+            for (method, route, status), histogram in sorted(self.latency.items()):
+                lines.extend(histogram.lines(name, label_text(method=method, route=route, status=status)))
+            for metric, help_text, values in (
+                ('sql_statements_total', 'SQL statements executed by route.', self.sql_statements),
+                ('sql_seconds_total', 'Time spent in SQL statements by route.', self.sql_seconds),
+                ('response_bytes_total', 'Bytes of JSON response bodies by route.', self.response_bytes)
+            ):
+                lines += [f'# HELP {METRIC_PREFIX}_{metric} {help_text}', f'# TYPE {METRIC_PREFIX}_{metric} counter']
+                for route, value in sorted(values.items()):
+                    value = f'{value:.6f}' if isinstance(value, float) else value
+                    lines.append(f'{METRIC_PREFIX}_{metric}{{{label_text(route=route)}}} {value}')
+            lines += [f'# HELP {image_name} Image read / write time by operation.', f'# TYPE {image_name} histogram']
+            for operation, histogram in sorted(self.image_io_seconds.items()):
+                lines.extend(histogram.lines(image_name, label_text(operation=operation)))
+        for name, values in (stats or {}).items():
+            for key, value in values.items():
+                metric = f'{METRIC_PREFIX}_{name}_{key}'
+                lines += [f'# TYPE {metric} gauge', f'{metric} {value}']
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,151 @@
+"""
+Idempotent schema upgrades for existing trading_journal.db files.
+
+db.create_all() only creates missing tables, so anything added to an existing
+table (indexes, columns) is applied here. Every step is safe to run on every
+start, but they are skipped when the stored schema fingerprint is current.
+"""
+from hashlib import blake2b
+
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from models import db
+
+# Bump when a step below changes in a way the model DDL does not show
+# (triggers, the FTS table), so existing databases run the upgrade again.
+MIGRATION_REVISION = 1
+
+def ensure_columns():
+    """Adds nullable columns declared on the models that existing tables lack."""
+    added = []
+    inspector = db.inspect(db.engine)
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                connection.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}')
+                added.append(f'{table.name}.{column.name}')
+    return added
+
+def ensure_indexes():
+    """Creates any index declared on the models that the database is missing."""
+    created = []
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            if not db.inspect(db.engine).has_index(table.name, index.name):
+                index.create(bind=db.engine)
+                created.append(index.name)
+    return created
+
+# Tables whose writes change the journal version used for HTTP caching
+VERSIONED_TABLES = ('trades', 'trade_images')
+
+def ensure_version_triggers():
+    """Seeds the journal_version row and the triggers that bump it on updates and deletes."""
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql('INSERT OR IGNORE INTO journal_version (id, version) VALUES (1, 0)')
+        for table in VERSIONED_TABLES:
+            # Inserts are covered by max(id) in the version stamp, which keeps
+            # bulk imports free of per-row trigger work.
+            for operation in ('UPDATE', 'DELETE'):
+                connection.exec_driver_sql(
+                    f'CREATE TRIGGER IF NOT EXISTS {table}_{operation.lower()}_version '
+                    f'AFTER {operation} ON {table} '
+                    f'BEGIN UPDATE journal_version SET version = version + 1 WHERE id = 1; END'
+                )
+
+# External-content FTS5 index over the free-text notes of trades
+FULL_TEXT_TABLE = 'trades_fts'
+FULL_TEXT_COLUMNS = ('rationale', 'review')
+
+def ensure_full_text_index():
+    """
+    Creates the trades_fts index and the triggers that keep it in sync, and
+    backfills it from existing trades. Returns False when SQLite lacks FTS5.
+    """
+    columns = ', '.join(FULL_TEXT_COLUMNS)
+    old_values = ', '.join(f'old.{column}' for column in FULL_TEXT_COLUMNS)
+    new_values = ', '.join(f'new.{column}' for column in FULL_TEXT_COLUMNS)
+    delete_old = (
+        f"INSERT INTO {FULL_TEXT_TABLE} ({FULL_TEXT_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values});"
+    )
+    insert_new = f'INSERT INTO {FULL_TEXT_TABLE} (rowid, {columns}) VALUES (new.id, {new_values});'
+    with db.engine.begin() as connection:
+        exists = connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FULL_TEXT_TABLE,)
+        ).first()
+        if not exists:
+            try:
+                connection.exec_driver_sql(
+                    f"CREATE VIRTUAL TABLE {FULL_TEXT_TABLE} USING fts5({columns}, content='trades', content_rowid='id')"
+                )
+            except db.exc.OperationalError:
+                return False
+            connection.exec_driver_sql(f"INSERT INTO {FULL_TEXT_TABLE} ({FULL_TEXT_TABLE}) VALUES ('rebuild')")
+        connection.exec_driver_sql(
+            f'CREATE TRIGGER IF NOT EXISTS {FULL_TEXT_TABLE}_insert AFTER INSERT ON trades '
+            f'BEGIN {insert_new} END'
+        )
+        connection.exec_driver_sql(
+            f'CREATE TRIGGER IF NOT EXISTS {FULL_TEXT_TABLE}_delete AFTER DELETE ON trades '
+            f'BEGIN {delete_old} END'
+        )
+        # Only note edits touch the index; other trade updates skip it
+        connection.exec_driver_sql(
+            f'CREATE TRIGGER IF NOT EXISTS {FULL_TEXT_TABLE}_update AFTER UPDATE OF {columns} ON trades '
+            f'BEGIN {delete_old} {insert_new} END'
+        )
+    return True
+
+def data_version():
+    """Version of the data migrations applied so far, kept in SQLite's user_version."""
+    with db.engine.connect() as connection:
+        return connection.exec_driver_sql('PRAGMA user_version').scalar()
+
+def set_data_version(version):
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql(f'PRAGMA user_version = {int(version)}')
+
+def checked_journal_version():
+    """Journal stamp recorded by mark_journal_checked(), or None if never checked."""
+    return db.session.execute(db.text('SELECT checked_version FROM journal_version WHERE id = 1')).scalar()
+
+def mark_journal_checked(stamp):
+    db.session.execute(db.text('UPDATE journal_version SET checked_version = :stamp WHERE id = 1'), {'stamp': stamp})
+    db.session.commit()
+
+def schema_fingerprint():
+    """Hash of the models' DDL and MIGRATION_REVISION."""
+    digest = blake2b(str(MIGRATION_REVISION).encode(), digest_size=16)
+    for table in db.metadata.sorted_tables:
+        digest.update(str(CreateTable(table).compile(dialect=db.engine.dialect)).encode())
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            digest.update(str(CreateIndex(index).compile(dialect=db.engine.dialect)).encode())
+    return digest.hexdigest()
+
+def stored_schema_fingerprint():
+    """Fingerprint recorded by the last upgrade, or None (new or older database)."""
+    try:
+        with db.engine.connect() as connection:
+            return connection.exec_driver_sql('SELECT schema_hash FROM journal_version WHERE id = 1').scalar()
+    except db.exc.OperationalError:
+        return None
+
+def upgrade_schema():
+    """
+    Brings the database schema up to date with the models. A single-row
+    lookup answers the common case of an already current database.
+    """
+    fingerprint = schema_fingerprint()
+    if stored_schema_fingerprint() == fingerprint:
+        return []
+    db.create_all()
+    changes = ensure_columns() + ensure_indexes()
+    ensure_version_triggers()
+    ensure_full_text_index()
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql('UPDATE journal_version SET schema_hash = ? WHERE id = 1', (fingerprint,))
+    return changes
@@ -0,0 +1,73 @@
+import base64
+import binascii
+from datetime import datetime
+
+from models import db
+from models.trade import Trade
+
+# Columns a client may request through the `fields=` projection, plus the
+# nested image list which is fetched separately.
+TRADE_FIELDS = [column.name for column in Trade.__table__.columns]
+PROJECTABLE_FIELDS = set(TRADE_FIELDS) | {'images'}
+
+def encode_cursor(entry_datetime, trade_id):
+    """Encodes the (entry_datetime, id) keyset of the last row into an opaque token."""
+    raw = f"{entry_datetime.isoformat()}|{trade_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Decodes a cursor token back into (entry_datetime, id)."""
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        datetime_str, id_str = raw.rsplit('|', 1)
+        return datetime.fromisoformat(datetime_str), int(id_str)
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        raise ValueError(f'Invalid cursor: {cursor}')
+
+def parse_fields(fields_param):
+    """Turns a comma separated `fields=` value into a validated field list."""
+    if not fields_param:
+        return TRADE_FIELDS + ['images']
+    fields = [field.strip() for field in fields_param.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in PROJECTABLE_FIELDS]
+    if unknown:
+        raise ValueError(f'Unknown fields: {", ".join(unknown)}')
+    return fields
+
+def keyset_query(fields, cursor=None):
+    """
+    Builds a newest-first trade query that only selects the requested columns.
+    `id` and `entry_datetime` are always selected because they form the keyset.
+    """
+    column_names = ['id', 'entry_datetime'] + [
+        field for field in fields if field not in ('id', 'entry_datetime', 'images')
+    ]
+    query = db.session.query(*[getattr(Trade, name) for name in column_names])
+    if cursor:
+        cursor_datetime, cursor_id = decode_cursor(cursor)
+        # Row-value comparison lets SQLite seek the (entry_datetime, id) index
+        query = query.filter(db.tuple_(Trade.entry_datetime, Trade.id) < (cursor_datetime, cursor_id))
+    return query.order_by(Trade.entry_datetime.desc(), Trade.id.desc())
+
+def serialize_row(row, fields, images_by_trade=None):
+    """Serializes a projected row, keeping only the requested fields."""
+    item = {}
+    for field in fields:
+        if field == 'images':
+            item['images'] = images_by_trade.get(row.id, []) if images_by_trade else []
+            continue
+        value = getattr(row, field)
+        item[field] = value.isoformat() if isinstance(value, datetime) else value
+    return item
+
+def iter_batches(query, batch_size):
+    """Yields lists of rows from a server-side cursor without loading the whole result."""
+    batch = []
+    for row in query.yield_per(batch_size):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,29 @@
+from sqlalchemy import event
+
+class QueryCounter:
+    """
+    Counts the SQL statements executed on an engine while the context is active.
+
+        with QueryCounter(db.engine) as counter:
+            client.get('/api/trades')
+        assert counter.count == 2
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+        return False
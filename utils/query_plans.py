@@ -0,0 +1,60 @@
+"""
+EXPLAIN QUERY PLAN checks for the hot queries of the app.
+
+A query regresses when SQLite falls back to a full table scan or has to sort
+through a temporary B-tree instead of reading rows in index order.
+"""
+from datetime import datetime, timedelta
+
+from models import db
+from models.trade import Trade
+from models.trade_image import TradeImage
+from models.trade_tag import TradeTag
+from utils.pagination import keyset_query, encode_cursor
+
+def hot_queries():
+    """The statements behind the list, weekly, keyset, tag search and image endpoints."""
+    week_start = datetime(2024, 1, 1)
+    return {
+        'trade list': db.select(Trade).order_by(Trade.entry_datetime.desc()),
+        'keyset page': keyset_query(['id', 'net_profit'], encode_cursor(week_start, 100)).limit(100).statement,
+        'weekly range': db.select(Trade).where(
+            Trade.entry_datetime >= week_start,
+            Trade.entry_datetime <= week_start + timedelta(days=6, hours=23, minutes=59, seconds=59)
+        ).order_by(Trade.entry_datetime),
+        'instrument range': db.select(Trade).where(
+            Trade.instrument == 'EUR/USD', Trade.entry_datetime >= week_start
+        ),
+        'tag lookup': db.select(TradeTag.trade_id).where(TradeTag.kind == 'tag', TradeTag.name == 'breakout'),
+        'tags of trade': db.select(TradeTag.id).where(TradeTag.trade_id == 1),
+        'images of trades': db.select(TradeImage).where(TradeImage.trade_id.in_([1, 2, 3])),
+        'image replacement': db.select(TradeImage).where(
+            TradeImage.trade_id == 1, TradeImage.image_type == 'ENTRY'
+        )
+    }
+
+def explain(statement):
+    """Returns the EXPLAIN QUERY PLAN detail lines of a statement."""
+    compiled = statement.compile(dialect=db.engine.dialect, compile_kwargs={'render_postcompile': True})
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    with db.engine.connect() as connection:
+        rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}', params).all()
+    return [row[-1] for row in rows]
+
+def plan_problems(plan):
+    """Lines of a plan that indicate a full scan or an unindexed sort."""
+    problems = []
+    for line in plan:
+        if line.startswith('SCAN') and 'USING' not in line:
+            problems.append(line)
+        elif 'TEMP B-TREE' in line:
+            problems.append(line)
+    return problems
+
+def check_query_plans():
+    """Maps every hot query to (plan, problems)."""
+    results = {}
+    for name, statement in hot_queries().items():
+        plan = explain(statement)
+        results[name] = (plan, plan_problems(plan))
+    return results
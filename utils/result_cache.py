@@ -0,0 +1,116 @@
+"""
+Bounded in-process LRU/TTL cache for computed JSON responses.
+
+Entries are keyed by endpoint, full query string, date and journal version,
+and are dropped as a whole by invalidate(), which every write handler calls
+after committing. The version in the key also retires entries after writes
+made by other processes (CLI imports, generate_fake_data.py); the TTL only
+bounds how long unused entries are kept.
+
+A response computed while a write commits could hold pre-write data, so
+set() drops it when invalidate() ran since the request read `generation`.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from functools import wraps
+
+from flask import request, make_response
+
+from utils.http_cache import journal_version
+
+class ResultCache:
+    def __init__(self, max_entries=128, ttl=300, max_entry_bytes=5 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_entry_bytes = max_entry_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.generation = 0  # bumped by invalidate()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry['expires'] < time.monotonic():
+                del self._entries[key]
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, body, mimetype, etag, generation=None):
+        """Stores a response computed after reading `generation`, unless the cache was invalidated since."""
+        if len(body) > self.max_entry_bytes:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = {
+                'body': body, 'mimetype': mimetype, 'etag': etag,
+                'expires': time.monotonic() + self.ttl
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        """Drops every entry; called after each committed journal write."""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+            self.generation += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0
+            }
+
+def cached_result(cache, name):
+    """
+    Serves a GET view from `cache`. Wrap it around @journal_etag so a hit also
+    answers If-None-Match after only the journal version lookup.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            generation = cache.generation
+            key = (name, request.full_path, date.today().isoformat(), journal_version())
+            entry = cache.get(key)
+            if entry is not None:
+                if entry['etag'] and entry['etag'] in request.if_none_match:
+                    response = make_response('', 304)
+                else:
+                    response = make_response(entry['body'])
+                    response.mimetype = entry['mimetype']
+                if entry['etag']:
+                    response.set_etag(entry['etag'])
+                response.cache_control.no_cache = True
+                return response
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                etag, _ = response.get_etag()
+                cache.set(key, response.get_data(), response.mimetype, etag, generation)
+            return response
+        return wrapper
+    return decorator
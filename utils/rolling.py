@@ -0,0 +1,169 @@
+"""
+Rolling-window analytics for /api/advanced-analysis/rolling.
+
+Every window statistic is a difference of prefix sums, so a series costs
+O(n) however large the window is: the sum over trades (i - window, i] is
+cumsum[i + 1] - cumsum[i + 1 - window]. Only the windows that end on a
+sampled point (every `step` trades or days) are evaluated.
+"""
+import numpy as np
+
+from models import db
+from models.trade import Trade
+
+EPOCH = np.datetime64('1970-01-01', 'D')
+JULIAN_DAY_OF_EPOCH = 2440587.5
+DAYS_PER_YEAR = 365  # daily P&L is over calendar days, so Sharpe / Sortino annualize with sqrt(365)
+
+def load_trade_days(query_filter=None):
+    """
+    Day number (days since 1970-01-01) and net profit of the matching trades,
+    in entry order. The rows are read unordered and sorted by NumPy on
+    (entry time, id): at a million trades that is several times faster than
+    ORDER BY, which walks the entry index and looks up every row, and plain
+    DBAPI tuples skip building SQLAlchemy rows. Entries less than ~50 µs
+    apart (the float precision of julianday()) keep id order.
+    """
+    statement = db.select(
+        db.func.julianday(Trade.entry_datetime) - JULIAN_DAY_OF_EPOCH, Trade.id, Trade.net_profit
+    )
+    if query_filter is not None:
+        statement = statement.where(query_filter)
+    compiled = statement.compile(dialect=db.engine.dialect, compile_kwargs={'render_postcompile': True})
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    cursor = db.session.connection().connection.cursor()
+    try:
+        rows = cursor.execute(str(compiled), params).fetchall()
+    finally:
+        cursor.close()
+    entry, trade_id, net_profit = np.array(rows, dtype=float).reshape(-1, 3).T
+    order = np.lexsort((trade_id, entry))
+    return np.floor(entry[order]).astype(np.int64), net_profit[order]
+
+def prefix_sums(values):
+    """Cumulative sums with a leading 0, so window sums are a single subtraction."""
+    return np.concatenate(([0.0], np.cumsum(values, dtype=float)))
+
+def window_ends(size, window, step):
+    """Indices of the last element of every `step`-th full window; the latest window is always included."""
+    if size < window:
+        return np.empty(0, dtype=np.int64)
+    ends = np.arange(window - 1, size, step)
+    if ends[-1] != size - 1:
+        ends = np.append(ends, size - 1)
+    return ends
+
+def window_sums(prefix, ends, window):
+    return prefix[ends + 1] - prefix[ends + 1 - window]
+
+def day_labels(days):
+    """Day numbers (days since 1970-01-01) as 'YYYY-MM-DD' strings."""
+    return (EPOCH + np.asarray(days, dtype=np.int64)).astype(str).tolist()
+
+def chart_values(values, digits=4):
+    """Rounded floats for JSON; windows without a defined value (NaN) become None."""
+    rounded = np.round(values, digits)
+    return [None if value != value else value for value in rounded.tolist()]
+
+def rolling_trade_metrics(net_profit, window, step):
+    """
+    Win rate (%), expectancy (average net profit) and profit factor over the
+    last `window` trades, every `step` trades. Windows without a losing trade
+    have no profit factor (None).
+    """
+    ends = window_ends(len(net_profit), window, step)
+    wins = window_sums(prefix_sums(net_profit > 0), ends, window)
+    total = window_sums(prefix_sums(net_profit), ends, window)
+    gross_profit = window_sums(prefix_sums(np.where(net_profit > 0, net_profit, 0.0)), ends, window)
+    gross_loss = -window_sums(prefix_sums(np.where(net_profit < 0, net_profit, 0.0)), ends, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        profit_factor = np.where(gross_loss > 0, gross_profit / gross_loss, np.nan)
+    return ends, {
+        'winRate': chart_values(wins / window * 100, 2),
+        'expectancy': chart_values(total / window, 2),
+        'profitFactor': chart_values(profit_factor, 2)
+    }
+
+def daily_pnl(days, net_profit):
+    """Net profit per calendar day from the first to the last trading day, 0 on days without trades."""
+    if not len(days):
+        return 0, np.empty(0)
+    first = int(days.min())
+    return first, np.bincount(days - first, weights=net_profit)
+
+def rolling_daily_ratios(daily, window, step):
+    """
+    Annualized Sharpe and Sortino ratios of daily P&L over the last `window`
+    days, every `step` days. Sharpe uses the sample standard deviation,
+    Sortino the downside deviation (root mean square of the losing days);
+    windows where either is 0 have no ratio (None).
+    """
+    ends = window_ends(len(daily), window, step)
+    total = window_sums(prefix_sums(daily), ends, window)
+    squares = window_sums(prefix_sums(daily * daily), ends, window)
+    downside = window_sums(prefix_sums(np.minimum(daily, 0.0) ** 2), ends, window)
+    mean = total / window
+    # Clipped: rounding in the prefix sums can leave a tiny negative variance
+    variance = np.maximum(squares - total * mean, 0.0) / max(window - 1, 1)
+    std, downside_deviation = np.sqrt(variance), np.sqrt(downside / window)
+    scale = np.sqrt(DAYS_PER_YEAR)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(std > 1e-12, mean / std * scale, np.nan)
+        sortino = np.where(downside_deviation > 1e-12, mean / downside_deviation * scale, np.nan)
+    return ends, {'sharpe': chart_values(sharpe, 3), 'sortino': chart_values(sortino, 3)}
+
+def underwater(daily):
+    """
+    Amount below the running equity peak at the end of each day (<= 0). As
+    in equity_and_drawdown(), the peak starts at 0.
+    """
+    equity = np.cumsum(daily)
+    return equity - np.maximum.accumulate(np.maximum(equity, 0)) if len(equity) else equity
+
+def underwater_summary(first_day, below_peak):
+    """
+    Max drawdown duration (the longest run of days below the peak, with the
+    day it started and the day the peak was regained, None while still under
+    water), time under water as a share of all days and the current run.
+    """
+    mask = below_peak < -1e-9
+    size = len(mask)
+    summary = {'maxDrawdownDays': 0, 'maxDrawdownStart': None, 'maxDrawdownEnd': None,
+               'timeUnderWaterPct': 0, 'currentUnderwaterDays': 0}
+    if not mask.any():
+        return summary
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    longest = int(np.argmax(ends - starts))
+    start, end = int(starts[longest]), int(ends[longest])
+    summary.update({
+        'maxDrawdownDays': end - start,
+        'maxDrawdownStart': day_labels([first_day + start])[0],
+        'maxDrawdownEnd': day_labels([first_day + end])[0] if end < size else None,
+        'timeUnderWaterPct': round(float(mask.sum()) / size * 100, 2),
+        'currentUnderwaterDays': size - int(starts[-1]) if ends[-1] == size else 0
+    })
+    return summary
+
+def rolling_series(days, net_profit, window, window_days, step=None, day_step=None, max_points=1000):
+    """
+    All rolling series of the trades given as (day number, net profit) arrays
+    in entry order. Without an explicit step, windows are sampled so a series
+    has at most about `max_points` points.
+    """
+    step = step or max(1, -(-(len(net_profit) - window + 1) // max_points))
+    trade_ends, trade_series = rolling_trade_metrics(net_profit, window, step)
+
+    first_day, daily = daily_pnl(days, net_profit)
+    day_step = day_step or max(1, -(-(len(daily) - window_days + 1) // max_points))
+    day_ends, day_series = rolling_daily_ratios(daily, window_days, day_step)
+    below_peak = underwater(daily)
+    underwater_days = window_ends(len(daily), 1, day_step)
+
+    return {
+        'window': window, 'windowDays': window_days, 'step': step, 'dayStep': day_step,
+        'trades': dict(labels=day_labels(days[trade_ends]), **trade_series),
+        'days': dict(labels=day_labels(first_day + day_ends), **day_series),
+        'underwater': {'labels': day_labels(first_day + underwater_days), 'data': chart_values(below_peak[underwater_days], 2)},
+        'drawdown': underwater_summary(first_day, below_peak)
+    }
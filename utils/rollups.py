@@ -0,0 +1,182 @@
+"""
+Day / ISO week / month rollups of the journal, per instrument and overall.
+
+Day rows are rebuilt from the trades of the day in SQL (window functions give
+the in-day equity path). Week and month rows are composed from their day rows,
+which carry enough of that path (peak, low, drawdown) to chain exactly, so a
+write only re-reads the trades of the days it touches and the calendar views
+read a handful of precomputed rows.
+"""
+from datetime import datetime, timedelta
+from itertools import groupby
+
+from models import db
+from models.trade import Trade
+from models.trade_rollup import TradeRollup
+from utils.statistics import trade_totals
+
+ROLLUP_PERIODS = ('day', 'week', 'month')
+ALL_INSTRUMENTS = '*'
+SUM_FIELDS = ('trade_count', 'win_count', 'loss_count', 'gross_profit', 'gross_loss', 'net_profit')
+ROLLUP_FIELDS = SUM_FIELDS + ('peak_equity', 'low_equity', 'max_drawdown')
+
+INSERT_DAY_ROLLUPS_SQL = """
+INSERT INTO trade_rollups (
+    period, period_start, instrument, trade_count, win_count, loss_count,
+    gross_profit, gross_loss, net_profit, peak_equity, low_equity, max_drawdown
+)
+SELECT 'day', day, instrument, COUNT(*), SUM(net_profit > 0), SUM(net_profit < 0),
+    SUM(MAX(net_profit, 0)), SUM(MAX(-net_profit, 0)), SUM(net_profit),
+    MAX(peak), MIN(MIN(equity), 0), MAX(peak - equity)
+FROM (
+    SELECT day, instrument, net_profit, equity,
+        MAX(MAX(equity, 0)) OVER (
+            PARTITION BY day, instrument ORDER BY entry_datetime, id ROWS UNBOUNDED PRECEDING
+        ) AS peak
+    FROM (
+        SELECT date(entry_datetime) AS day, {instrument} AS instrument, entry_datetime, id, net_profit,
+            SUM(net_profit) OVER (
+                PARTITION BY date(entry_datetime), {instrument} ORDER BY entry_datetime, id ROWS UNBOUNDED PRECEDING
+            ) AS equity
+        FROM trades
+        WHERE {where}
+    )
+)
+GROUP BY day, instrument
+"""
+
+def period_start(period, day):
+    """First day of the day / week (Monday) / month containing `day`."""
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    return day
+
+def next_period_start(period, start):
+    if period == 'week':
+        return start + timedelta(days=7)
+    if period == 'month':
+        return (start + timedelta(days=32)).replace(day=1)
+    return start + timedelta(days=1)
+
+def as_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+def compose(day_rollups):
+    """
+    Totals of consecutive days (chronological rollups). A day's drawdown is
+    either its own or the fall from the peak carried in from earlier days.
+    """
+    totals = dict.fromkeys(ROLLUP_FIELDS, 0)
+    equity = 0
+    for day in day_rollups:
+        for field in SUM_FIELDS:
+            totals[field] += getattr(day, field)
+        totals['max_drawdown'] = max(
+            totals['max_drawdown'], day.max_drawdown, totals['peak_equity'] - (equity + day.low_equity)
+        )
+        totals['peak_equity'] = max(totals['peak_equity'], equity + day.peak_equity)
+        totals['low_equity'] = min(totals['low_equity'], equity + day.low_equity)
+        equity += day.net_profit
+    return totals
+
+def compose_periods(first_day, end_day, instruments):
+    """Rebuilds week and month rows over [first_day, end_day) from the day rows."""
+    for period in ('week', 'month'):
+        start = period_start(period, first_day)
+        end = next_period_start(period, period_start(period, end_day - timedelta(days=1)))
+        delete = db.delete(TradeRollup).where(
+            TradeRollup.period == period,
+            TradeRollup.period_start >= start.isoformat(), TradeRollup.period_start < end.isoformat()
+        )
+        days = TradeRollup.query.filter(
+            TradeRollup.period == 'day',
+            TradeRollup.period_start >= start.isoformat(), TradeRollup.period_start < end.isoformat()
+        )
+        if instruments is not None:
+            delete = delete.where(TradeRollup.instrument.in_(instruments))
+            days = days.filter(TradeRollup.instrument.in_(instruments))
+        db.session.execute(delete)
+        days = days.order_by(TradeRollup.instrument, TradeRollup.period_start).all()
+
+        def period_key(day):
+            return day.instrument, period_start(period, datetime.strptime(day.period_start, '%Y-%m-%d').date())
+
+        db.session.add_all([
+            TradeRollup(period=period, period_start=start_day.isoformat(), instrument=instrument, **compose(group))
+            for (instrument, start_day), group in groupby(days, key=period_key)
+        ])
+
+def refresh_rollups(first=None, last=None, instruments=None):
+    """
+    Rebuilds the rollups of every period overlapping [first, last] (dates or
+    datetimes; None means the whole journal) for `instruments` (None: all) and
+    for all instruments together, in the current transaction.
+    """
+    # Pending ORM changes must be visible to the SQL below
+    db.session.flush()
+    if first is None:
+        bounds = db.session.query(db.func.min(Trade.entry_datetime), db.func.max(Trade.entry_datetime)).one()
+        db.session.execute(db.delete(TradeRollup))
+        if bounds[0] is None:
+            return
+        first, last, refreshed = bounds[0], bounds[1], None
+    else:
+        refreshed = None if instruments is None else sorted(set(instruments)) + [ALL_INSTRUMENTS]
+    first_day, end_day = as_date(first), as_date(last) + timedelta(days=1)
+
+    day_rows = db.delete(TradeRollup).where(
+        TradeRollup.period == 'day',
+        TradeRollup.period_start >= first_day.isoformat(), TradeRollup.period_start < end_day.isoformat()
+    )
+    if refreshed is not None:
+        day_rows = day_rows.where(TradeRollup.instrument.in_(refreshed))
+    db.session.execute(day_rows)
+
+    connection = db.session.connection()
+    where, params = 'entry_datetime >= ? AND entry_datetime < ?', (first_day.isoformat(), end_day.isoformat())
+    if instruments is not None:
+        instrument_names = sorted(set(instruments))
+        instrument_where = where + f" AND instrument IN ({', '.join('?' * len(instrument_names))})"
+        instrument_params = params + tuple(instrument_names)
+    else:
+        instrument_where, instrument_params = where, params
+    connection.exec_driver_sql(INSERT_DAY_ROLLUPS_SQL.format(instrument='instrument', where=instrument_where), instrument_params)
+    connection.exec_driver_sql(INSERT_DAY_ROLLUPS_SQL.format(instrument=f"'{ALL_INSTRUMENTS}'", where=where), params)
+    compose_periods(first_day, end_day, refreshed)
+
+def refresh_trade_rollups(*keys):
+    """Refreshes the periods of single-trade changes; keys are (entry_datetime, instrument)."""
+    for entry_datetime, instrument in set(keys):
+        refresh_rollups(entry_datetime, entry_datetime, [instrument])
+
+def rollup_key(trade):
+    return trade.entry_datetime, trade.instrument
+
+def rebuild_rollups():
+    """Recomputes every rollup row from the trades table."""
+    refresh_rollups()
+    db.session.commit()
+
+def rollups_in_sync(totals=None):
+    """Cheap drift check against the raw table, like aggregates_in_sync()."""
+    rollup_count, rollup_profit = db.session.query(
+        db.func.coalesce(db.func.sum(TradeRollup.trade_count), 0),
+        db.func.coalesce(db.func.sum(TradeRollup.net_profit), 0)
+    ).filter(TradeRollup.period == 'day', TradeRollup.instrument == ALL_INSTRUMENTS).one()
+    trade_count, trade_profit = totals or trade_totals()
+    return rollup_count == trade_count and abs(rollup_profit - trade_profit) < 0.01
+
+def period_rollups(period, start=None, end=None, instrument=ALL_INSTRUMENTS):
+    """Rollup rows of one period kind and instrument with period_start in [start, end], oldest first."""
+    query = TradeRollup.query.filter_by(period=period, instrument=instrument)
+    if start is not None:
+        query = query.filter(TradeRollup.period_start >= as_date(start).isoformat())
+    if end is not None:
+        query = query.filter(TradeRollup.period_start <= as_date(end).isoformat())
+    return query.order_by(TradeRollup.period_start).all()
+
+def monthly_net_profit():
+    """List of (month 'YYYY-MM', net profit) pairs in chronological order."""
+    return [(rollup.period_start[:7], rollup.net_profit) for rollup in period_rollups('month')]
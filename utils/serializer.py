@@ -0,0 +1,111 @@
+"""
+Fast JSON encoding of trade lists.
+
+Trades are read as Core rows (no ORM objects or identity map) and encoded
+with orjson when it is installed, falling back to the standard library. The
+encoded form of each trade is cached by (id, updated_at): every write bumps
+updated_at, and journal trades are closed (they always have an exit), so a
+cached entry stays valid until the trade is edited.
+"""
+import json
+import threading
+from collections import defaultdict
+from datetime import date
+
+from flask import Response
+
+from models import db
+from models.trade import Trade
+from models.trade_image import TradeImage
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+TRADE_COLUMNS = [column.name for column in Trade.__table__.columns]
+IMAGE_COLUMNS = [column.name for column in TradeImage.__table__.columns]
+ID_INDEX = TRADE_COLUMNS.index('id')
+UPDATED_AT_INDEX = TRADE_COLUMNS.index('updated_at')
+IMAGES_KEY = b',"images":'
+
+def _default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+def dumps(value):
+    """Encodes `value` to compact JSON bytes; dates and datetimes become ISO strings."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(',', ':'), default=_default).encode()
+
+def json_response(value, status=200):
+    return Response(dumps(value), status=status, mimetype='application/json')
+
+def trade_rows(*order_by):
+    """Every trade as a Core row with all columns, in `order_by` order."""
+    return db.session.execute(db.select(Trade.__table__).order_by(*order_by)).all()
+
+def image_dicts(trade_ids=None):
+    """Image records (as TradeImage.to_dict() would build them) grouped by trade id."""
+    query = db.select(*[TradeImage.__table__.c[name] for name in IMAGE_COLUMNS])
+    if trade_ids is not None:
+        if not trade_ids:
+            return {}
+        query = query.where(TradeImage.trade_id.in_(trade_ids))
+    images_by_trade = defaultdict(list)
+    for row in db.session.execute(query):
+        images_by_trade[row.trade_id].append(dict(zip(IMAGE_COLUMNS, row)))
+    return images_by_trade
+
+class TradeSerializer:
+    """Encodes trade rows to the JSON of Trade.to_dict(), caching the encoded columns per trade."""
+
+    def __init__(self, max_entries=50000):
+        self.max_entries = max_entries
+        # id -> (updated_at, encoded columns without the closing brace). Once full,
+        # new trades are encoded without being cached: evicting in list order
+        # would make every scan of a journal larger than the cache miss.
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def encode_trades(self, rows, images_by_trade):
+        """JSON array of the given trade rows (Core rows of all columns), each with its image list."""
+        # The lock only covers the lookups and the stores, so concurrent
+        # requests encode in parallel
+        with self._lock:
+            cached = [self._entries.get(row[ID_INDEX]) for row in rows]
+        parts, encoded = [], {}
+        for row, entry in zip(rows, cached):
+            trade_id, updated_at = row[ID_INDEX], row[UPDATED_AT_INDEX]
+            if entry is None or entry[0] != updated_at:
+                # Everything but the closing brace, so the images can be appended
+                fragment = dumps(dict(zip(TRADE_COLUMNS, row)))[:-1]
+                encoded[trade_id] = (updated_at, fragment)
+            else:
+                fragment = entry[1]
+            images = images_by_trade.get(trade_id)
+            parts += (fragment, IMAGES_KEY, dumps(images) if images else b'[]', b'},')
+        with self._lock:
+            entries = self._entries
+            for trade_id, entry in encoded.items():
+                if trade_id in entries or len(entries) < self.max_entries:
+                    entries[trade_id] = entry
+            self.misses += len(encoded)
+            self.hits += len(rows) - len(encoded)
+        if parts:
+            parts[-1] = b'}'
+        return b'[' + b''.join(parts) + b']'
+
+    def forget(self, trade_ids):
+        """Drops the entries of deleted trades."""
+        with self._lock:
+            for trade_id in trade_ids:
+                self._entries.pop(trade_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'max_entries': self.max_entries, 'hits': self.hits, 'misses': self.misses}
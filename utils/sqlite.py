@@ -0,0 +1,25 @@
+from sqlalchemy import event
+
+# Applied to every pooled connection when it is opened. WAL lets dashboard
+# reads proceed while a trade is being saved, NORMAL sync is durable under WAL,
+# and busy_timeout makes writers wait for the lock instead of failing.
+PERFORMANCE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,  # ms
+    'cache_size': -64000,  # negative = KiB, i.e. 64MB per connection
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY'
+}
+
+def configure_sqlite(engine, pragmas):
+    """Registers a connect hook that applies `pragmas` to each new connection."""
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
@@ -0,0 +1,126 @@
+from models import db
+from models.trade import Trade
+from models.trade_aggregate import TradeAggregate
+from utils.instruments import has_initial_risk, price_r_value
+
+# Bump when trade_contribution() changes; existing aggregates are rebuilt on the next start
+AGGREGATES_REVISION = 2
+R_BIN_LABELS = ["<-2R", "-2R to -1R", "-1R to 0R", "0R to 1R", "1R to 2R", ">2R"]
+R_BIN_COLUMNS = ['r_lt_neg2', 'r_neg2_neg1', 'r_neg1_0', 'r_0_1', 'r_1_2', 'r_gt_2']
+SUM_COLUMNS = [
+    'trade_count', 'win_count', 'loss_count', 'gross_profit', 'gross_loss',
+    'net_profit', 'duration_seconds'
+] + R_BIN_COLUMNS
+
+def r_bin_column(r):
+    if r <= -2: return 'r_lt_neg2'
+    elif -2 < r <= -1: return 'r_neg2_neg1'
+    elif -1 < r < 0: return 'r_neg1_0'
+    elif 0 <= r < 1: return 'r_0_1'
+    elif 1 <= r < 2: return 'r_1_2'
+    return 'r_gt_2'
+
+def distribution_r(trade):
+    """
+    R-multiple a trade is binned by. A stored r_value of 0 means none was
+    derived (trades entered before the P&L engine, unlisted instruments), so
+    the price-based R is used instead; for a real 0R trade both are 0.
+    """
+    if trade.r_value:
+        return trade.r_value
+    return price_r_value(trade.order_type, trade.entry_price, trade.exit_price, trade.initial_stop_loss)
+
+def trade_contribution(trade):
+    """
+    Snapshot of what a single trade adds to its (instrument, month) aggregate.
+    Works with Trade instances as well as projected rows.
+    """
+    values = dict.fromkeys(SUM_COLUMNS, 0)
+    values['trade_count'] = 1
+    values['net_profit'] = trade.net_profit
+    if trade.net_profit > 0:
+        values['win_count'] = 1
+        values['gross_profit'] = trade.net_profit
+    elif trade.net_profit < 0:
+        values['loss_count'] = 1
+        values['gross_loss'] = -trade.net_profit
+    values['duration_seconds'] = (trade.exit_datetime - trade.entry_datetime).total_seconds()
+    if has_initial_risk(trade.entry_price, trade.initial_stop_loss, trade.position_size):
+        values[r_bin_column(distribution_r(trade))] = 1
+    return trade.instrument, trade.entry_datetime.strftime('%Y-%m'), values
+
+def merge_contribution(totals, contribution):
+    """Accumulates a trade contribution into an in-memory {(instrument, month): values} dict."""
+    instrument, month, values = contribution
+    bucket = totals.setdefault((instrument, month), dict.fromkeys(SUM_COLUMNS, 0))
+    for column, value in values.items():
+        bucket[column] += value
+
+def apply_totals(totals, sign=1):
+    """Applies merged contributions (see merge_contribution), one row update per key."""
+    for (instrument, month), values in totals.items():
+        apply_contribution((instrument, month, values), sign)
+
+def apply_contribution(contribution, sign=1):
+    """Adds (sign=1) or removes (sign=-1) a trade contribution in the current session."""
+    instrument, month, values = contribution
+    aggregate = TradeAggregate.query.filter_by(instrument=instrument, month=month).first()
+    if aggregate is None:
+        if sign < 0:
+            # Nothing to remove from; the drift is repaired by rebuild_aggregates()
+            return
+        aggregate = TradeAggregate(instrument=instrument, month=month, **dict.fromkeys(SUM_COLUMNS, 0))
+        db.session.add(aggregate)
+    for column, value in values.items():
+        setattr(aggregate, column, getattr(aggregate, column) + sign * value)
+    if aggregate.trade_count <= 0:
+        db.session.delete(aggregate)
+
+def record_trade_change(old=None, new=None):
+    """Moves a trade's contribution from `old` to `new`; either side may be None."""
+    if old is not None:
+        apply_contribution(old, -1)
+    if new is not None:
+        apply_contribution(new, 1)
+
+def rebuild_aggregates():
+    """Recomputes every aggregate row from the trades table in one pass."""
+    TradeAggregate.query.delete()
+    totals = {}
+    rows = db.session.query(
+        Trade.instrument, Trade.order_type, Trade.entry_datetime, Trade.exit_datetime, Trade.net_profit,
+        Trade.entry_price, Trade.exit_price, Trade.initial_stop_loss, Trade.position_size, Trade.r_value
+    ).yield_per(1000)
+    for row in rows:
+        merge_contribution(totals, trade_contribution(row))
+    db.session.add_all([
+        TradeAggregate(instrument=instrument, month=month, **values)
+        for (instrument, month), values in totals.items()
+    ])
+    db.session.commit()
+    return len(totals)
+
+def trade_totals():
+    """(count, net profit) of the raw trades table, the reference of the drift checks."""
+    return tuple(db.session.query(
+        db.func.count(Trade.id), db.func.coalesce(db.func.sum(Trade.net_profit), 0)
+    ).one())
+
+def aggregates_in_sync(totals=None):
+    """
+    Cheap drift check: trade count and net profit must match the raw table.
+    `totals` lets several checks share one trade_totals() scan.
+    """
+    aggregate_count, aggregate_profit = db.session.query(
+        db.func.coalesce(db.func.sum(TradeAggregate.trade_count), 0),
+        db.func.coalesce(db.func.sum(TradeAggregate.net_profit), 0)
+    ).one()
+    trade_count, trade_profit = totals or trade_totals()
+    return aggregate_count == trade_count and abs(aggregate_profit - trade_profit) < 0.01
+
+def journal_totals():
+    """Totals over the whole journal, summed from the aggregate rows."""
+    row = db.session.query(*[
+        db.func.coalesce(db.func.sum(getattr(TradeAggregate, column)), 0) for column in SUM_COLUMNS
+    ]).one()
+    return dict(zip(SUM_COLUMNS, row))
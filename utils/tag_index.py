@@ -0,0 +1,107 @@
+"""Maintenance of the trade_tags index from the free-text tags / emotions columns."""
+from models import db
+from models.trade import Trade
+from models.trade_tag import TradeTag
+
+# Index kind -> Trade column holding the comma separated text
+INDEXED_COLUMNS = {'tag': 'tags', 'emotion': 'emotions'}
+BACKFILL_BATCH_SIZE = 5000
+TAG_MATCH_MODES = ('all', 'any')
+# Names matching fewer index rows than this drive a search from the index;
+# more common names are checked per trade while walking the date index
+SELECTIVE_TAG_LIMIT = 5000
+
+def parse_names(text):
+    """Splits comma separated text into unique, trimmed, lower-cased names."""
+    if not text:
+        return []
+    names = []
+    for part in text.split(','):
+        name = ' '.join(part.split()).lower()[:100]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+def tag_rows(trade_id, tags, emotions):
+    """Index rows (trade_id, kind, name) for one trade."""
+    values = {'tag': tags, 'emotion': emotions}
+    return [
+        (trade_id, kind, name)
+        for kind in INDEXED_COLUMNS
+        for name in parse_names(values[kind])
+    ]
+
+def insert_tag_rows(rows):
+    if rows:
+        db.session.connection().exec_driver_sql(
+            'INSERT INTO trade_tags (trade_id, kind, name) VALUES (?, ?, ?)', rows
+        )
+
+def remove_trade_tags(trade_id):
+    TradeTag.query.filter_by(trade_id=trade_id).delete(synchronize_session=False)
+
+def sync_trade_tags(trade):
+    """Rewrites the index rows of one trade in the current transaction."""
+    remove_trade_tags(trade.id)
+    insert_tag_rows(tag_rows(trade.id, trade.tags, trade.emotions))
+
+def reindex_trades(trade_ids):
+    """Rebuilds the index rows of the given trades from their current tags / emotions."""
+    TradeTag.query.filter(TradeTag.trade_id.in_(trade_ids)).delete(synchronize_session=False)
+    rows = db.session.query(Trade.id, Trade.tags, Trade.emotions).filter(Trade.id.in_(trade_ids))
+    insert_tag_rows([tag_row for row in rows for tag_row in tag_rows(row.id, row.tags, row.emotions)])
+
+def index_trades_after(last_id):
+    """Indexes every trade with an id above `last_id` (bulk inserts, backfills)."""
+    query = db.session.query(Trade.id, Trade.tags, Trade.emotions) \
+        .filter(Trade.id > last_id).order_by(Trade.id)
+    indexed = 0
+    batch = []
+    for row in query.yield_per(BACKFILL_BATCH_SIZE):
+        batch.extend(tag_rows(row.id, row.tags, row.emotions))
+        indexed += 1
+        if len(batch) >= BACKFILL_BATCH_SIZE:
+            insert_tag_rows(batch)
+            batch = []
+    insert_tag_rows(batch)
+    return indexed
+
+def rebuild_tag_index():
+    """Rebuilds the whole index from the trades table."""
+    TradeTag.query.delete()
+    indexed = index_trades_after(0)
+    db.session.commit()
+    return indexed
+
+def tag_index_missing():
+    """True when trades carry tags or emotions but nothing has been indexed (pre-index databases)."""
+    if db.session.query(TradeTag.id).first() is not None:
+        return False
+    return db.session.query(Trade.id).filter(db.or_(Trade.tags != '', Trade.emotions != '')).first() is not None
+
+def tag_frequency(kind, names, limit=SELECTIVE_TAG_LIMIT):
+    """Index rows for any of `names`, counted up to `limit` so common names stay cheap."""
+    matches = db.select(TradeTag.trade_id) \
+        .where(TradeTag.kind == kind, TradeTag.name.in_(names)).limit(limit).subquery()
+    return db.session.execute(db.select(db.func.count()).select_from(matches)).scalar()
+
+def tag_search_conditions(kind, names, match='all'):
+    """
+    Conditions on Trade for trades indexed with all (or any) of `names`.
+    A selective name becomes an id IN (...) list SQLite drives the query from;
+    common ones become correlated EXISTS probes of the covering index, which
+    are cheap when paging newest-first with a LIMIT.
+    """
+    if not names:
+        return []
+    groups = [names] if match == 'any' else [[name] for name in names]
+    frequencies = [tag_frequency(kind, group) for group in groups]
+    rarest = min(range(len(groups)), key=frequencies.__getitem__)
+    conditions = []
+    for position, group in enumerate(groups):
+        matching = (TradeTag.kind == kind, TradeTag.name.in_(group))
+        if position == rarest and frequencies[position] < SELECTIVE_TAG_LIMIT:
+            conditions.append(Trade.id.in_(db.select(TradeTag.trade_id).where(*matching)))
+        else:
+            conditions.append(db.exists().where(TradeTag.trade_id == Trade.id, *matching))
+    return conditions
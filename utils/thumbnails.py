@@ -0,0 +1,104 @@
+"""
+Resized derivatives (thumbnail / medium) of uploaded trade screenshots.
+
+Uploads only enqueue the work; a small bounded thread pool does the resizing
+so the request returns immediately. Pillow is optional: without it no
+derivatives are made and the original image is served instead.
+"""
+import importlib.util
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import safe_join
+
+DERIVATIVE_SIZES = {'thumb': 320, 'medium': 1280}  # Longest edge in pixels
+DERIVATIVE_FOLDER = 'derivatives'
+
+class DerivativeWorker:
+    def __init__(self, upload_folder, max_workers=2, max_pending=64, logger=None):
+        self.upload_folder = upload_folder
+        self.max_workers = max_workers
+        self.logger = logger
+        self.pending = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._webp = None
+
+    @property
+    def available(self):
+        return importlib.util.find_spec('PIL') is not None
+
+    @property
+    def use_webp(self):
+        if self._webp is None:
+            from PIL import features
+            self._webp = bool(features.check('webp'))
+        return self._webp
+
+    def derivative_path(self, filename, size):
+        """Path of a derivative, or None when `filename` would escape the size folder."""
+        name = f"{filename}.webp" if self.use_webp else filename
+        return safe_join(self.upload_folder, DERIVATIVE_FOLDER, size, name)
+
+    def existing_derivative(self, filename, size):
+        """Path of a ready derivative, or None."""
+        if not self.available:
+            return None
+        path = self.derivative_path(filename, size)
+        return path if path and os.path.isfile(path) else None
+
+    def enqueue(self, filename):
+        """
+        Schedules derivative generation. Returns False when Pillow is missing or
+        the queue is full; the derivative is then requested again on first view.
+        """
+        if safe_join(self.upload_folder, filename) is None:
+            return False
+        if not self.available or not self.pending.acquire(blocking=False):
+            return False
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='derivatives')
+        self._executor.submit(self._generate_all, filename)
+        return True
+
+    def _generate_all(self, filename):
+        try:
+            for size in DERIVATIVE_SIZES:
+                self.generate(filename, size)
+        except Exception as e:
+            if self.logger:
+                self.logger.error(f"Error generating derivatives for {filename}: {e}")
+        finally:
+            self.pending.release()
+
+    def generate(self, filename, size):
+        """Writes one derivative, atomically, unless it already exists."""
+        from PIL import Image
+
+        target = self.derivative_path(filename, size)
+        if target is None or os.path.exists(target):
+            return target
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with Image.open(os.path.join(self.upload_folder, filename)) as image:
+            image.thumbnail((DERIVATIVE_SIZES[size], DERIVATIVE_SIZES[size]))
+            if self.use_webp:
+                image_format = 'WEBP'
+            else:
+                image_format = image.format
+                if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                    image = image.convert('RGB')
+            temp_path = f"{target}.{threading.get_ident()}.tmp"
+            image.save(temp_path, format=image_format, quality=80)
+        os.replace(temp_path, target)
+        return target
+
+    def remove(self, filename):
+        """Deletes every derivative of an original."""
+        if not self.available:
+            return
+        for size in DERIVATIVE_SIZES:
+            path = self.derivative_path(filename, size)
+            if path and os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,176 @@
+"""
+Set-based batch update and delete of trades.
+
+A batch selects trades by id list or by the analytics filters, then runs a
+handful of UPDATE / DELETE ... WHERE id IN (...) statements in the caller's
+transaction, keeping the statistics, the tag index and the image reference
+counts in step. The caller commits.
+"""
+from collections import Counter
+from datetime import datetime
+
+from models import db
+from models.trade import Trade
+from models.trade_image import TradeImage
+from models.trade_tag import TradeTag
+from models.image_blob import ImageBlob
+from utils.statistics import apply_totals
+from utils.analysis_query import filter_conditions, contribution_totals
+from utils.tag_index import reindex_trades
+from utils.derived_values import recompute_derived_values
+from utils.rollups import refresh_rollups
+from utils.trade_import import ORDER_TYPES, TRADE_STATUSES, required_text, choice_value
+
+BATCH_MAX_TRADES = 10000
+# Keeps every IN (...) list well below SQLite's bound parameter limit
+IDS_PER_STATEMENT = 500
+
+def optional_text(value, field):
+    if not isinstance(value, str):
+        raise ValueError(f'{field} must be a string')
+    return value.strip()
+
+def order_type_value(value, field):
+    return choice_value(value, field, ORDER_TYPES)
+
+def status_value(value, field):
+    return choice_value(value, field, TRADE_STATUSES)
+
+# Fields a batch may set, with their parsers (value, field name); net_profit / r_value are derived
+BATCH_FIELDS = {
+    'instrument': required_text,
+    'order_type': order_type_value,
+    'status': status_value,
+    'rationale': optional_text, 'review': optional_text, 'emotions': optional_text, 'tags': optional_text
+}
+# Changing these changes the derived values and moves a trade's statistics contribution
+STATISTICS_FIELDS = ('instrument', 'order_type')
+TAG_FIELDS = ('tags', 'emotions')
+
+def id_chunks(trade_ids):
+    for start in range(0, len(trade_ids), IDS_PER_STATEMENT):
+        yield trade_ids[start:start + IDS_PER_STATEMENT]
+
+def select_batch(data):
+    """
+    Resolves the `ids` list or `filter` object of a batch request to trade ids.
+    The ids are fixed up front so updating a filtered field cannot change the set.
+    Raises ValueError on an invalid or oversized selection.
+    """
+    if 'ids' in data:
+        trade_ids = data['ids']
+        if not isinstance(trade_ids, list) or not all(isinstance(trade_id, int) for trade_id in trade_ids):
+            raise ValueError('ids must be a list of trade ids')
+        if len(trade_ids) > BATCH_MAX_TRADES:
+            raise ValueError(f'A batch is limited to {BATCH_MAX_TRADES} trades')
+        trade_ids = sorted(set(trade_ids))
+        return [
+            trade_id for chunk in id_chunks(trade_ids)
+            for trade_id in db.session.execute(db.select(Trade.id).where(Trade.id.in_(chunk))).scalars()
+        ]
+    if 'filter' in data:
+        if not isinstance(data['filter'], dict):
+            raise ValueError('filter must be an object')
+        conditions = filter_conditions(data['filter'])
+        if not conditions:
+            raise ValueError('filter must contain at least one condition')
+        statement = db.select(Trade.id).where(*conditions).order_by(Trade.id).limit(BATCH_MAX_TRADES + 1)
+        trade_ids = db.session.execute(statement).scalars().all()
+        if len(trade_ids) > BATCH_MAX_TRADES:
+            raise ValueError(f'A batch is limited to {BATCH_MAX_TRADES} trades')
+        return trade_ids
+    raise ValueError('Provide ids or filter to select trades')
+
+def batch_values(fields):
+    """Validates and parses the `set` object of a batch update. Raises ValueError."""
+    if not isinstance(fields, dict) or not fields:
+        raise ValueError('set must be an object with at least one field')
+    unknown = [name for name in fields if name not in BATCH_FIELDS]
+    if unknown:
+        raise ValueError(f'Fields cannot be batch updated: {", ".join(unknown)}')
+    return {name: BATCH_FIELDS[name](value, name) for name, value in fields.items()}
+
+def selection_totals(trade_ids):
+    totals = {}
+    for chunk in id_chunks(trade_ids):
+        for key, values in contribution_totals([Trade.id.in_(chunk)]).items():
+            bucket = totals.setdefault(key, dict.fromkeys(values, 0))
+            for column, value in values.items():
+                bucket[column] += value
+    return totals
+
+def entry_range(trade_ids):
+    """Earliest and latest entry_datetime of the batch, or (None, None)."""
+    first, last = None, None
+    for chunk in id_chunks(trade_ids):
+        low, high = db.session.execute(
+            db.select(db.func.min(Trade.entry_datetime), db.func.max(Trade.entry_datetime)).where(Trade.id.in_(chunk))
+        ).one()
+        first = low if first is None else min(first, low)
+        last = high if last is None else max(last, high)
+    return first, last
+
+def batch_update(trade_ids, values):
+    """Sets `values` on every trade of the batch. Returns the number of trades."""
+    values = dict(values, updated_at=datetime.utcnow())
+    moves_statistics = any(name in values for name in STATISTICS_FIELDS)
+    if moves_statistics:
+        apply_totals(selection_totals(trade_ids), -1)
+    for chunk in id_chunks(trade_ids):
+        db.session.execute(db.update(Trade).where(Trade.id.in_(chunk)).values(**values))
+        if moves_statistics:
+            recompute_derived_values([Trade.id.in_(chunk)])
+    if moves_statistics:
+        apply_totals(selection_totals(trade_ids))
+        # Entry dates are not batch editable, so one refresh of the span covers the batch
+        first, last = entry_range(trade_ids)
+        if first is not None:
+            refresh_rollups(first, last)
+    if any(name in values for name in TAG_FIELDS):
+        for chunk in id_chunks(trade_ids):
+            reindex_trades(chunk)
+    return len(trade_ids)
+
+def release_batch_images(trade_ids):
+    """
+    Drops the blob references of every image of the batch in one pass.
+    Returns the files no longer referenced by any trade.
+    """
+    references, unlink = Counter(), []
+    for chunk in id_chunks(trade_ids):
+        rows = db.session.execute(
+            db.select(TradeImage.content_hash, TradeImage.image_path).where(TradeImage.trade_id.in_(chunk))
+        )
+        for content_hash, image_path in rows:
+            if content_hash is None:
+                # Uploads from before deduplication own their file exclusively
+                unlink.append(image_path)
+            else:
+                references[content_hash] += 1
+    if references:
+        db.session.connection().exec_driver_sql(
+            'UPDATE image_blobs SET ref_count = ref_count - ? WHERE sha256 = ?',
+            [(count, content_hash) for content_hash, count in references.items()]
+        )
+        hashes = list(references)
+        for start in range(0, len(hashes), IDS_PER_STATEMENT):
+            released = ImageBlob.sha256.in_(hashes[start:start + IDS_PER_STATEMENT]), ImageBlob.ref_count <= 0
+            unlink += db.session.execute(db.select(ImageBlob.image_path).where(*released)).scalars().all()
+            db.session.execute(db.delete(ImageBlob).where(*released))
+    return unlink
+
+def batch_delete(trade_ids):
+    """
+    Deletes every trade of the batch with its images and index rows.
+    Returns (number of trades, files to unlink once the transaction commits).
+    """
+    apply_totals(selection_totals(trade_ids), -1)
+    first, last = entry_range(trade_ids)
+    unlink = release_batch_images(trade_ids)
+    for chunk in id_chunks(trade_ids):
+        db.session.execute(db.delete(TradeImage).where(TradeImage.trade_id.in_(chunk)))
+        db.session.execute(db.delete(TradeTag).where(TradeTag.trade_id.in_(chunk)))
+        db.session.execute(db.delete(Trade).where(Trade.id.in_(chunk)))
+    if first is not None:
+        refresh_rollups(first, last)
+    return len(trade_ids), unlink
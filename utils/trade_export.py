@@ -0,0 +1,101 @@
+"""
+Streaming journal export to CSV, NDJSON or Parquet.
+
+Rows are read from a server-side cursor in EXPORT_BATCH_SIZE batches and
+written out batch by batch, so memory stays flat whatever the journal size.
+"""
+import csv
+import io
+import json
+from datetime import datetime, date, time
+
+from models import db
+from models.trade import Trade
+from utils.pagination import TRADE_FIELDS, serialize_row, iter_batches
+
+EXPORT_FORMATS = ('csv', 'ndjson', 'parquet')
+EXPORT_BATCH_SIZE = 5000
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+def parse_date_filter(value, end_of_day=False):
+    """Parses a `start` / `end` filter; a bare date covers the whole day."""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if end_of_day and len(value) == 10:
+        parsed = datetime.combine(parsed.date(), time.max)
+    return parsed
+
+def export_query(start=None, end=None, instrument=None):
+    """Oldest-first query over every trade column, with optional filters."""
+    query = db.session.query(*[getattr(Trade, name) for name in TRADE_FIELDS])
+    if instrument:
+        query = query.filter(Trade.instrument == instrument)
+    if start:
+        query = query.filter(Trade.entry_datetime >= start)
+    if end:
+        query = query.filter(Trade.entry_datetime <= end)
+    return query.order_by(Trade.entry_datetime.asc(), Trade.id.asc())
+
+def iter_csv(query):
+    """Yields CSV text chunks, one per batch, starting with the header."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(TRADE_FIELDS)
+    for batch in iter_batches(query, EXPORT_BATCH_SIZE):
+        writer.writerows(
+            [value.isoformat() if isinstance(value, (datetime, date)) else value for value in row]
+            for row in batch
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def iter_ndjson(query):
+    """Yields NDJSON text chunks, one per batch."""
+    for batch in iter_batches(query, EXPORT_BATCH_SIZE):
+        yield ''.join(json.dumps(serialize_row(row, TRADE_FIELDS)) + '\n' for row in batch)
+
+def parquet_schema(pa):
+    types = {
+        'id': pa.int64(),
+        'entry_datetime': pa.timestamp('us'), 'exit_datetime': pa.timestamp('us'),
+        'created_at': pa.timestamp('us'), 'updated_at': pa.timestamp('us')
+    }
+    float_columns = {
+        'entry_price', 'exit_price', 'initial_stop_loss', 'initial_take_profit',
+        'position_size', 'net_profit', 'r_value'
+    }
+    return pa.schema([
+        (name, types.get(name, pa.float64() if name in float_columns else pa.string()))
+        for name in TRADE_FIELDS
+    ])
+
+def write_parquet(query, sink):
+    """
+    Writes the query to a Parquet file (path or binary file object), one row
+    group per batch. Needs the optional pyarrow package.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError('Parquet export requires pyarrow (pip install pyarrow)')
+
+    schema = parquet_schema(pa)
+    rows_written = 0
+    with pq.ParquetWriter(sink, schema, compression='zstd') as writer:
+        for batch in iter_batches(query, EXPORT_BATCH_SIZE):
+            columns = list(zip(*batch))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                schema=schema
+            ))
+            rows_written += len(batch)
+    return rows_written
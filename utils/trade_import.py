@@ -0,0 +1,195 @@
+"""
+Bulk trade import from CSV, NDJSON or JSON files.
+
+Rows are parsed one at a time from the file stream, validated with the same
+rules as create_trade, and inserted with executemany batches inside a single
+transaction.
+"""
+import csv
+import io
+import json
+import math
+from datetime import datetime
+from types import SimpleNamespace
+
+from models import db
+from utils.statistics import trade_contribution, merge_contribution, apply_totals
+from utils.tag_index import index_trades_after
+from utils.instruments import derived_values
+from utils.rollups import refresh_rollups
+
+# Enforced by create_trade and by the importer
+REQUIRED_FIELDS = [
+    'entry_datetime', 'exit_datetime', 'instrument', 'order_type',
+    'entry_price', 'exit_price', 'initial_stop_loss',
+    'initial_take_profit', 'position_size', 'status'
+]
+# Values offered by the trade form, enforced by create_trade, the importer and batch updates
+ORDER_TYPES = ('BUY', 'SELL')
+TRADE_STATUSES = ('WIN', 'LOSS', 'BREAKEVEN')
+IMPORT_FORMATS = ('csv', 'ndjson', 'json')
+IMPORT_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 100
+INSERT_COLUMNS = [
+    'entry_datetime', 'exit_datetime', 'instrument', 'order_type', 'entry_price',
+    'exit_price', 'initial_stop_loss', 'initial_take_profit', 'position_size', 'status',
+    'net_profit', 'r_value', 'rationale', 'review', 'emotions', 'tags', 'created_at', 'updated_at'
+]
+INSERT_SQL = f"INSERT INTO trades ({', '.join(INSERT_COLUMNS)}) VALUES ({', '.join('?' * len(INSERT_COLUMNS))})"
+
+def missing_fields(data):
+    """Required fields that are missing or empty in a raw row."""
+    return [field for field in REQUIRED_FIELDS if not data.get(field)]
+
+def text_value(data, field, default=None):
+    """A string field of a raw row; None / missing gives `default` when there is one."""
+    value = data.get(field)
+    if value is None and default is not None:
+        return default
+    if not isinstance(value, str):
+        raise ValueError(f'{field} must be a string')
+    return value
+
+def required_text(value, field):
+    """A non-empty string, stripped of surrounding whitespace."""
+    if not isinstance(value, str):
+        raise ValueError(f'{field} must be a string')
+    value = value.strip()
+    if not value:
+        raise ValueError(f'{field} must not be empty')
+    return value
+
+def choice_value(value, field, choices):
+    """One of `choices` (case-insensitive), returned upper-cased."""
+    value = required_text(value, field).upper()
+    if value not in choices:
+        raise ValueError(f'{field} must be one of: {", ".join(choices)}')
+    return value
+
+def number_value(data, field, default=None):
+    """A numeric field of a raw row, given as a number or a numeric string."""
+    value = data.get(field)
+    if value in (None, '') and default is not None:
+        return default
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f'{field} must be a number')
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError(f'{field} must be a number, got {value!r}')
+    if not math.isfinite(number):
+        raise ValueError(f'{field} must be a finite number')
+    return number
+
+def trade_values(data):
+    """
+    Converts a raw form/file row into Trade column values, checking the type
+    of every field (raises ValueError). net_profit and r_value are computed by
+    the P&L engine; the row's own values are only kept for instruments
+    without a spec.
+    """
+    values = {
+        'entry_datetime': datetime.fromisoformat(text_value(data, 'entry_datetime')),
+        'exit_datetime': datetime.fromisoformat(text_value(data, 'exit_datetime')),
+        'instrument': required_text(data.get('instrument'), 'instrument'),
+        'order_type': choice_value(data.get('order_type'), 'order_type', ORDER_TYPES),
+        'entry_price': number_value(data, 'entry_price'),
+        'exit_price': number_value(data, 'exit_price'),
+        'initial_stop_loss': number_value(data, 'initial_stop_loss'),
+        'initial_take_profit': number_value(data, 'initial_take_profit'),
+        'position_size': number_value(data, 'position_size'),
+        'status': choice_value(data.get('status'), 'status', TRADE_STATUSES),
+        'net_profit': number_value(data, 'net_profit', 0.0),
+        'r_value': number_value(data, 'r_value', 0.0),
+        'rationale': text_value(data, 'rationale', ''),
+        'review': text_value(data, 'review', ''),
+        'emotions': text_value(data, 'emotions', ''),
+        'tags': text_value(data, 'tags', '')
+    }
+    values.update(derived_values(values))
+    return values
+
+def detect_format(filename):
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension == 'jsonl':
+        return 'ndjson'
+    if extension in IMPORT_FORMATS:
+        return extension
+    raise ValueError(f'Cannot detect import format of {filename}, use one of: {", ".join(IMPORT_FORMATS)}')
+
+def iter_rows(binary_stream, file_format):
+    """Yields (row_number, raw_row) pairs from a binary file stream."""
+    if file_format == 'json':
+        # A JSON array has to be decoded as a whole; prefer NDJSON for large files
+        for number, row in enumerate(json.load(binary_stream), start=1):
+            yield number, row
+        return
+    text_stream = io.TextIOWrapper(binary_stream, encoding='utf-8-sig', newline='')
+    if file_format == 'csv':
+        for number, row in enumerate(csv.DictReader(text_stream), start=1):
+            yield number, row
+    else:
+        for number, line in enumerate(text_stream, start=1):
+            if line.strip():
+                yield number, json.loads(line)
+
+def sqlite_datetime(value):
+    """Formats a datetime the way SQLAlchemy stores it in SQLite."""
+    return value.isoformat(sep=' ', timespec='microseconds')
+
+def insert_row(values, now):
+    """Positional INSERT_COLUMNS tuple with datetimes pre-formatted for SQLite."""
+    row = dict(values, created_at=now, updated_at=now)
+    for column in ('entry_datetime', 'exit_datetime'):
+        row[column] = sqlite_datetime(row[column])
+    return tuple(row[column] for column in INSERT_COLUMNS)
+
+def import_trades(binary_stream, file_format):
+    """
+    Imports every valid row of the stream in one transaction.
+    Returns a report with the imported count and the rejected rows.
+    The caller commits or rolls back.
+    """
+    # Batches go straight to the driver's executemany; SQLAlchemy's per-value
+    # bind processing would otherwise dominate the import time.
+    connection = db.session.connection()
+    last_id = connection.exec_driver_sql('SELECT COALESCE(MAX(id), 0) FROM trades').scalar()
+    now = sqlite_datetime(datetime.utcnow())
+    imported, rejected, errors = 0, 0, []
+    totals = {}
+    batch = []
+    first_entry = last_entry = None
+
+    def flush():
+        connection.exec_driver_sql(INSERT_SQL, batch)
+        batch.clear()
+
+    for number, row in iter_rows(binary_stream, file_format):
+        try:
+            if not isinstance(row, dict):
+                raise ValueError('Row is not an object')
+            missing = missing_fields(row)
+            if missing:
+                raise ValueError(f'Missing or empty required fields: {", ".join(missing)}')
+            values = trade_values(row)
+        except Exception as e:
+            # Any bad row is reported and skipped, it never fails the whole import
+            rejected += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({'row': number, 'error': str(e)})
+            continue
+        batch.append(insert_row(values, now))
+        merge_contribution(totals, trade_contribution(SimpleNamespace(**values)))
+        entry = values['entry_datetime']
+        first_entry = entry if first_entry is None else min(first_entry, entry)
+        last_entry = entry if last_entry is None else max(last_entry, entry)
+        imported += 1
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            flush()
+    if batch:
+        flush()
+    apply_totals(totals)
+    index_trades_after(last_id)
+    if imported:
+        refresh_rollups(first_entry, last_entry)
+    return {'imported': imported, 'rejected': rejected, 'errors': errors}
@@ -0,0 +1,123 @@
+"""
+Resumable, chunked image uploads.
+
+A client opens a session (POST /api/uploads), sends the file as raw chunks
+(PATCH with an Upload-Offset header) and attaches the finished upload to a
+trade. Chunks are streamed straight to <upload folder>/incoming/<id>.part in
+CHUNK_SIZE pieces, so memory stays bounded and no multipart parsing happens.
+After a dropped connection, GET on the session returns the offset to resume
+from. Session state lives on disk, so uploads also survive a restart.
+"""
+import json
+import os
+import re
+import secrets
+import threading
+import time
+
+from utils.image_store import CHUNK_SIZE, stage_file
+
+INCOMING_FOLDER = 'incoming'
+UPLOAD_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+class UploadOffsetMismatch(ValueError):
+    """A chunk did not start at the current end of the upload."""
+
+    def __init__(self, offset):
+        super().__init__(f'Upload is at offset {offset}')
+        self.offset = offset
+
+class UploadSessions:
+    def __init__(self, upload_folder, max_size, ttl=24 * 3600):
+        self.folder = os.path.join(upload_folder, INCOMING_FOLDER)
+        self.max_size = max_size
+        self.ttl = ttl
+        self._locks = {}
+        self._guard = threading.Lock()
+        os.makedirs(self.folder, exist_ok=True)
+
+    def _paths(self, upload_id):
+        if not UPLOAD_ID_PATTERN.match(upload_id):
+            raise KeyError(upload_id)
+        base = os.path.join(self.folder, upload_id)
+        return f'{base}.part', f'{base}.json'
+
+    def _lock(self, upload_id):
+        with self._guard:
+            return self._locks.setdefault(upload_id, threading.Lock())
+
+    def create(self, filename, size=None):
+        """Opens a session for `filename` (extension already validated). Returns its status."""
+        if size is not None and not 0 < size <= self.max_size:
+            raise ValueError(f'size must be between 1 and {self.max_size} bytes')
+        self.expire()
+        upload_id = secrets.token_hex(16)
+        part_path, meta_path = self._paths(upload_id)
+        open(part_path, 'wb').close()
+        with open(meta_path, 'w') as meta_file:
+            json.dump({'filename': filename, 'size': size}, meta_file)
+        return self.status(upload_id)
+
+    def status(self, upload_id):
+        """Session state; raises KeyError for unknown or expired sessions."""
+        part_path, meta_path = self._paths(upload_id)
+        try:
+            with open(meta_path) as meta_file:
+                meta = json.load(meta_file)
+            offset = os.path.getsize(part_path)
+        except FileNotFoundError:
+            raise KeyError(upload_id)
+        return {
+            'upload_id': upload_id,
+            'filename': meta['filename'],
+            'size': meta['size'],
+            'offset': offset,
+            'complete': meta['size'] is not None and offset == meta['size']
+        }
+
+    def append(self, upload_id, offset, stream):
+        """
+        Writes the chunk in `stream` at `offset`, which must be the current end
+        of the upload. Returns the new status.
+        """
+        with self._lock(upload_id):
+            status = self.status(upload_id)
+            if offset != status['offset']:
+                raise UploadOffsetMismatch(status['offset'])
+            limit = status['size'] or self.max_size
+            part_path, _ = self._paths(upload_id)
+            with open(part_path, 'r+b') as part_file:
+                part_file.seek(offset)
+                # Bytes received before a dropped connection are kept, the client resumes after them
+                while chunk := stream.read(CHUNK_SIZE):
+                    if part_file.tell() + len(chunk) > limit:
+                        raise ValueError(f'Upload exceeds {limit} bytes')
+                    part_file.write(chunk)
+        return self.status(upload_id)
+
+    def stage(self, upload_id, extension):
+        """Hashes a finished upload for image_store.place_staged()."""
+        status = self.status(upload_id)
+        if not status['offset'] or (status['size'] is not None and not status['complete']):
+            raise ValueError(f"Upload is incomplete ({status['offset']} of {status['size']} bytes)")
+        part_path, _ = self._paths(upload_id)
+        return stage_file(part_path, extension)
+
+    def discard(self, upload_id):
+        """Removes a session and whatever part of the file is left."""
+        for path in self._paths(upload_id):
+            if os.path.exists(path):
+                os.remove(path)
+        with self._guard:
+            self._locks.pop(upload_id, None)
+
+    def expire(self):
+        """Drops sessions not written to for `ttl` seconds."""
+        cutoff = time.time() - self.ttl
+        for name in os.listdir(self.folder):
+            upload_id, extension = os.path.splitext(name)
+            path = os.path.join(self.folder, name)
+            if extension == '.json' and UPLOAD_ID_PATTERN.match(upload_id) and os.path.getmtime(path) < cutoff:
+                part_path, _ = self._paths(upload_id)
+                if not os.path.exists(part_path) or os.path.getmtime(part_path) < cutoff:
+                    self.discard(upload_id)